@@ -0,0 +1,139 @@
+"""
+Admission control for solves.
+
+Each solve is CPU-bound for its whole time limit, so running more of them at once than there
+are cores only makes every one of them overrun its budget. The controller lets at most
+`SOLVER_MAX_CONCURRENT` solves run (default: the cores available to the process, divided by
+`WEB_CONCURRENCY` when several workers share them), parks up to `SOLVER_MAX_QUEUE` more for at
+most `SOLVER_QUEUE_TIMEOUT_SECONDS`, and turns everything beyond that away immediately:
+
+- queue full           -> QueueFullError    (HTTP 429)
+- waited too long      -> QueueTimeoutError (HTTP 503)
+
+Both carry a Retry-After estimate based on recent solve times. `load()` reports the current
+state for the /load endpoint.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 30.0
+# Solve durations kept for the Retry-After estimate
+RECENT_SOLVES = 50
+
+
+def available_cores() -> int:
+    """Cores this process may run on (respects CPU affinity, e.g. container cpusets)."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError: # Not available on macOS/Windows
+        return max(1, os.cpu_count() or 1)
+
+
+class AdmissionRejectedError(Exception):
+    """Base for solves turned away by the controller."""
+    def __init__(self, message: str, retry_after_seconds: int):
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class QueueFullError(AdmissionRejectedError):
+    """Every solve slot and queue place is taken."""
+
+
+class QueueTimeoutError(AdmissionRejectedError):
+    """A queued solve did not get a slot within the queue timeout."""
+
+
+class AdmissionController:
+    """Concurrency limiter with a bounded, time-limited wait queue. Thread-safe."""
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout_seconds: float):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._durations = deque(maxlen=RECENT_SOLVES)
+        self.running = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after_seconds(self) -> int:
+        """Rough time until a newly queued solve would start: the queue ahead of it, drained in parallel."""
+        with self._lock:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self) -> int:
+        average = sum(self._durations) / len(self._durations) if self._durations else 1.0
+        waves = (self.queued + 1) / self.max_concurrent
+        return max(1, math.ceil(average * waves))
+
+    def reserve(self, count: int = 1) -> None:
+        """
+        Claims `count` places in the queue (all or none), or raises QueueFullError. Cheap and
+        non-blocking, so it can be called on the event loop before handing the solves to worker
+        threads. Each place is used up by one run().
+        """
+        with self._lock:
+            if self.running + self.queued + count > self.max_concurrent + self.max_queue:
+                self.rejected += 1
+                raise QueueFullError("Solver is at capacity; try again later.", self._retry_after_locked())
+            self.queued += count
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Waits for a free slot (at most the queue timeout), then runs fn(*args) in it. Must follow
+        a successful reserve(). Raises QueueTimeoutError if no slot became free in time.
+        """
+        acquired = self._slots.acquire(timeout=self.queue_timeout_seconds)
+        with self._lock:
+            self.queued -= 1
+            if not acquired:
+                self.timed_out += 1
+                raise QueueTimeoutError("Timed out waiting for a free solver slot.", self._retry_after_locked())
+            self.running += 1
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self._durations.append(time.perf_counter() - started)
+            self._slots.release()
+
+    def load(self) -> Dict[str, Any]:
+        """Current state, for callers and autoscalers."""
+        with self._lock:
+            return {
+                "maxConcurrent": self.max_concurrent,
+                "maxQueue": self.max_queue,
+                "queueTimeoutSeconds": self.queue_timeout_seconds,
+                "running": self.running,
+                "queued": self.queued,
+                # (running + queued) / maxConcurrent; above 1 means requests are waiting
+                "utilization": (self.running + self.queued) / self.max_concurrent,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timedOut": self.timed_out,
+                "retryAfterSeconds": self._retry_after_locked(),
+            }
+
+
+def controller_from_env(environ: Optional[Dict[str, str]] = None) -> AdmissionController:
+    """Builds the controller from SOLVER_MAX_CONCURRENT, SOLVER_MAX_QUEUE and SOLVER_QUEUE_TIMEOUT_SECONDS."""
+    env = os.environ if environ is None else environ
+    # Under gunicorn (WEB_CONCURRENCY workers) each worker gets its share of the cores
+    workers = max(1, int(env.get("WEB_CONCURRENCY") or 1))
+    max_concurrent = int(env.get("SOLVER_MAX_CONCURRENT") or max(1, available_cores() // workers))
+    max_queue = int(env.get("SOLVER_MAX_QUEUE") or 2 * max_concurrent)
+    queue_timeout = float(env.get("SOLVER_QUEUE_TIMEOUT_SECONDS") or DEFAULT_QUEUE_TIMEOUT_SECONDS)
+    return AdmissionController(max_concurrent, max_queue, queue_timeout)
@@ -0,0 +1,179 @@
+"""
+Offline batch solver.
+
+Solves every payload file under a path across a pool of worker processes, with the same
+model code as /optimize-schedule (`main.solve_schedule`). Payload files may be plain,
+gzip- or zstd-compressed JSON (capture records are unwrapped) or binary .npz payloads with a
+dense travel matrix (see payload_io.save_npz_payload).
+
+Each response is written next to its payload as `<name>.response.json` (or mirrored under
+`--output-dir`), atomically, so an interrupted run can simply be started again: payloads that
+already have a response are skipped unless `--force` is given. A timing summary of the whole
+run is written to `batch_summary.json` in the output directory.
+
+Examples:
+    python batch.py nightly/2024-04-15/ --jobs 8
+    python batch.py captures/ --output-dir results/ --time-limit 5
+    python batch.py payload.npz --force
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from payload_io import BATCH_SUMMARY_NAME, PAYLOAD_EXTENSIONS, RESPONSE_SUFFIX, list_payload_files
+
+
+def _quiet_worker() -> None:
+    # The service logs every model-building step; keep batch output readable unless asked.
+    if not os.environ.get("BATCH_VERBOSE"):
+        sys.stdout = open(os.devnull, "w")
+
+
+def response_path(payload_path: str, input_root: str, output_dir: Optional[str] = None) -> str:
+    """Where the response for `payload_path` goes: next to it, or mirrored under `output_dir`."""
+    name = os.path.basename(payload_path)
+    for extension in sorted(PAYLOAD_EXTENSIONS, key=len, reverse=True):
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+            break
+    if output_dir is None:
+        directory = os.path.dirname(payload_path)
+    else:
+        root = input_root if os.path.isdir(input_root) else os.path.dirname(input_root)
+        directory = os.path.join(output_dir, os.path.relpath(os.path.dirname(payload_path), root))
+    return os.path.normpath(os.path.join(directory, name + RESPONSE_SUFFIX))
+
+
+def has_response(path: str) -> bool:
+    """True if a complete response already exists at `path` (for resuming)."""
+    try:
+        with open(path, "rb") as f:
+            return "status" in json.load(f)
+    except (OSError, ValueError):
+        return False
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path) # A crash never leaves a half-written response behind
+
+
+def solve_file(task: Tuple[str, str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Loads, solves and writes the response for one payload file. Runs inside a worker process."""
+    payload_path, output_path, option_overrides = task
+    import main as service # Imported lazily so the parent process doesn't need OR-Tools loaded
+    from fastapi import HTTPException
+    from fast_json import encode_response
+    from models import OptimizationRequestPayload
+    from payload_io import load_payload_and_matrix
+
+    row: Dict[str, Any] = {"file": payload_path, "response": output_path}
+    started = time.perf_counter()
+    try:
+        payload, matrix = load_payload_and_matrix(payload_path)
+        if option_overrides:
+            payload["solverOptions"] = {**(payload.get("solverOptions") or {}), **option_overrides}
+        request = OptimizationRequestPayload.model_validate(payload)
+        loaded = time.perf_counter()
+        response = service.solve_schedule(request, matrix)
+        solved = time.perf_counter()
+        _write_atomic(output_path, encode_response(response))
+    except HTTPException as e:
+        return {**row, "status": "error", "error": str(e.detail), "wallSeconds": time.perf_counter() - started}
+    except Exception as e:
+        return {**row, "status": "error", "error": repr(e), "wallSeconds": time.perf_counter() - started}
+    stats = response.solverStats
+    return {
+        **row,
+        "status": response.status,
+        "items": len(request.items),
+        "unassigned": len(response.unassignedItemIds or []),
+        "objectiveValue": stats.objectiveValue if stats else None,
+        "loadSeconds": loaded - started,
+        "solveSeconds": solved - loaded,
+        "wallSeconds": time.perf_counter() - started,
+    }
+
+
+def run_batch(
+    path: str,
+    output_dir: Optional[str] = None,
+    jobs: Optional[int] = None,
+    force: bool = False,
+    option_overrides: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Solves every payload under `path` and returns (and writes) the run summary."""
+    started = time.perf_counter()
+    tasks, skipped = [], []
+    for payload_path in list_payload_files(path):
+        output_path = response_path(payload_path, path, output_dir)
+        if not force and has_response(output_path):
+            skipped.append({"file": payload_path, "response": output_path, "status": "skipped"})
+        else:
+            tasks.append((payload_path, output_path, option_overrides or {}))
+    print(f"Solving {len(tasks)} payload(s) with {jobs or os.cpu_count()} worker(s); "
+          f"{len(skipped)} already have a response.")
+
+    results = []
+    if tasks:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_quiet_worker) as pool:
+            futures = [pool.submit(solve_file, task) for task in tasks]
+            for done, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                results.append(row)
+                detail = row.get("error") or f"{row['wallSeconds']:.2f}s, {row['unassigned']} unassigned"
+                print(f"[{done}/{len(tasks)}] {row['file']}: {row['status']} ({detail})")
+
+    solve_seconds = [r["solveSeconds"] for r in results if "solveSeconds" in r]
+    summary = {
+        "finishedAt": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+        "input": path,
+        "jobs": jobs or os.cpu_count(),
+        "solved": len(solve_seconds),
+        "failed": len(results) - len(solve_seconds),
+        "skipped": len(skipped),
+        "wallSeconds": time.perf_counter() - started,
+        "totalSolveSeconds": sum(solve_seconds),
+        "maxSolveSeconds": max(solve_seconds, default=0.0),
+        "files": sorted(results + skipped, key=lambda r: r["file"]),
+    }
+    summary_dir = output_dir or (path if os.path.isdir(path) else os.path.dirname(path))
+    _write_atomic(os.path.join(summary_dir, BATCH_SUMMARY_NAME), json.dumps(summary, indent=2).encode("utf-8"))
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Solve payload files in parallel with the service's solver.")
+    parser.add_argument("path", help="Payload file or directory of payload files")
+    parser.add_argument("--output-dir", help="Write responses here (mirroring the input tree) instead of next to the payloads")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Parallel solver processes")
+    parser.add_argument("--force", action="store_true", help="Re-solve payloads that already have a response")
+    parser.add_argument("--time-limit", type=float, help="Override solverOptions.timeLimitSeconds for every payload")
+    parser.add_argument("--solution-limit", type=int, help="Override solverOptions.solutionLimit for every payload")
+    args = parser.parse_args(argv)
+
+    if not list_payload_files(args.path):
+        print(f"No payload files found under {args.path}.")
+        return 1
+    overrides = {}
+    if args.time_limit is not None:
+        overrides["timeLimitSeconds"] = args.time_limit
+    if args.solution_limit is not None:
+        overrides["solutionLimit"] = args.solution_limit
+
+    summary = run_batch(args.path, args.output_dir, args.jobs, args.force, overrides)
+    print(f"Solved {summary['solved']}, failed {summary['failed']}, skipped {summary['skipped']} "
+          f"in {summary['wallSeconds']:.2f}s (solver time {summary['totalSolveSeconds']:.2f}s).")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
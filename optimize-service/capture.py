@@ -0,0 +1,140 @@
+"""
+Opt-in capture of incoming optimization requests for offline replay.
+
+Enabled by setting `REQUEST_CAPTURE_DIR`. Each request is written as one gzip-compressed
+JSON record next to the service's own timing and result summary:
+
+    {"capturedAt": "...", "elapsedSeconds": 1.02,
+     "result": {"status": "partial", "objectiveValue": 123, "unassignedCount": 2},
+     "payload": {...OptimizationRequestPayload...}}
+
+Only the newest `REQUEST_CAPTURE_MAX_FILES` records are kept. With
+`REQUEST_CAPTURE_ANONYMIZE=1`, identifiers are replaced and coordinates dropped before
+writing; everything the solver actually uses (indices, times, durations, priorities,
+eligibility structure and the matrix) is preserved so replays behave the same.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from models import OptimizationRequestPayload, OptimizationResponsePayload
+
+CAPTURE_PREFIX = "capture_"
+CAPTURE_SUFFIX = ".json.gz"
+DEFAULT_MAX_FILES = 500
+
+
+def anonymize_payload(payload: Dict[str, Any], salt: bytes = b"") -> Dict[str, Any]:
+    """
+    Returns a copy of a payload dict with item, location and technician identifiers replaced
+    and coordinates zeroed. Mappings are consistent within the payload, so eligibility and
+    fixed constraints still line up.
+    """
+    def item_alias(item_id: str) -> str:
+        return "item_" + hashlib.sha256(salt + item_id.encode()).hexdigest()[:12]
+
+    tech_aliases: Dict[int, int] = {}
+    def tech_alias(tech_id: int) -> int:
+        if tech_id not in tech_aliases:
+            tech_aliases[tech_id] = len(tech_aliases) + 1
+        return tech_aliases[tech_id]
+
+    anonymized = dict(payload)
+    anonymized["locations"] = [
+        {**loc, "id": f"loc_{loc['index']}", "coords": {"lat": 0.0, "lng": 0.0}}
+        for loc in payload["locations"]
+    ]
+    anonymized["technicians"] = [{**t, "id": tech_alias(t["id"])} for t in payload["technicians"]]
+    anonymized["items"] = [
+        {**item, "id": item_alias(item["id"]),
+         "eligibleTechnicianIds": [tech_alias(t) for t in item["eligibleTechnicianIds"]]}
+        for item in payload["items"]
+    ]
+    anonymized["fixedConstraints"] = [
+        {**c, "itemId": item_alias(c["itemId"])} for c in payload["fixedConstraints"]
+    ]
+    return anonymized
+
+
+class RequestRecorder:
+    """Writes capture records to a directory and rotates out the oldest ones."""
+
+    def __init__(self, directory: str, max_files: int = DEFAULT_MAX_FILES, anonymize: bool = False,
+                 salt: Optional[bytes] = None):
+        self.directory = directory
+        self.max_files = max_files
+        self.anonymize = anonymize
+        # A per-process random salt keeps anonymized ids from being reversed by hashing known ids.
+        self.salt = salt if salt is not None else os.urandom(16)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, payload: OptimizationRequestPayload, response: Optional[OptimizationResponsePayload],
+               elapsed_seconds: float) -> Optional[str]:
+        """Writes one capture; failures are logged and never affect the request being served."""
+        try:
+            return self._write(payload, response, elapsed_seconds)
+        except Exception as e:
+            print(f"Warning: Failed to capture request: {e}")
+            return None
+
+    def _write(self, payload, response, elapsed_seconds) -> str:
+        now = datetime.now(timezone.utc)
+        data = payload.model_dump(exclude_none=True)
+        if self.anonymize:
+            data = anonymize_payload(data, self.salt)
+        record = {
+            "capturedAt": now.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "elapsedSeconds": round(elapsed_seconds, 6),
+            "result": summarize_response(response),
+            "payload": data,
+        }
+        name = f"{CAPTURE_PREFIX}{now.strftime('%Y%m%dT%H%M%S%fZ')}_{uuid.uuid4().hex[:8]}{CAPTURE_SUFFIX}"
+        path = os.path.join(self.directory, name)
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(record, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        self._rotate()
+        return path
+
+    def _rotate(self) -> None:
+        with self._lock:
+            captures = sorted(n for n in os.listdir(self.directory)
+                              if n.startswith(CAPTURE_PREFIX) and n.endswith(CAPTURE_SUFFIX))
+            for name in captures[:max(0, len(captures) - self.max_files)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass # Another worker rotated it first
+
+
+def summarize_response(response: Optional[OptimizationResponsePayload]) -> Dict[str, Any]:
+    if response is None:
+        return {"status": "exception"}
+    stats = response.solverStats
+    return {
+        "status": response.status,
+        "objectiveValue": stats.objectiveValue if stats else None,
+        "solveTimeSeconds": stats.solveTimeSeconds if stats else None,
+        "stopReason": stats.stopReason if stats else None,
+        "estimatedMemoryMb": stats.estimatedMemoryMb if stats else None,
+        "peakRssMb": stats.peakRssMb if stats else None,
+        "unassignedCount": len(response.unassignedItemIds or []),
+    }
+
+
+def recorder_from_env() -> Optional[RequestRecorder]:
+    """Builds a recorder from REQUEST_CAPTURE_* environment variables, or None when disabled."""
+    directory = os.environ.get("REQUEST_CAPTURE_DIR")
+    if not directory:
+        return None
+    max_files = int(os.environ.get("REQUEST_CAPTURE_MAX_FILES", DEFAULT_MAX_FILES))
+    anonymize = os.environ.get("REQUEST_CAPTURE_ANONYMIZE", "").lower() in ("1", "true", "yes")
+    print(f"Capturing requests to {directory} (max {max_files} files, anonymize={anonymize}).")
+    return RequestRecorder(directory, max_files, anonymize)
@@ -0,0 +1,767 @@
+"""
+Framework-independent scheduling core.
+
+A request is compiled once into a ProblemInstance: flat numpy arrays over items and
+technicians, with every time already converted to seconds relative to the planning epoch.
+`solve_instance` builds and solves the routing model from those arrays and returns a plain
+SolveResult. Nothing here depends on FastAPI or on the pydantic request/response models, so
+the HTTP layer (main.py), the offline tools and other Python jobs can all call it directly:
+
+    instance = compile_instance(payload)      # anything shaped like OptimizationRequestPayload
+    result = solve_instance(instance, options) # options: resolved OptimizationSolverOptions fields
+
+Invalid input (unparseable times, unknown solver option values) raises InvalidProblemError,
+a ValueError.
+"""
+import time
+from array import array
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from presolve import (
+    TRAVEL_TIME_SENTINEL,
+    REASON_DROPPED_BY_SOLVER,
+    REASON_INELIGIBLE_ASSIGNMENT,
+    REASON_NO_SOLUTION,
+    MIN_CANDIDATE_SUCCESSORS,
+    build_travel_matrix,
+    successor_mask,
+    format_reason_counts,
+    pin_fixed_items,
+    presolve,
+)
+
+class InvalidProblemError(ValueError):
+    """The request can't be solved as given (bad times or solver option values)."""
+
+# --- Time Conversion ---
+
+# Conversions are cached: requests repeat the same shift boundaries and appointment times,
+# so each distinct timestamp is parsed or formatted once.
+@lru_cache(maxsize=4096)
+def iso_to_seconds(iso_str: str) -> int:
+    """Converts ISO 8601 string to seconds since the Unix epoch (UTC)."""
+    dt = datetime.fromisoformat(iso_str)
+    # Ensure dt is offset-aware, defaulting to UTC if naive
+    if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
+        # Strings ending in 'Z' on older Pythons, and truly naive strings, are taken as UTC
+        dt = dt.replace(tzinfo=timezone.utc)
+    # Convert to UTC timestamp (seconds since Unix epoch)
+    return int(dt.timestamp())
+
+@lru_cache(maxsize=4096)
+def seconds_to_iso(seconds: int) -> str:
+    """Converts seconds since the Unix epoch back to ISO 8601 string (UTC)."""
+    dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
+    # Use isoformat() with 'Z' suffix for explicit UTC indication
+    return dt.isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+def time_field_seconds(unix_seconds: Optional[int], iso_str: Optional[str]) -> int:
+    """Returns an optional Unix-seconds field, falling back to parsing its ISO counterpart."""
+    return unix_seconds if unix_seconds is not None else iso_to_seconds(iso_str)
+
+# --- Problem Instance ---
+
+class ProblemInstance:
+    """A compiled request. Item and technician attributes are parallel arrays in payload order."""
+    __slots__ = (
+        "item_ids",           # List[str]
+        "item_location",      # int64 (items): location index
+        "item_duration",      # int64 (items): service seconds
+        "item_priority",      # int64 (items): 1 = highest
+        "item_fixed_time",    # int64 (items): fixed service start relative to the epoch, -1 if none
+        "eligible",           # bool (items x techs): technician listed in eligibleTechnicianIds
+        "tech_ids",           # List[int]
+        "tech_start_location",# int64 (techs)
+        "tech_end_location",  # int64 (techs)
+        "tech_window_start",  # int64 (techs): shift start relative to the epoch
+        "tech_window_end",    # int64 (techs): shift end relative to the epoch
+        "travel_matrix",      # int64 (locations x locations), sentinel for unknown legs
+        "planning_epoch",     # Unix seconds of the earliest shift start; all relative times count from here
+        "num_fixed_constraints",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    def replace(self, **changes) -> "ProblemInstance":
+        """A shallow copy with some fields replaced; unchanged arrays are shared, not copied."""
+        return ProblemInstance(**{**{name: getattr(self, name) for name in self.__slots__}, **changes})
+
+    @property
+    def num_items(self) -> int:
+        return len(self.item_ids)
+
+    @property
+    def num_techs(self) -> int:
+        return len(self.tech_ids)
+
+    @property
+    def num_locations(self) -> int:
+        return self.travel_matrix.shape[0]
+
+    def fixed_items(self) -> List[int]:
+        """Indices of items with a fixed start time."""
+        return np.flatnonzero(self.item_fixed_time >= 0).tolist()
+
+
+def compile_instance(payload, travel_matrix: Optional[np.ndarray] = None) -> ProblemInstance:
+    """
+    Compiles a request (an OptimizationRequestPayload or anything with the same attributes)
+    into a ProblemInstance. `travel_matrix` is an already dense (locations x locations) matrix
+    to use instead of `payload.travelTimeMatrix`. Raises InvalidProblemError if a technician or
+    fixed time can't be parsed.
+    """
+    techs, items = payload.technicians, payload.items
+    num_locations = len(payload.locations)
+
+    # --- Planning Epoch ---
+    # Use the earliest technician start time as the reference point (epoch) for relative time calculations.
+    try:
+        # Absolute shift bounds, read once per technician (Unix fields win over the ISO strings)
+        shifts_abs = [(time_field_seconds(t.earliestStartTimeUnix, t.earliestStartTimeISO),
+                       time_field_seconds(t.latestEndTimeUnix, t.latestEndTimeISO)) for t in techs]
+    except (TypeError, ValueError) as e:
+        raise InvalidProblemError(f"Invalid technician start/end times provided: {e}") from e
+    planning_epoch = min((start for start, _ in shifts_abs), default=0)
+    if techs:
+        print(f"Planning Epoch (Earliest Tech Start): {planning_epoch} ({seconds_to_iso(planning_epoch)})")
+
+    # --- Technician Time Windows (relative to the planning epoch) ---
+    window_start, window_end = [], []
+    for tech, (start_abs, end_abs) in zip(techs, shifts_abs):
+        start_rel = max(0, start_abs - planning_epoch)
+        end_rel = max(0, end_abs - planning_epoch)
+        # Ensure start <= end (basic sanity check)
+        if start_rel > end_rel:
+            print(f"Warning: Technician {tech.id} has relative start time after end time ({start_rel} > {end_rel}). Setting range to [{start_rel}, {start_rel}].")
+            end_rel = start_rel
+        print(f"  Tech {tech.id}: Abs Window [{start_abs}, {end_abs}], Rel Window [{start_rel}, {end_rel}]")
+        window_start.append(start_rel)
+        window_end.append(end_rel)
+
+    # --- Fixed Times (relative to the planning epoch) ---
+    fixed_rel: Dict[str, int] = {}
+    item_ids = {item.id for item in items}
+    for constraint in payload.fixedConstraints:
+        if constraint.itemId not in item_ids:
+            print(f"Warning: Fixed constraint for unknown item ID {constraint.itemId}. Skipping.")
+            continue
+        try:
+            fixed_abs = time_field_seconds(constraint.fixedTimeUnix, constraint.fixedTimeISO)
+        except (TypeError, ValueError) as e:
+            raise InvalidProblemError(f"Invalid fixed time for item {constraint.itemId}: {e}") from e
+        fixed_rel[constraint.itemId] = max(0, fixed_abs - planning_epoch)
+
+    # --- Eligibility ---
+    tech_column = {t.id: v for v, t in enumerate(techs)}
+    eligible = np.zeros((len(items), len(techs)), dtype=bool)
+    for i, item in enumerate(items):
+        eligible[i, [tech_column[t] for t in item.eligibleTechnicianIds if t in tech_column]] = True
+
+    return ProblemInstance(
+        item_ids=[item.id for item in items],
+        item_location=np.array([item.locationIndex for item in items], dtype=np.int64),
+        item_duration=np.array([item.durationSeconds for item in items], dtype=np.int64),
+        item_priority=np.array([item.priority for item in items], dtype=np.int64),
+        item_fixed_time=np.array([fixed_rel.get(item.id, -1) for item in items], dtype=np.int64),
+        eligible=eligible,
+        tech_ids=[t.id for t in techs],
+        tech_start_location=np.array([t.startLocationIndex for t in techs], dtype=np.int64),
+        tech_end_location=np.array([t.endLocationIndex for t in techs], dtype=np.int64),
+        tech_window_start=np.array(window_start, dtype=np.int64),
+        tech_window_end=np.array(window_end, dtype=np.int64),
+        travel_matrix=build_travel_matrix(payload, num_locations, travel_matrix),
+        planning_epoch=planning_epoch,
+        num_fixed_constraints=len(fixed_rel),
+    )
+
+# --- Results ---
+
+class RouteResult:
+    """One technician's route. Stop times are Unix seconds; lists are parallel, one entry per stop."""
+    __slots__ = (
+        "vehicle", "technician_id", "item_indices",
+        "arrival", "start", "end",     # Per stop: arrival, service start, service end
+        "travel", "idle",              # Per stop: travel on the leg into it, waiting before service
+        "total_travel_seconds",        # Includes the leg back to the end location
+        "total_duration_seconds",      # First arrival to last service end
+        "total_idle_seconds",
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+
+class SolveResult:
+    __slots__ = (
+        "status",                # 'success' | 'partial' | 'error'
+        "message",
+        "routes",                # List[RouteResult]
+        "unassigned_item_ids",   # List[str], in payload order
+        "unassigned_reasons",    # item id -> reason code (see presolve.py)
+        "objective_value",       # None if the solver found no solution
+        "solve_time_seconds",    # None if the solver never ran
+        "vehicle_classes",
+        "alternatives",          # List[(objective, [(vehicle, [item index, ...]), ...])], best first
+        "stop_reason",           # STOP_* code for why the search ended; None if the solver never ran
+    )
+
+    def __init__(self, status, message, routes=None, unassigned_item_ids=None, unassigned_reasons=None,
+                 objective_value=None, solve_time_seconds=None, vehicle_classes=None, alternatives=None,
+                 stop_reason=None):
+        self.status = status
+        self.message = message
+        self.routes = routes or []
+        self.unassigned_item_ids = unassigned_item_ids or []
+        self.unassigned_reasons = unassigned_reasons
+        self.objective_value = objective_value
+        self.solve_time_seconds = solve_time_seconds
+        self.vehicle_classes = vehicle_classes
+        self.alternatives = alternatives or []
+        self.stop_reason = stop_reason
+
+    @property
+    def solver_ran(self) -> bool:
+        return self.solve_time_seconds is not None
+
+class SolutionPool:
+    """
+    The best `size` distinct solutions offered to it. Solutions count as the same when every
+    technician serves the same set of items, whatever the order; only the cheapest is kept.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._kept: Dict[frozenset, tuple] = {} # key -> (objective, routes)
+
+    @staticmethod
+    def key(routes) -> frozenset:
+        return frozenset((vehicle, frozenset(items)) for vehicle, items in routes)
+
+    def wants(self, objective: int) -> bool:
+        """Cheap pre-check, so routes are only read for solutions that could be kept."""
+        return len(self._kept) < self.size or objective < max(o for o, _ in self._kept.values())
+
+    def offer(self, objective: int, routes) -> None:
+        """`routes`: ((vehicle, (item index, ...)), ...) for the technicians with stops."""
+        key = self.key(routes)
+        if key in self._kept:
+            if objective < self._kept[key][0]:
+                self._kept[key] = (objective, routes)
+            return
+        self._kept[key] = (objective, routes)
+        if len(self._kept) > self.size:
+            del self._kept[max(self._kept, key=lambda k: self._kept[k][0])]
+
+    def ranked(self, exclude=None) -> list:
+        """Kept solutions, cheapest first, leaving out the one with key `exclude`."""
+        return sorted((v for k, v in self._kept.items() if k != exclude), key=lambda v: v[0])
+
+def describe_outcome(num_unassigned: int, num_items: int):
+    """(status, message) for a solution that left `num_unassigned` of `num_items` items unassigned."""
+    if not num_unassigned:
+        return 'success', 'Optimization successful. All items scheduled.'
+    if num_unassigned < num_items:
+        return 'partial', f'Optimization partially successful. {num_unassigned} items could not be scheduled.'
+    return 'error', 'Optimization failed. No routes could be assigned.' # Nothing could be scheduled
+
+# Why the search ended (SolveResult.stop_reason)
+STOP_TIME_LIMIT = "TIME_LIMIT"             # timeLimitSeconds ran out
+STOP_SOLUTION_LIMIT = "SOLUTION_LIMIT"     # solutionLimit solutions were found
+STOP_STALLED = "STALLED"                   # no relative improvement for stallSeconds / stallSolutions
+STOP_GAP_REACHED = "GAP_REACHED"           # every item assigned and within stopGap of the lower bound
+STOP_SEARCH_COMPLETED = "SEARCH_COMPLETED" # the search itself ran out of moves
+
+class SearchProgress:
+    """
+    Tracks the objective of each solution the search accepts and says when it has stalled:
+    no improvement of at least `min_improvement` (relative) over the reference objective for
+    `stall_seconds` or for `stall_solutions` solutions. Either rule may be None (off).
+    """
+
+    def __init__(self, stall_seconds: Optional[float], stall_solutions: Optional[int], min_improvement: float):
+        self.stall_seconds = stall_seconds
+        self.stall_solutions = stall_solutions
+        self.min_improvement = min_improvement
+        self.solutions = 0
+        self.reference = None # Objective of the last solution that counted as an improvement
+        self.reference_time = None
+        self.reference_solution = 0
+
+    def update(self, objective: int, now: float) -> bool:
+        """Records one solution; True when the search should stop."""
+        self.solutions += 1
+        if self.reference is None or objective < self.reference * (1 - self.min_improvement):
+            self.reference = objective
+            self.reference_time = now
+            self.reference_solution = self.solutions
+            return False
+        return ((self.stall_seconds is not None and now - self.reference_time >= self.stall_seconds)
+                or (self.stall_solutions is not None and self.solutions - self.reference_solution >= self.stall_solutions))
+
+
+def travel_lower_bound(node_travel: np.ndarray, is_item: np.ndarray) -> int:
+    """
+    A lower bound on the travel of any solution that serves every item node: each item is
+    entered once and left once, at least over its cheapest known leg in and out.
+    """
+    legs = np.where(node_travel < TRAVEL_TIME_SENTINEL, node_travel, np.iinfo(np.int64).max)
+    np.fill_diagonal(legs, np.iinfo(np.int64).max)
+    bounds = []
+    for cheapest in (legs[:, is_item].min(axis=0), legs[is_item, :].min(axis=1)):
+        bounds.append(int(np.where(cheapest < np.iinfo(np.int64).max, cheapest, 0).sum()))
+    return max(bounds)
+
+def compact_rows(matrix: np.ndarray) -> List[array]:
+    """
+    The rows of an integer matrix as array('i') objects. They index like nested lists, and
+    slightly faster, but take 4 bytes per entry instead of the ~36 of a list of Python ints.
+    On large days that list was most of a solve's memory.
+    """
+    rows = []
+    for row in matrix.astype(np.int32):
+        compact = array('i')
+        compact.frombytes(row.tobytes())
+        rows.append(compact)
+    return rows
+
+# --- Solve ---
+
+def build_search_parameters(options):
+    """Translates resolved solver options into OR-Tools search parameters. Raises InvalidProblemError for invalid values."""
+    from ortools.constraint_solver import pywrapcp, routing_enums_pb2 # Loaded on first solve (see startup_benchmark.py)
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    try:
+        search_parameters.first_solution_strategy = getattr(
+            routing_enums_pb2.FirstSolutionStrategy, options.firstSolutionStrategy)
+        search_parameters.local_search_metaheuristic = getattr(
+            routing_enums_pb2.LocalSearchMetaheuristic, options.localSearchMetaheuristic)
+    except AttributeError as e:
+        raise InvalidProblemError(f"Unknown solver option value: {e}") from e
+    if options.timeLimitSeconds is None or options.timeLimitSeconds <= 0:
+        raise InvalidProblemError("timeLimitSeconds must be positive.")
+    search_parameters.time_limit.FromMilliseconds(int(options.timeLimitSeconds * 1000))
+    if options.solutionLimit is not None:
+        if options.solutionLimit <= 0:
+            raise InvalidProblemError("solutionLimit must be positive.")
+        search_parameters.solution_limit = options.solutionLimit
+    if options.candidateSuccessors is not None and options.candidateSuccessors <= 0:
+        raise InvalidProblemError("candidateSuccessors must be positive.")
+    if options.stallSeconds is not None and options.stallSeconds <= 0:
+        raise InvalidProblemError("stallSeconds must be positive.")
+    if options.stallSolutions is not None and options.stallSolutions <= 0:
+        raise InvalidProblemError("stallSolutions must be positive.")
+    if options.minRelativeImprovement is not None and not 0 <= options.minRelativeImprovement < 1:
+        raise InvalidProblemError("minRelativeImprovement must be in [0, 1).")
+    if options.stopGap is not None and options.stopGap < 0:
+        raise InvalidProblemError("stopGap must not be negative.")
+    return search_parameters
+
+
+def solve_instance(instance: ProblemInstance, options, alternatives: int = 0,
+                   max_priority: Optional[int] = None) -> SolveResult:
+    """
+    Builds and solves the routing model for a compiled instance. `options` carries the resolved
+    solver option fields (see OptimizationSolverOptions); invalid values raise InvalidProblemError.
+    With `alternatives`, up to that many other distinct solutions seen during the search are
+    returned as well (see SolutionPool). `max_priority` sets the scale of the drop penalties
+    (default: the instance's own highest priority); variants of one base share the base's, so
+    their objectives compare.
+    """
+    from ortools.constraint_solver import pywrapcp, routing_enums_pb2 # Loaded on first solve (see startup_benchmark.py)
+    print(f"Solving instance with {instance.num_items} items and {instance.num_techs} technicians.")
+
+    if not instance.num_items:
+        return SolveResult('success', 'No items provided for scheduling.')
+    if not instance.num_techs:
+        return SolveResult('error', 'No technicians available for scheduling.', unassigned_item_ids=list(instance.item_ids))
+
+    # Strategy, metaheuristic and time limit come from the resolved solver options.
+    # Built up front so invalid option values are rejected before any model work.
+    search_parameters = build_search_parameters(options)
+
+    num_vehicles = instance.num_techs
+    num_items = instance.num_items
+    item_ids = instance.item_ids
+    tech_windows = list(zip(instance.tech_window_start.tolist(), instance.tech_window_end.tolist()))
+    planning_epoch_seconds = instance.planning_epoch
+
+    # --- Pre-solve ---
+    # Drop items no technician can possibly serve before they become routing nodes,
+    # and work out which technicians can serve each remaining item.
+    travel_matrix = instance.travel_matrix
+    presolved = presolve(instance, options.symmetryBreaking)
+    unassigned_reasons = dict(presolved.reasons)
+    if unassigned_reasons:
+        print(f"Pre-solve pruned {len(unassigned_reasons)} of {num_items} items ({format_reason_counts(unassigned_reasons)}).")
+    if not presolved.viable_items:
+        print("No item can be served by any technician. Skipping the solver.")
+        return SolveResult('error', 'Optimization failed. No routes could be assigned.',
+                           unassigned_item_ids=list(item_ids), unassigned_reasons=unassigned_reasons)
+
+    # --- Routing Nodes ---
+    # The first nodes are the distinct technician start/end locations; after them every viable
+    # item gets its own node, even when several items share an address. node_locations maps
+    # each node back to its location index (co-located nodes share a matrix row) and
+    # node_items maps item nodes to their item index.
+    starts = instance.tech_start_location.tolist()
+    ends = instance.tech_end_location.tolist()
+    depot_locations = sorted(set(starts) | set(ends))
+    depot_nodes = {loc: node for node, loc in enumerate(depot_locations)}
+    node_locations = depot_locations + instance.item_location[presolved.viable_items].tolist()
+    node_items = [None] * len(depot_locations) + list(presolved.viable_items)
+    item_nodes = {item_idx: node for node, item_idx in enumerate(node_items) if item_idx is not None}
+
+    # Create the routing index manager.
+    # Start/End nodes are defined per vehicle.
+    manager = pywrapcp.RoutingIndexManager(len(node_locations), num_vehicles,
+                                           [depot_nodes[loc] for loc in starts],
+                                           [depot_nodes[loc] for loc in ends])
+
+    # Create Routing Model.
+    routing = pywrapcp.RoutingModel(manager)
+    if options.randomSeed is not None:
+        routing.solver().ReSeed(options.randomSeed)
+
+    # --- Callbacks ---
+
+    # Node-level lookup tables, built once so the callbacks are plain indexing
+    node_travel_array = travel_matrix[np.ix_(node_locations, node_locations)]
+    # Nodes at the same location are zero travel apart, so co-located items chain for free
+    node_travel_array[np.equal.outer(node_locations, node_locations)] = 0
+    node_travel = compact_rows(node_travel_array)
+    node_service_array = np.zeros(len(node_locations), dtype=np.int64) # Depots have zero service time
+    node_service_array[len(depot_locations):] = instance.item_duration[presolved.viable_items]
+    node_service = node_service_array.tolist()
+
+    # Travel time callback
+    def travel_time_callback(from_index_mgr, to_index_mgr):
+        # Missing or unreachable legs are already the 999999 sentinel in the matrix
+        return node_travel[manager.IndexToNode(from_index_mgr)][manager.IndexToNode(to_index_mgr)]
+
+    transit_callback_index = routing.RegisterTransitCallback(travel_time_callback)
+    # Arc cost is based *only* on travel time
+    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+
+    # Service time (demand) callback
+    def service_time_callback(index_mgr):
+        return node_service[manager.IndexToNode(index_mgr)]
+
+    # Combined Transit + Service Time Callback for Time Dimension
+    def transit_plus_service_time_callback(from_index_mgr, to_index_mgr):
+        """Returns travel_time(from, to) + service_time(from)."""
+        travel = travel_time_callback(from_index_mgr, to_index_mgr)
+        service = service_time_callback(from_index_mgr)
+        # Add safety check for large costs indicating errors
+        if travel >= TRAVEL_TIME_SENTINEL or service >= TRAVEL_TIME_SENTINEL:
+             return TRAVEL_TIME_SENTINEL # Propagate large cost if inputs were invalid
+        return travel + service
+
+    # Register the combined callback
+    combined_time_callback_index = routing.RegisterTransitCallback(transit_plus_service_time_callback)
+
+    # --- Dimensions ---
+
+    # Time Dimension
+    # Each technician's cumul is capped at the end of their own shift; nothing in the model
+    # can happen after the latest shift end, so there is no need for any extra buffer.
+    vehicle_horizons = [max(0, window_end) for _, window_end in tech_windows]
+
+    routing.AddDimensionWithVehicleCapacity(
+        combined_time_callback_index, # Use combined travel + service time for dimension propagation
+        max(vehicle_horizons),  # Slack = waiting before a stop (e.g. for a fixed appointment)
+        # Provide a list of capacities, one for each vehicle
+        vehicle_horizons,
+        False,  # start cumul to zero = False (start times vary based on tech availability)
+        "Time"
+    )
+    time_dimension = routing.GetDimensionOrDie("Time")
+    # With waiting allowed the start times of a route are no longer unique; have the finalizer
+    # pick the earliest ones so every stop starts as soon as the technician can be there.
+    for index in range(routing.Size()):
+        routing.AddVariableMinimizedByFinalizer(time_dimension.CumulVar(index))
+    for v in range(num_vehicles):
+        routing.AddVariableMinimizedByFinalizer(time_dimension.CumulVar(routing.End(v)))
+
+    # --- Constraints ---
+
+    # Technician Time Windows
+    for i, (start_seconds_rel, end_seconds_rel) in enumerate(tech_windows):
+        time_dimension.CumulVar(routing.Start(i)).SetRange(start_seconds_rel, end_seconds_rel)
+        time_dimension.CumulVar(routing.End(i)).SetRange(start_seconds_rel, end_seconds_rel)
+
+    # Item Time Windows
+    # Bound every item's service start by the union of the windows of the technicians that can
+    # serve it (from the pre-solve). These are implied constraints, but stating them lets the
+    # solver reject infeasible insertions without propagating whole routes.
+    for item_idx, node in item_nodes.items():
+        time_dimension.CumulVar(manager.NodeToIndex(node)).SetRange(
+            int(presolved.window_start[item_idx]), int(presolved.window_end[item_idx]))
+
+    # Fixed Time Constraints
+    for item_idx in instance.fixed_items():
+        if item_idx not in item_nodes:
+            continue # Pruned by pre-solve
+        solver_index = manager.NodeToIndex(item_nodes[item_idx])
+        fixed_time_seconds_rel = int(instance.item_fixed_time[item_idx])
+        # For a fixed time, the range is [fixed_time_rel, fixed_time_rel]
+        time_dimension.CumulVar(solver_index).SetRange(fixed_time_seconds_rel, fixed_time_seconds_rel)
+        print(f"Applied fixed time constraint for item {item_ids[item_idx]} at index {solver_index} to be {fixed_time_seconds_rel}s (relative)")
+
+    # Fixed Item Skeleton
+    # Fixed-time items are assigned to technicians before the search (see pin_fixed_items).
+    # Dropping a pinned item costs more than dropping every other item combined, so the search
+    # fills the gaps around the skeleton instead of rediscovering it. The greedy assignment
+    # itself is only binding for items that one technician alone may serve: any other pinned
+    # item keeps all its technicians, so the search can move it out of the way of a fixed item
+    # the greedy pass left unpinned.
+    pinned_items = pin_fixed_items(instance, presolved)
+    if pinned_items:
+        print(f"Pinned {len(pinned_items)} of {instance.num_fixed_constraints} fixed-time items to technicians.")
+
+    # Technician Eligibility (Allowed Vehicles) & Priority Penalties (Disjunctions)
+
+    # OR-Tools handles priority via penalties for dropping nodes: a higher penalty means the
+    # item is less likely to be dropped (priority 1 = highest, so it gets the largest penalty).
+    # Ensure penalty outweighs reasonable travel times. If max travel is ~1hr (3600s), penalty should be higher.
+    # Defaults to 100000; requests or the loaded solver profile may override it.
+    if max_priority is None:
+        max_priority = int(instance.item_priority.max())
+    base_penalty = options.basePenalty
+    # Larger than the penalties of all other items together
+    pinned_penalty = base_penalty * (max_priority + 1) * (num_items + 1)
+
+    # Item nodes are never start/end nodes (even for items at a depot address), so every
+    # one of them may safely get a disjunction.
+    for item_idx in presolved.viable_items:
+        solver_index = manager.NodeToIndex(item_nodes[item_idx])
+
+        # Only technicians who are eligible AND can reach the item within their shift may visit it
+        # (minus symmetric duplicates among interchangeable technicians).
+        # (Same effect as SetAllowedVehiclesForIndex, whose Python binding rejects lists in some
+        # OR-Tools releases; -1 keeps the node droppable through its disjunction.)
+        routing.VehicleVar(solver_index).SetValues([-1] + presolved.vehicles_for(item_idx))
+
+        priority_penalty = base_penalty * (max_priority - int(instance.item_priority[item_idx]) + 1)
+        # Ensure penalty is non-negative
+        if priority_penalty < 0:
+            print(f"Warning: Calculated negative penalty ({priority_penalty}) for item {item_ids[item_idx]}. Clamping to 0.")
+            priority_penalty = 0
+        if item_idx in pinned_items:
+            priority_penalty = pinned_penalty
+
+        # Allow the solver to drop the item with the calculated penalty.
+        # max_cardinality=1 means at most one technician will serve this item.
+        try:
+             routing.AddDisjunction([solver_index], priority_penalty, 1)
+             print(f"Added disjunction for item {item_ids[item_idx]} (idx {solver_index}), penalty {priority_penalty}, max_card=1")
+        except Exception as e:
+             print(f"!!! CRITICAL ERROR adding disjunction for item {item_ids[item_idx]} (locIdx: {instance.item_location[item_idx]}, solverIdx: {solver_index}, penalty: {priority_penalty}): {e}")
+             raise
+
+    # --- Arc Filtering ---
+    # Sentinel (unknown/unreachable) legs and legs that can't meet the next stop's window are
+    # removed from the successor domains outright, instead of staying in as expensive arcs the
+    # search keeps evaluating. With candidateSuccessors, items additionally keep only their
+    # nearest item neighbours. A start may always go straight to its own end (an unused technician).
+    candidate_successors = options.candidateSuccessors
+    if candidate_successors is not None and candidate_successors < MIN_CANDIDATE_SUCCESSORS:
+        print(f"Warning: candidateSuccessors={candidate_successors} is too small to keep good routes. Using {MIN_CANDIDATE_SUCCESSORS}.")
+        candidate_successors = MIN_CANDIDATE_SUCCESSORS
+    is_item_node = np.array([item_idx is not None for item_idx in node_items])
+    latest_end = max(window_end for _, window_end in tech_windows)
+    node_window_start = np.array([presolved.window_start[i] if i is not None else 0 for i in node_items], dtype=np.int64)
+    node_window_end = np.array([presolved.window_end[i] if i is not None else latest_end for i in node_items], dtype=np.int64)
+    arc_mask = successor_mask(node_travel_array, node_service_array, node_window_start,
+                              node_window_end, is_item_node, candidate_successors)
+
+    num_indices = routing.Size() + num_vehicles # End indices come after all others
+    index_nodes = np.array([manager.IndexToNode(i) for i in range(num_indices)])
+    allowed_arcs = arc_mask[np.ix_(index_nodes, index_nodes)]
+    for v in range(num_vehicles):
+        allowed_arcs[routing.Start(v), routing.End(v)] = True
+    removed_arcs = 0
+    for index in range(routing.Size()):
+        forbidden = np.flatnonzero(~allowed_arcs[index])
+        if forbidden.size:
+            routing.NextVar(index).RemoveValues(forbidden.tolist())
+            removed_arcs += forbidden.size
+    print(f"Removed {removed_arcs} of {routing.Size() * num_indices} arcs (candidateSuccessors={candidate_successors}).")
+
+    # --- Vehicle Classes ---
+    # Interchangeable technicians share the evaluators registered above, so OR-Tools puts
+    # them in one vehicle class and evaluates insertions once per class rather than per vehicle.
+    # Any symmetry-breaking restrictions are already part of the allowed vehicles above.
+    if presolved.vehicle_groups:
+        group_sizes = ", ".join(str(len(g)) for g in presolved.vehicle_groups)
+        print(f"Interchangeable technician groups: [{group_sizes}] (symmetry breaking: {options.symmetryBreaking}).")
+
+    # --- Solution Callback ---
+    # Every solution the search accepts passes through here. With alternatives, the pool keeps
+    # the best distinct ones (one more than asked for, since the final solution is among them).
+    # With stopping rules, the search is finished early once it stalls or is close enough to
+    # the lower bound; the best solution so far is what it returns. The rules are only checked
+    # when a solution arrives, since a limit polled by OR-Tools would call into Python per move.
+    solution_pool = SolutionPool(alternatives + 1) if alternatives > 0 else None
+    progress = None
+    if options.stallSeconds is not None or options.stallSolutions is not None:
+        progress = SearchProgress(options.stallSeconds, options.stallSolutions, options.minRelativeImprovement or 0.0)
+    stop_gap = options.stopGap
+    if stop_gap is not None:
+        lower_bound = travel_lower_bound(node_travel_array, is_item_node)
+        item_indices = [manager.NodeToIndex(node) for node in np.flatnonzero(is_item_node).tolist()]
+    stopped_by = [] # The STOP_* code of the rule that finished the search
+
+    def on_solution():
+        objective = routing.CostVar().Value() # Only valid once the model is closed, i.e. during the solve
+        if solution_pool is not None and solution_pool.wants(objective):
+            routes = []
+            for v in range(num_vehicles):
+                index = routing.NextVar(routing.Start(v)).Value()
+                items = []
+                while not routing.IsEnd(index):
+                    items.append(node_items[manager.IndexToNode(index)])
+                    index = routing.NextVar(index).Value()
+                if items:
+                    routes.append((v, tuple(items)))
+            solution_pool.offer(objective, tuple(routes))
+        if stopped_by:
+            return
+        if stop_gap is not None and objective - lower_bound <= stop_gap * objective and all(
+                routing.ActiveVar(index).Value() for index in item_indices):
+            stopped_by.append(STOP_GAP_REACHED)
+        elif progress is not None and progress.update(objective, time.perf_counter()):
+            stopped_by.append(STOP_STALLED)
+        if stopped_by:
+            routing.solver().FinishCurrentSearch()
+
+    if solution_pool is not None or progress is not None or stop_gap is not None:
+        routing.AddAtSolutionCallback(on_solution)
+
+    # --- Solve ---
+
+    print("Starting OR-Tools solver...")
+    solve_started = time.perf_counter()
+    assignment = routing.SolveWithParameters(search_parameters)
+    solve_time_seconds = time.perf_counter() - solve_started
+    vehicle_classes = routing.GetVehicleClassesCount()
+    stop_reason = stopped_by[0] if stopped_by else None
+    if stop_reason is None:
+        # The routing status says whether a limit cut the search short, but not which one: the
+        # solution count decides the solution limit, the routing model's own limit the time limit.
+        search_status = routing_enums_pb2.RoutingSearchStatus
+        status = routing.status()
+        if status == search_status.ROUTING_FAIL_TIMEOUT:
+            stop_reason = STOP_TIME_LIMIT
+        elif options.solutionLimit is not None and routing.solver().Solutions() >= options.solutionLimit:
+            stop_reason = STOP_SOLUTION_LIMIT
+        elif status == search_status.ROUTING_PARTIAL_SUCCESS_LOCAL_OPTIMUM_NOT_REACHED or routing.CheckLimit():
+            stop_reason = STOP_TIME_LIMIT
+        else:
+            stop_reason = STOP_SEARCH_COMPLETED
+    print(f"Solver finished ({stop_reason}).")
+
+    if not assignment:
+        print("No solution found by the solver.")
+        return SolveResult(
+            'error', 'Optimization failed. No solution found.',
+            unassigned_item_ids=list(item_ids), # All items are unassigned
+            unassigned_reasons={item_id: unassigned_reasons.get(item_id, REASON_NO_SOLUTION) for item_id in item_ids},
+            solve_time_seconds=solve_time_seconds,
+            vehicle_classes=vehicle_classes,
+            stop_reason=stop_reason,
+        )
+
+    # --- Process Results ---
+    print("Solution found.")
+    routes: List[RouteResult] = []
+    assigned = np.zeros(num_items, dtype=bool)
+    for vehicle_id in range(num_vehicles):
+        # --- Collect the route once: solver indices and their cumuls, start to end ---
+        indices = [routing.Start(vehicle_id)]
+        while not routing.IsEnd(indices[-1]):
+            indices.append(assignment.Value(routing.NextVar(indices[-1])))
+        if len(indices) == 2:
+            continue # Unused technician
+        nodes = np.array([manager.IndexToNode(i) for i in indices])
+        cumuls = np.array([assignment.Value(time_dimension.CumulVar(i)) for i in indices], dtype=np.int64)
+
+        # --- Per-leg array math (leg k goes from nodes[k] to nodes[k+1]) ---
+        leg_travel = node_travel_array[nodes[:-1], nodes[1:]]
+        leg_travel = np.where(leg_travel < TRAVEL_TIME_SENTINEL, leg_travel, 0) # Sentinel legs never count as travel
+        # The technician leaves the start at the beginning of their shift, and every later
+        # stop when its service ends; the solver's cumul is when service actually starts.
+        departures = cumuls[:-1] + node_service_array[nodes[:-1]]
+        departures[0] = tech_windows[vehicle_id][0]
+        arrivals = departures + leg_travel
+        idle = np.maximum(cumuls[1:] - arrivals, 0) # Waiting before service (e.g. for a fixed time)
+
+        # Stops are every node between start and end; depot nodes never appear mid-route
+        stop_items = [node_items[node] for node in nodes[1:-1].tolist()]
+        stop_arrivals = arrivals[:-1] + planning_epoch_seconds
+        stop_starts = cumuls[1:-1] + planning_epoch_seconds
+        stop_ends = stop_starts + instance.item_duration[stop_items]
+        total_idle = int(idle[:-1].sum())
+        print(f"Vehicle {vehicle_id}: {len(stop_items)} stops, travel {int(leg_travel.sum())}s, idle {total_idle}s")
+
+        # Re-verify technician eligibility (should be guaranteed by solver if model is correct, but good practice)
+        ineligible = [item_idx for item_idx in stop_items if not instance.eligible[item_idx, vehicle_id]]
+        if ineligible:
+            print(f"Error: Solver assigned items {[item_ids[i] for i in ineligible]} to ineligible technician {instance.tech_ids[vehicle_id]}. Route invalid.")
+            # Mark items from this invalid route as unassigned
+            for item_idx in stop_items:
+                unassigned_reasons[item_ids[item_idx]] = REASON_INELIGIBLE_ASSIGNMENT
+            continue
+
+        assigned[stop_items] = True
+        routes.append(RouteResult(
+            vehicle=vehicle_id,
+            technician_id=instance.tech_ids[vehicle_id],
+            item_indices=stop_items,
+            arrival=stop_arrivals.tolist(),
+            start=stop_starts.tolist(),
+            end=stop_ends.tolist(),
+            travel=leg_travel[:-1].tolist(),
+            idle=idle[:-1].tolist(),
+            total_travel_seconds=int(leg_travel.sum()), # Includes the leg back to the end location
+            total_duration_seconds=int(stop_ends[-1] - stop_arrivals[0]), # First arrival to last service end
+            total_idle_seconds=total_idle,
+        ))
+
+    # --- After processing all vehicles ---
+    assigned_ids = {item_ids[i] for i in np.flatnonzero(assigned).tolist()}
+    unassigned_item_ids = [item_id for item_id in item_ids if item_id not in assigned_ids]
+    for item_id in unassigned_item_ids:
+        unassigned_reasons.setdefault(item_id, REASON_DROPPED_BY_SOLVER)
+
+    status, message = describe_outcome(len(unassigned_item_ids), num_items)
+    if status == 'partial':
+        print(f"Unassigned items: {unassigned_item_ids}")
+    elif status == 'error':
+        print(f"All items were unassigned.")
+    print(f"Solver finished. Final Objective Value: {assignment.ObjectiveValue()}")
+
+    found_alternatives = []
+    if solution_pool is not None:
+        final_key = SolutionPool.key((route.vehicle, route.item_indices) for route in routes)
+        found_alternatives = [(objective, [(vehicle, list(items)) for vehicle, items in alternative])
+                              for objective, alternative in solution_pool.ranked(exclude=final_key)][:alternatives]
+        print(f"Kept {len(found_alternatives)} alternative solutions.")
+
+    return SolveResult(
+        status, message,
+        routes=routes,
+        unassigned_item_ids=unassigned_item_ids,
+        unassigned_reasons={item_id: unassigned_reasons[item_id] for item_id in unassigned_item_ids},
+        objective_value=assignment.ObjectiveValue(),
+        solve_time_seconds=solve_time_seconds,
+        vehicle_classes=vehicle_classes,
+        alternatives=found_alternatives,
+        stop_reason=stop_reason,
+    )
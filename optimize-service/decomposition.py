@@ -0,0 +1,125 @@
+"""
+Solving one large instance as several independent geographic parts.
+
+Used when a request's solve would not fit in the memory budget (memory_guard.py). Solve memory
+grows with the square of the routing node count, so a part with 1/k of the nodes needs about
+1/k² of it, and the parts are solved one after another.
+
+Technicians are grouped around k far-apart start locations. Each item then goes to the part
+whose eligible technicians start nearest to it, within that part's share of the items (in
+proportion to its technicians). Items with the least to lose by moving go last, so they are the
+ones that spill over. Every part gets an equal share of the time limit, so the request still
+finishes in about `timeLimitSeconds`. Routes can't cross parts, so the result is usually somewhat
+worse than a single solve would give.
+"""
+import copy
+from typing import List, Tuple
+
+import numpy as np
+
+from core import ProblemInstance, SolveResult, describe_outcome, solve_instance
+from presolve import REASON_DROPPED_BY_SOLVER, TRAVEL_TIME_SENTINEL
+
+
+def partition(instance: ProblemInstance, parts: int) -> List[Tuple[List[int], List[int]]]:
+    """Splits items and technicians into `parts` groups: [(item indices, technician indices)], none empty of technicians."""
+    parts = max(1, min(parts, instance.num_techs))
+    starts = instance.tech_start_location
+    # Only the blocks of the matrix needed here are read, never a copy of the whole matrix
+    between_starts = np.minimum(instance.travel_matrix[np.ix_(starts, starts)], TRAVEL_TIME_SENTINEL)
+
+    # --- Technicians: farthest-point seeds, then each technician to its nearest seed ---
+    seeds = [0]
+    distance = between_starts[0].copy()
+    for _ in range(1, parts):
+        distance[seeds[-1]] = -1 # Never picked twice, even when start locations coincide
+        seeds.append(int(np.argmax(distance)))
+        distance = np.minimum(distance, between_starts[seeds[-1]])
+    tech_part = np.argmin(between_starts[seeds], axis=0)
+    tech_part[seeds] = np.arange(parts) # Every seed keeps its own part, even when start locations coincide
+
+    # --- Items: nearest eligible part, most regret first, up to each part's share ---
+    # cost[i, p]: travel from the nearest start of an eligible technician in part p to item i
+    to_item = np.minimum(instance.travel_matrix[np.ix_(starts, instance.item_location)].T, TRAVEL_TIME_SENTINEL)
+    to_item = np.where(instance.eligible, to_item, np.iinfo(np.int64).max)
+    cost = np.full((instance.num_items, parts), np.iinfo(np.int64).max)
+    for p in range(parts):
+        in_part = tech_part == p
+        if in_part.any():
+            cost[:, p] = to_item[:, in_part].min(axis=1)
+    ranked = np.argsort(cost, axis=1, kind="stable")
+    best = np.take_along_axis(cost, ranked[:, :1], axis=1)[:, 0]
+    second = np.take_along_axis(cost, ranked[:, 1:2], axis=1)[:, 0] if parts > 1 else best
+    regret = np.where(second == np.iinfo(np.int64).max, np.iinfo(np.int64).max, second - best)
+    techs_per_part = np.bincount(tech_part, minlength=parts)
+    capacity = np.ceil(instance.num_items * techs_per_part / instance.num_techs).astype(np.int64)
+    item_part = np.empty(instance.num_items, dtype=np.int64)
+    for i in np.argsort(-regret, kind="stable").tolist():
+        choices = [p for p in ranked[i].tolist() if cost[i, p] < np.iinfo(np.int64).max]
+        open_choices = [p for p in choices if capacity[p] > 0]
+        # No eligible part has room: the nearest one takes it anyway; no eligible part at all: any
+        part = (open_choices or choices or [int(np.argmax(capacity))])[0]
+        capacity[part] -= 1
+        item_part[i] = part
+
+    return [(np.flatnonzero(item_part == p).tolist(), np.flatnonzero(tech_part == p).tolist()) for p in range(parts)]
+
+
+def subset(instance: ProblemInstance, items: List[int], techs: List[int]) -> ProblemInstance:
+    """The instance restricted to some items and technicians; the matrix and epoch are shared."""
+    return instance.replace(
+        item_ids=[instance.item_ids[i] for i in items],
+        item_location=instance.item_location[items],
+        item_duration=instance.item_duration[items],
+        item_priority=instance.item_priority[items],
+        item_fixed_time=instance.item_fixed_time[items],
+        eligible=instance.eligible[np.ix_(items, techs)],
+        tech_ids=[instance.tech_ids[v] for v in techs],
+        tech_start_location=instance.tech_start_location[techs],
+        tech_end_location=instance.tech_end_location[techs],
+        tech_window_start=instance.tech_window_start[techs],
+        tech_window_end=instance.tech_window_end[techs],
+        num_fixed_constraints=int((instance.item_fixed_time[items] >= 0).sum()),
+    )
+
+
+def solve_decomposed(instance: ProblemInstance, options, parts: int) -> SolveResult:
+    """Solves the instance as `parts` independent parts, one after another, and merges the results."""
+    groups = partition(instance, parts)
+    part_options = copy.copy(options)
+    part_options.timeLimitSeconds = options.timeLimitSeconds / len(groups)
+    print(f"Solving {instance.num_items} items in {len(groups)} parts of "
+          f"{', '.join(str(len(items)) for items, _ in groups)} items, {part_options.timeLimitSeconds:.2f}s each.")
+
+    routes, reasons, objectives = [], {}, []
+    solve_time, vehicle_classes, largest, stop_reason = 0.0, 0, -1, None
+    for items, techs in groups:
+        result = solve_instance(subset(instance, items, techs), part_options)
+        for route in result.routes: # Back to the full instance's indices
+            route.vehicle = techs[route.vehicle]
+            route.item_indices = [items[i] for i in route.item_indices]
+        routes.extend(result.routes)
+        for item_id in result.unassigned_item_ids:
+            reasons[item_id] = (result.unassigned_reasons or {}).get(item_id, REASON_DROPPED_BY_SOLVER)
+        if result.objective_value is not None:
+            objectives.append(result.objective_value)
+        if result.solver_ran:
+            solve_time += result.solve_time_seconds
+            vehicle_classes += result.vehicle_classes or 0
+            if len(items) > largest: # The largest part's stop reason stands for the request
+                largest, stop_reason = len(items), result.stop_reason
+
+    routes.sort(key=lambda route: route.vehicle)
+    unassigned = set(reasons)
+    unassigned_item_ids = [item_id for item_id in instance.item_ids if item_id in unassigned]
+    status, message = describe_outcome(len(unassigned_item_ids), instance.num_items)
+    return SolveResult(
+        status, message,
+        routes=routes,
+        unassigned_item_ids=unassigned_item_ids,
+        unassigned_reasons={item_id: reasons[item_id] for item_id in unassigned_item_ids},
+        objective_value=sum(objectives) if objectives else None,
+        solve_time_seconds=solve_time if largest >= 0 else None,
+        vehicle_classes=vehicle_classes or None,
+        stop_reason=stop_reason,
+    )
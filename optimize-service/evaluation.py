@@ -0,0 +1,233 @@
+"""
+Route evaluation: stop times, totals and constraint violations for given stop sequences,
+without a solve.
+
+Dispatchers edit routes by hand; this checks the edited plans against the same rules the
+solver's model uses (core.py):
+
+- a technician leaves their start location at the start of their shift,
+- service starts on arrival, or at its fixed time for fixed-time items (waiting if early),
+- every leg takes its travel-matrix time (co-located stops are 0 apart),
+- the technician must be back at their end location by the end of their shift,
+- only eligible technicians may serve an item.
+
+Every stop of every plan is evaluated in one pass of array operations, so checking many
+candidate plans costs little more than checking one.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core import ProblemInstance, RouteResult
+from presolve import REASON_INVALID_LOCATION, TRAVEL_TIME_SENTINEL
+
+# Violation codes reported per plan
+VIOLATION_UNKNOWN_TECHNICIAN = "UNKNOWN_TECHNICIAN"     # technicianId is not in the payload; the route is skipped
+VIOLATION_DUPLICATE_TECHNICIAN = "DUPLICATE_TECHNICIAN" # the technician has another route in the plan; this one is skipped
+VIOLATION_UNKNOWN_ITEM = "UNKNOWN_ITEM"                 # itemId is not in the payload; the stop is skipped
+VIOLATION_INVALID_LOCATION = REASON_INVALID_LOCATION    # the item's locationIndex is out of range; the stop is skipped
+VIOLATION_DUPLICATE_ITEM = "DUPLICATE_ITEM"             # the item was already visited earlier in the plan
+VIOLATION_INELIGIBLE = "INELIGIBLE_TECHNICIAN"          # the technician is not eligible for the item
+VIOLATION_UNREACHABLE = "UNREACHABLE"                   # the leg into the stop (or to the end location) has no travel time
+VIOLATION_FIXED_TIME = "FIXED_TIME_MISSED"              # arrival after the item's fixed time; amount = seconds late
+VIOLATION_SHIFT_END = "SHIFT_END_EXCEEDED"              # back at the end location after the shift; amount = seconds over
+
+# Segmented running maximum: every route's values are shifted SEGMENT_OFFSET above the previous
+# route's, so one np.maximum.accumulate never carries a maximum across routes.
+_NO_FIXED_TIME = -(2 ** 40)
+_SEGMENT_OFFSET = 2 ** 42
+
+# A plan as evaluate_plans takes it: (technician id, item ids in visiting order) per route
+PlanRoutes = Sequence[Tuple[int, Sequence[str]]]
+
+
+class Violation:
+    __slots__ = ("code", "technician_id", "item_id", "amount_seconds")
+
+    def __init__(self, code: str, technician_id: Optional[int] = None, item_id: Optional[str] = None,
+                 amount_seconds: Optional[int] = None):
+        self.code = code
+        self.technician_id = technician_id
+        self.item_id = item_id
+        self.amount_seconds = amount_seconds
+
+
+class PlanResult:
+    __slots__ = (
+        "routes",               # List[RouteResult] with computed times (Unix seconds)
+        "unassigned_item_ids",  # Payload items no route visits, in payload order
+        "violations",           # List[Violation]
+        "total_travel_seconds",
+        "total_idle_seconds",
+    )
+
+    def __init__(self, routes, unassigned_item_ids, violations, total_travel_seconds, total_idle_seconds):
+        self.routes = routes
+        self.unassigned_item_ids = unassigned_item_ids
+        self.violations = violations
+        self.total_travel_seconds = total_travel_seconds
+        self.total_idle_seconds = total_idle_seconds
+
+    @property
+    def feasible(self) -> bool:
+        return not self.violations
+
+
+def evaluate_plans(instance: ProblemInstance, plans: Sequence[PlanRoutes]) -> List[PlanResult]:
+    """Evaluates each plan's routes against `instance`; plans are independent of each other."""
+    num_locations = instance.num_locations
+    valid_location = ((instance.item_location >= 0) & (instance.item_location < num_locations)).tolist()
+    # Only items that can be visited; the others are sorted out in _resolve_stops
+    item_index = {item_id: i for i, item_id in enumerate(instance.item_ids) if valid_location[i]}
+    tech_index = {tech_id: v for v, tech_id in enumerate(instance.tech_ids)}
+
+    # --- Resolve ids; collect every route's stops ---
+    violations: List[List[Violation]] = [[] for _ in plans]
+    routes = [] # (plan, vehicle, item indices)
+    for p, plan in enumerate(plans):
+        used_techs, visited = set(), set()
+        for tech_id, item_ids in plan:
+            vehicle = tech_index.get(tech_id)
+            if vehicle is None or vehicle in used_techs:
+                code = VIOLATION_UNKNOWN_TECHNICIAN if vehicle is None else VIOLATION_DUPLICATE_TECHNICIAN
+                violations[p].append(Violation(code, technician_id=tech_id))
+                continue
+            used_techs.add(vehicle)
+            stops = [item_index.get(item_id, -1) for item_id in item_ids]
+            route_items = set(stops)
+            if -1 in route_items or len(route_items) < len(stops) or not visited.isdisjoint(route_items):
+                stops = _resolve_stops(instance, tech_id, item_ids, visited, violations[p])
+            else:
+                visited |= route_items
+            if stops:
+                routes.append((p, vehicle, stops))
+
+    results = [PlanResult([], [], violations[p], 0, 0) for p in range(len(plans))]
+    if routes:
+        _evaluate_routes(instance, routes, results)
+    for result in results:
+        unvisited = np.ones(instance.num_items, dtype=bool)
+        for route in result.routes:
+            unvisited[route.item_indices] = False
+        result.unassigned_item_ids = [instance.item_ids[i] for i in np.flatnonzero(unvisited).tolist()]
+    return results
+
+
+def _resolve_stops(instance: ProblemInstance, tech_id: int, item_ids: Sequence[str], visited: set,
+                   violations: List[Violation]) -> List[int]:
+    """Slow path for a route with unknown, unvisitable or repeated items: reports each one."""
+    item_index = {item_id: i for i, item_id in enumerate(instance.item_ids)}
+    stops = []
+    for item_id in item_ids:
+        i = item_index.get(item_id)
+        if i is None:
+            violations.append(Violation(VIOLATION_UNKNOWN_ITEM, tech_id, item_id))
+            continue
+        if not 0 <= instance.item_location[i] < instance.num_locations:
+            violations.append(Violation(VIOLATION_INVALID_LOCATION, tech_id, item_id))
+            continue
+        if i in visited:
+            violations.append(Violation(VIOLATION_DUPLICATE_ITEM, tech_id, item_id))
+        visited.add(i)
+        stops.append(i)
+    return stops
+
+
+def _evaluate_routes(instance: ProblemInstance, routes, results: List[PlanResult]) -> None:
+    """Times every route in one vectorized pass and appends routes, totals and violations to `results`."""
+    # --- Flat point arrays: per route, its start location, its stops, its end location ---
+    lengths = np.array([len(stops) + 2 for _, _, stops in routes])
+    first = np.concatenate(([0], np.cumsum(lengths)[:-1])) # Index of each route's start point
+    last = first + lengths - 1                                # Index of each route's end point
+    vehicles = np.array([vehicle for _, vehicle, _ in routes])
+    route_of_point = np.repeat(np.arange(len(routes)), lengths)
+    points = []
+    for _, _, stops in routes:
+        points.append(-1)
+        points.extend(stops)
+        points.append(-1)
+    item_of_point = np.array(points, dtype=np.int64) # -1 at starts and ends
+    is_stop = item_of_point >= 0
+    stop_items = item_of_point[is_stop]
+
+    location = np.empty_like(item_of_point)
+    location[first] = instance.tech_start_location[vehicles]
+    location[last] = instance.tech_end_location[vehicles]
+    location[is_stop] = instance.item_location[stop_items]
+    service = np.zeros_like(item_of_point)
+    service[is_stop] = instance.item_duration[stop_items]
+    fixed = np.full_like(item_of_point, _NO_FIXED_TIME)
+    fixed[is_stop] = np.where(instance.item_fixed_time[stop_items] >= 0, instance.item_fixed_time[stop_items], _NO_FIXED_TIME)
+    fixed[first] = instance.tech_window_start[vehicles] # Leaving the start location when the shift starts
+
+    # --- Legs: point k is reached from point k-1 (nothing leads into a route's start) ---
+    leg = instance.travel_matrix[location[:-1], location[1:]]
+    travel = np.concatenate(([0], leg))
+    travel[first] = 0
+    unreachable = travel >= TRAVEL_TIME_SENTINEL
+    travel[unreachable] = 0 # Unknown legs never count as travel (as in core.solve_instance)
+    increment = travel.copy()
+    increment[1:] += service[:-1]
+    increment[first] = 0
+
+    # --- Times: start_k = max(arrival_k, fixed_k) = C_k + max over j <= k of (fixed_j - C_j),
+    # with C the running sum of increments within the route ---
+    cumulative = np.cumsum(increment)
+    cumulative -= np.repeat(cumulative[first], lengths)
+    slack = np.where(fixed > _NO_FIXED_TIME, fixed - cumulative, _NO_FIXED_TIME) + route_of_point * _SEGMENT_OFFSET
+    start = cumulative + np.maximum.accumulate(slack) - route_of_point * _SEGMENT_OFFSET
+    arrival = start.copy()
+    arrival[1:] = start[:-1] + increment[1:]
+    arrival[first] = start[first]
+    idle = start - arrival
+    end = start + service
+
+    # --- Violations, in route and stop order ---
+    tech_ids = instance.tech_ids
+    item_ids = instance.item_ids
+    late = is_stop & (fixed > _NO_FIXED_TIME) & (arrival > fixed)
+    ineligible = np.zeros_like(is_stop)
+    ineligible[is_stop] = ~instance.eligible[stop_items, vehicles[route_of_point[is_stop]]]
+    overrun = np.zeros_like(is_stop)
+    overrun[last] = arrival[last] > instance.tech_window_end[vehicles]
+    flagged = np.flatnonzero(unreachable | late | ineligible | overrun).tolist()
+    for k in flagged:
+        r = int(route_of_point[k])
+        p, vehicle = routes[r][0], routes[r][1]
+        item_id = item_ids[item_of_point[k]] if is_stop[k] else None
+        if ineligible[k]:
+            results[p].violations.append(Violation(VIOLATION_INELIGIBLE, tech_ids[vehicle], item_id))
+        if unreachable[k]:
+            results[p].violations.append(Violation(VIOLATION_UNREACHABLE, tech_ids[vehicle], item_id))
+        if late[k]:
+            results[p].violations.append(Violation(VIOLATION_FIXED_TIME, tech_ids[vehicle], item_id,
+                                                   int(arrival[k] - fixed[k])))
+        if overrun[k]:
+            results[p].violations.append(Violation(VIOLATION_SHIFT_END, tech_ids[vehicle], None,
+                                                   int(arrival[k] - instance.tech_window_end[vehicle])))
+
+    # --- Per-route totals and results ---
+    epoch = instance.planning_epoch
+    route_travel = np.add.reduceat(travel, first).tolist()
+    route_idle = np.add.reduceat(np.where(is_stop, idle, 0), first).tolist()
+    arrival_abs = (arrival + epoch).tolist()
+    start_abs = (start + epoch).tolist()
+    end_abs = (end + epoch).tolist()
+    travel_list, idle_list = travel.tolist(), idle.tolist()
+    for (p, vehicle, stops), lo, hi, travel_seconds, idle_seconds in zip(
+            routes, (first + 1).tolist(), last.tolist(), route_travel, route_idle):
+        results[p].routes.append(RouteResult(
+            vehicle=vehicle,
+            technician_id=tech_ids[vehicle],
+            item_indices=stops,
+            arrival=arrival_abs[lo:hi],
+            start=start_abs[lo:hi],
+            end=end_abs[lo:hi],
+            travel=travel_list[lo:hi],
+            idle=idle_list[lo:hi],
+            total_travel_seconds=travel_seconds, # Includes the leg back to the end location
+            total_duration_seconds=end_abs[hi - 1] - arrival_abs[lo], # First arrival to last service end
+            total_idle_seconds=idle_seconds,
+        ))
+        results[p].total_travel_seconds += travel_seconds
+        results[p].total_idle_seconds += idle_seconds
@@ -0,0 +1,94 @@
+"""
+Request decoding and response encoding for the /optimize-schedule/fast endpoint.
+
+Large payloads (hundreds of items, a dense travel matrix) spend a noticeable share of a request
+in JSON handling on top of the solve. The fast path:
+
+- accepts `Content-Encoding: gzip` (and `zstd` when the optional `zstandard` package is
+  installed) request bodies,
+- parses and validates the body in a single pass with pydantic's JSON parser instead of
+  building a dict first,
+- serialises the service's own response with orjson (falling back to the standard library)
+  without running it back through response-model validation.
+"""
+import json
+import zlib
+from typing import Optional
+
+from models import OptimizationRequestPayload, OptimizationResponsePayload
+
+try:
+    import orjson
+except ImportError: # Optional: the fast path still works, just with the slower encoder
+    orjson = None
+
+try:
+    import zstandard
+except ImportError: # Optional: only needed for Content-Encoding: zstd
+    zstandard = None
+
+# Upper bound on a decompressed request body, so a small compressed upload can't expand
+# into an arbitrarily large one
+MAX_DECOMPRESSED_BYTES = 256 * 1024 * 1024
+
+
+class UnsupportedEncodingError(ValueError):
+    """The request's Content-Encoding is not one the service can decode."""
+
+
+class BodyTooLargeError(ValueError):
+    """The decompressed request body is larger than MAX_DECOMPRESSED_BYTES."""
+
+
+def supported_encodings() -> list:
+    encodings = ["identity", "gzip"]
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+def decode_body(body: bytes, content_encoding: Optional[str], max_bytes: int = MAX_DECOMPRESSED_BYTES) -> bytes:
+    """Returns the request body with any gzip/zstd content encoding removed."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return body
+    if encoding in ("gzip", "x-gzip"):
+        try:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) # gzip header and trailer
+            decoded = decompressor.decompress(body, max_bytes + 1)
+        except zlib.error as e:
+            raise ValueError(f"Invalid gzip request body: {e}") from e
+        if not decompressor.eof:
+            if len(decoded) > max_bytes:
+                raise BodyTooLargeError(f"Decompressed request body exceeds {max_bytes} bytes.")
+            raise ValueError("Invalid gzip request body: truncated data.")
+        return decoded
+    if encoding == "zstd":
+        if zstandard is None:
+            raise UnsupportedEncodingError("zstd request bodies need the 'zstandard' package.")
+        try:
+            with zstandard.ZstdDecompressor().stream_reader(body) as reader:
+                decoded = reader.read(max_bytes + 1)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Invalid zstd request body: {e}") from e
+        if len(decoded) > max_bytes:
+            raise BodyTooLargeError(f"Decompressed request body exceeds {max_bytes} bytes.")
+        return decoded
+    raise UnsupportedEncodingError(
+        f"Unsupported Content-Encoding '{content_encoding}'. Supported: {', '.join(supported_encodings())}.")
+
+
+def parse_request(body: bytes) -> OptimizationRequestPayload:
+    """Parses and validates a JSON request body in one pass (raises pydantic.ValidationError)."""
+    return OptimizationRequestPayload.model_validate_json(body)
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def encode_response(response: OptimizationResponsePayload) -> bytes:
+    """Serialises a response the service built itself, so it is not validated again."""
+    return dumps(response.model_dump())
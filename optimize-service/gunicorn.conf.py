@@ -0,0 +1,65 @@
+"""
+Multi-process serving: gunicorn master with uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Each worker is a separate process, so solves use every core instead of sharing one
+interpreter. The app is imported once in the master (`preload_app`) and the workers are forked
+from it, sharing the imported OR-Tools/numpy/pydantic pages copy-on-write; each worker then
+runs a tiny warm-up solve before it accepts requests.
+
+Environment:
+    PORT                         listen port (default 8080)
+    WEB_CONCURRENCY              worker processes (default: cores available to the container)
+    GUNICORN_TIMEOUT             seconds a worker may stay silent before it is restarted (default 120)
+    GUNICORN_GRACEFUL_TIMEOUT    seconds to finish in-flight solves on shutdown (default 30)
+    GUNICORN_MAX_REQUESTS        recycle a worker after this many requests, 0 = never (default 0)
+    GUNICORN_PRELOAD             set to 0 to import the app in every worker instead (default 1)
+    SOLVER_WARMUP                set to 0 to skip the per-worker warm-up solve (default 1)
+    SOLVE_SOCKET_PATH            also serve local binary RPC on this Unix socket, bound by the master and shared by all workers (see local_rpc.py)
+
+Each worker's admission controller (admission.py) defaults to its share of the cores, so
+workers x SOLVER_MAX_CONCURRENT does not oversubscribe the machine.
+"""
+import gc
+import os
+
+from admission import available_cores
+
+workers = int(os.environ.get("WEB_CONCURRENCY") or available_cores())
+# Read by admission.controller_from_env in every worker to split the cores between them
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+# Solves run for their whole time limit; don't let gunicorn kill a worker in the middle of one
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = max_requests // 10
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") != "0"
+accesslog = "-"
+
+
+def on_starting(server):
+    # Bound once here, before any worker is forked, so every worker accepts on the same socket
+    if os.environ.get("SOLVE_SOCKET_PATH"):
+        import local_rpc
+        local_rpc.share_listener_from_env()
+
+
+def when_ready(server):
+    # With preload_app the master has imported everything by now. Moving those objects out of
+    # the collector's generations stops GC passes in the workers from touching (and so copying)
+    # the shared pages.
+    if preload_app:
+        gc.freeze()
+        server.log.info(f"Preloaded app; froze {gc.get_freeze_count()} objects before forking {workers} workers.")
+
+
+def post_worker_init(worker):
+    if os.environ.get("SOLVER_WARMUP", "1") == "0":
+        return
+    import main
+    elapsed = main.warm_up_solver()
+    worker.log.info(f"Worker {worker.pid} warmed up the solver in {elapsed:.3f}s.")
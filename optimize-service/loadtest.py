@@ -0,0 +1,376 @@
+"""
+Local load-test driver for the optimization service.
+
+Fires a weighted mix of generated payloads at a locally started service, either
+in-process through FastAPI's TestClient or against a real uvicorn subprocess, and
+reports latency percentiles, throughput, error rate and CPU use.
+
+Examples:
+    python loadtest.py --mix small=3,medium=1 --requests 40 --concurrency 4
+    python loadtest.py --target uvicorn --workers 2 --rate 2 --duration 30 --json report.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from payload_generator import generate_profile_payload, parse_mix
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINT = "/optimize-schedule"
+
+
+@dataclass
+class RequestResult:
+    profile: str
+    latency_seconds: float
+    http_status: Optional[int]          # None when the request never got a response
+    solver_status: Optional[str] = None # 'success' / 'partial' / 'error' from the response body
+    error: Optional[str] = None
+
+
+@dataclass
+class LoadReport:
+    target: str
+    requests: int
+    errors: int
+    error_rate: float
+    elapsed_seconds: float
+    throughput_rps: float
+    latency_seconds: Dict[str, float]
+    cpu_seconds: Optional[float]
+    cpu_percent: Optional[float]        # Of a single core, like `top`
+    by_profile: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    solver_statuses: Dict[str, int] = field(default_factory=dict)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0 for an empty list)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    return {
+        "min": values[0] if values else 0.0,
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+# --- Targets ---
+
+class TestClientTarget:
+    """Runs the app in-process. CPU use is this process's CPU time."""
+    name = "testclient"
+    __test__ = False # Not a pytest test class despite the name
+
+    def __enter__(self):
+        from fastapi.testclient import TestClient
+        import main
+        self._client = TestClient(main.app)
+        self._client.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._client.__exit__(*exc)
+
+    def post(self, body: bytes) -> Tuple[int, bytes]:
+        response = self._client.post(ENDPOINT, content=body, headers={"Content-Type": "application/json"})
+        return response.status_code, response.content
+
+    def cpu_seconds(self) -> Optional[float]:
+        return time.process_time()
+
+
+class UvicornTarget:
+    """Starts `uvicorn main:app` in a subprocess and talks to it over HTTP."""
+    name = "uvicorn"
+
+    def __init__(self, workers: int = 1, port: Optional[int] = None, startup_timeout: float = 30.0):
+        self.workers = workers
+        self.port = port or _free_port()
+        self.startup_timeout = startup_timeout
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._process: Optional[subprocess.Popen] = None
+
+    def __enter__(self):
+        cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+               "--port", str(self.port), "--workers", str(self.workers), "--log-level", "warning"]
+        self._process = subprocess.Popen(cmd, cwd=SERVICE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited during startup: {self._process.stderr.read().decode(errors='replace')}")
+            try:
+                with urllib.request.urlopen(f"{self.base_url}/openapi.json", timeout=1):
+                    return self
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"uvicorn did not become ready within {self.startup_timeout}s")
+
+    def __exit__(self, *exc):
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+    def post(self, body: bytes) -> Tuple[int, bytes]:
+        request = urllib.request.Request(f"{self.base_url}{ENDPOINT}", data=body,
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=300) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def cpu_seconds(self) -> Optional[float]:
+        """CPU time of the uvicorn process and its workers, read from /proc (Linux only)."""
+        if not self._process:
+            return None
+        return _process_tree_cpu_seconds(self._process.pid)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _process_tree_cpu_seconds(root_pid: int) -> Optional[float]:
+    if not os.path.isdir("/proc"):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    stats: Dict[int, Tuple[int, float]] = {} # pid -> (ppid, cpu seconds)
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after the closing paren.
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        ppid, utime, stime = int(fields[1]), int(fields[11]), int(fields[12])
+        stats[int(entry)] = (ppid, (utime + stime) / ticks)
+    if root_pid not in stats:
+        return None
+    total, frontier = 0.0, [root_pid]
+    while frontier:
+        pid = frontier.pop()
+        total += stats[pid][1]
+        frontier.extend(child for child, (ppid, _) in stats.items() if ppid == pid)
+    return total
+
+
+# --- Driver ---
+
+def _send(target, profile: str, body: bytes, scheduled_at: Optional[float] = None) -> RequestResult:
+    # In open-loop mode latency is measured from the scheduled release time, so time spent
+    # queued behind the in-flight cap is counted instead of hidden (coordinated omission).
+    started = scheduled_at if scheduled_at is not None else time.perf_counter()
+    try:
+        status_code, content = target.post(body)
+    except Exception as e: # Connection resets, timeouts, ...
+        return RequestResult(profile, time.perf_counter() - started, None, error=repr(e))
+    latency = time.perf_counter() - started
+    solver_status = None
+    error = None
+    try:
+        solver_status = json.loads(content).get("status")
+    except (ValueError, AttributeError):
+        pass
+    if status_code != 200:
+        error = f"HTTP {status_code}"
+    return RequestResult(profile, latency, status_code, solver_status, error)
+
+
+def run_load(
+    target,
+    mix: Dict[str, int],
+    total_requests: Optional[int] = None,
+    duration_seconds: Optional[float] = None,
+    concurrency: int = 1,
+    rate: Optional[float] = None,
+    variants: int = 5,
+    seed: int = 0,
+) -> Tuple[LoadReport, List[RequestResult]]:
+    """
+    Drives `target` with generated payloads.
+
+    Closed-loop by default: `concurrency` clients each send their next request as soon as
+    the previous one returns. With `rate`, requests are released open-loop at that many
+    per second regardless of how quickly the service answers (concurrency then caps the
+    number in flight). Stops after `total_requests` or `duration_seconds`, whichever is set.
+    """
+    if total_requests is None and duration_seconds is None:
+        raise ValueError("Either total_requests or duration_seconds must be given.")
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+
+    # Serialize every payload once up front so client-side JSON work doesn't skew latencies.
+    bodies = {
+        (profile, v): json.dumps(generate_profile_payload(profile, seed=seed * 1000 + v)).encode()
+        for profile in mix for v in range(variants)
+    }
+    rng = random.Random(seed)
+    profiles = list(mix)
+    weights = [mix[p] for p in profiles]
+
+    results: List[RequestResult] = []
+    lock = threading.Lock()
+    sent = 0
+    deadline = time.perf_counter() + duration_seconds if duration_seconds else None
+
+    def take_slot() -> Optional[Tuple[int, str, bytes]]:
+        """Returns (slot, profile, body) for the next request, or None once the run is over."""
+        nonlocal sent
+        with lock:
+            if total_requests is not None and sent >= total_requests:
+                return None
+            if deadline and time.perf_counter() >= deadline:
+                return None
+            profile = rng.choices(profiles, weights)[0]
+            body = bodies[(profile, rng.randrange(variants))]
+            sent += 1
+            return sent - 1, profile, body
+
+    def record(result: RequestResult) -> None:
+        with lock:
+            results.append(result)
+
+    cpu_before = target.cpu_seconds()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if rate:
+            interval = 1.0 / rate
+            next_request = take_slot()
+            while next_request is not None:
+                slot, profile, body = next_request
+                release_at = started + slot * interval
+                time.sleep(max(0.0, release_at - time.perf_counter()))
+                pool.submit(lambda p=profile, b=body, t=release_at: record(_send(target, p, b, t)))
+                next_request = take_slot()
+        else:
+            def client_loop() -> None:
+                next_request = take_slot()
+                while next_request is not None:
+                    _, profile, body = next_request
+                    record(_send(target, profile, body))
+                    next_request = take_slot()
+            for _ in range(concurrency):
+                pool.submit(client_loop)
+    elapsed = time.perf_counter() - started
+    cpu_after = target.cpu_seconds()
+
+    return summarize(target.name, results, elapsed, cpu_before, cpu_after), results
+
+
+def summarize(target_name: str, results: List[RequestResult], elapsed: float,
+              cpu_before: Optional[float], cpu_after: Optional[float]) -> LoadReport:
+    errors = sum(1 for r in results if r.error)
+    ok_latencies = [r.latency_seconds for r in results if not r.error]
+    cpu_seconds = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+
+    by_profile: Dict[str, Dict[str, float]] = {}
+    for profile in sorted({r.profile for r in results}):
+        profile_results = [r for r in results if r.profile == profile]
+        stats = summarize_latencies([r.latency_seconds for r in profile_results if not r.error])
+        stats["requests"] = len(profile_results)
+        stats["errors"] = sum(1 for r in profile_results if r.error)
+        by_profile[profile] = stats
+
+    solver_statuses: Dict[str, int] = {}
+    for r in results:
+        if r.solver_status:
+            solver_statuses[r.solver_status] = solver_statuses.get(r.solver_status, 0) + 1
+
+    return LoadReport(
+        target=target_name,
+        requests=len(results),
+        errors=errors,
+        error_rate=errors / len(results) if results else 0.0,
+        elapsed_seconds=elapsed,
+        throughput_rps=(len(results) - errors) / elapsed if elapsed > 0 else 0.0,
+        latency_seconds=summarize_latencies(ok_latencies),
+        cpu_seconds=cpu_seconds,
+        cpu_percent=100.0 * cpu_seconds / elapsed if cpu_seconds is not None and elapsed > 0 else None,
+        by_profile=by_profile,
+        solver_statuses=solver_statuses,
+    )
+
+
+def format_report(report: LoadReport) -> str:
+    lat = report.latency_seconds
+    lines = [
+        f"Target:       {report.target}",
+        f"Requests:     {report.requests} ({report.errors} errors, {report.error_rate:.1%})",
+        f"Elapsed:      {report.elapsed_seconds:.2f}s",
+        f"Throughput:   {report.throughput_rps:.2f} req/s",
+        f"Latency (s):  p50={lat['p50']:.3f} p95={lat['p95']:.3f} p99={lat['p99']:.3f} max={lat['max']:.3f}",
+    ]
+    if report.cpu_seconds is not None:
+        lines.append(f"CPU:          {report.cpu_seconds:.2f}s ({report.cpu_percent:.0f}% of one core, "
+                     f"{os.cpu_count()} cores available)")
+    else:
+        lines.append("CPU:          unavailable on this platform")
+    for profile, stats in report.by_profile.items():
+        lines.append(f"  {profile:<8} n={int(stats['requests']):<5} errors={int(stats['errors']):<4} "
+                     f"p50={stats['p50']:.3f} p95={stats['p95']:.3f} p99={stats['p99']:.3f}")
+    if report.solver_statuses:
+        lines.append("Solver status: " + ", ".join(f"{k}={v}" for k, v in sorted(report.solver_statuses.items())))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the optimization service with generated payloads.")
+    parser.add_argument("--target", choices=["testclient", "uvicorn"], default="testclient")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (uvicorn target only)")
+    parser.add_argument("--mix", default="small", help="Weighted payload profiles, e.g. small=3,medium=1")
+    parser.add_argument("--requests", type=int, help="Total number of requests to send")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of a fixed count")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent clients (or max in flight with --rate)")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate in requests/second")
+    parser.add_argument("--variants", type=int, default=5, help="Distinct generated payloads per profile")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    if args.requests is None and args.duration is None:
+        args.requests = 20
+
+    target = UvicornTarget(workers=args.workers) if args.target == "uvicorn" else TestClientTarget()
+    with target:
+        report, _ = run_load(target, parse_mix(args.mix), total_requests=args.requests,
+                             duration_seconds=args.duration, concurrency=args.concurrency,
+                             rate=args.rate, variants=args.variants, seed=args.seed)
+
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(asdict(report), f, indent=2)
+    return 1 if report.requests and report.errors == report.requests else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""
+Local binary RPC: /optimize-schedule over a Unix domain socket, for orchestrators on the same host.
+
+For small replans, HTTP framing, the nested-dict JSON travel matrix and its validation cost
+about as much as the solve itself. Over the socket, a request is one length-prefixed frame: the
+payload JSON without its matrix, then the matrix as raw int32s, read straight into an array.
+Connections stay open for any number of requests, so there is no connection setup per solve.
+
+Every message, in both directions, is one frame:
+
+    b"OSR1" | header length (uint32, big-endian) | matrix length in bytes (uint32, big-endian) | header | matrix
+
+- Request header: the /optimize-schedule payload as UTF-8 JSON, with `"travelTimeMatrix": {}`.
+- Request matrix: the dense travel matrix, locations x locations, row by row, as little-endian
+  int32 (negative for unknown legs). An empty matrix section uses the header's travelTimeMatrix.
+- Response header: the /optimize-schedule response JSON; the matrix section is empty.
+- Error header: `{"error": detail, "statusCode": status}`, with the HTTP status the endpoint
+  would have answered (400, 413, 422, 429, 503, 500).
+
+Requests on one connection are answered in order; open several connections to solve in
+parallel. Every solve goes through the same admission control and memory budget as HTTP ones.
+
+The socket is bound when the app starts serving, never on `import main`, which the offline
+tools do too. Under gunicorn, the master binds it before forking (gunicorn.conf.py) and every
+worker accepts connections on it. Several processes started otherwise (e.g. `uvicorn
+--workers`) each try, and the first to take the socket's lock file serves it alone.
+"""
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from fast_json import MAX_DECOMPRESSED_BYTES, parse_request
+from models import OptimizationRequestPayload
+from presolve import TRAVEL_TIME_SENTINEL
+
+try:
+    import fcntl
+except ImportError: # Windows: no Unix domain sockets either
+    fcntl = None
+
+MAGIC = b"OSR1"
+FRAME_HEADER = struct.Struct(">4sII")
+# Largest header + matrix accepted in one frame, as for decompressed HTTP bodies
+MAX_FRAME_BYTES = MAX_DECOMPRESSED_BYTES
+MATRIX_DTYPE = np.dtype("<i4")
+
+
+class ProtocolError(ValueError):
+    """A malformed frame, or a matrix that doesn't match the payload's locations."""
+
+
+class RpcError(Exception):
+    """An error answer from the server; `status_code` is the HTTP status /optimize-schedule would have answered."""
+    def __init__(self, detail: Any, status_code: int):
+        super().__init__(f"{status_code}: {detail}")
+        self.detail = detail
+        self.status_code = status_code
+
+
+# --- Framing ---
+
+def _read_exactly(stream, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise ProtocolError(f"Connection closed in the middle of a frame ({len(data)} of {size} bytes).")
+    return data
+
+
+def read_frame(stream) -> Optional[Tuple[bytes, bytes]]:
+    """Reads one frame from a binary stream: (header, matrix), or None at a clean end of stream."""
+    prefix = stream.read(FRAME_HEADER.size)
+    if not prefix:
+        return None
+    if len(prefix) != FRAME_HEADER.size:
+        raise ProtocolError("Connection closed in the middle of a frame header.")
+    magic, header_length, matrix_length = FRAME_HEADER.unpack(prefix)
+    if magic != MAGIC:
+        raise ProtocolError(f"Not a frame of this protocol (starts with {magic!r}, expected {MAGIC!r}).")
+    if header_length + matrix_length > MAX_FRAME_BYTES:
+        raise ProtocolError(f"Frame of {header_length + matrix_length} bytes is over the limit of {MAX_FRAME_BYTES}.")
+    return _read_exactly(stream, header_length), _read_exactly(stream, matrix_length)
+
+
+def encode_frame(header: bytes, matrix: bytes = b"") -> bytes:
+    return FRAME_HEADER.pack(MAGIC, len(header), len(matrix)) + header + matrix
+
+
+def encode_error(detail: Any, status_code: int) -> bytes:
+    return json.dumps({"error": detail, "statusCode": status_code}, default=str).encode("utf-8")
+
+
+def decode_request(header: bytes, matrix: bytes) -> Tuple[OptimizationRequestPayload, Optional[np.ndarray]]:
+    """
+    The request payload (validated in one pass, as on the fast endpoint) and its dense travel
+    matrix, or None when the matrix came in the header. Raises ValidationError or ProtocolError.
+    """
+    payload = parse_request(header)
+    if not matrix:
+        return payload, None
+    n = len(payload.locations)
+    if len(matrix) != n * n * MATRIX_DTYPE.itemsize:
+        raise ProtocolError(f"Travel matrix has {len(matrix)} bytes; {n} locations need {n * n * MATRIX_DTYPE.itemsize}.")
+    dense = np.frombuffer(matrix, dtype=MATRIX_DTYPE).reshape(n, n)
+    return payload, np.where(dense < 0, TRAVEL_TIME_SENTINEL, dense)
+
+
+# --- Server ---
+
+class _Connection(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                frame = read_frame(self.rfile)
+            except ProtocolError as e: # The stream can't be resynchronised: answer, then hang up
+                self.wfile.write(encode_frame(encode_error(str(e), 400)))
+                return
+            if frame is None:
+                return
+            self.wfile.write(encode_frame(self.server.handle_frame(*frame)))
+            self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True # Open connections never hold up shutdown
+    block_on_close = False
+
+
+class LocalRpcServer:
+    """
+    Serves frames on an already listening Unix socket (see bind_listener) from a background
+    thread, one thread per connection. `handle_frame(header, matrix)` returns the response header.
+    With `owned`, stopping also closes the socket and removes its file; a socket shared with
+    other processes is left to them.
+    """
+
+    def __init__(self, listener: socket.socket, handle_frame: Callable[[bytes, bytes], bytes], owned: bool = False):
+        self._server = _Server(listener.getsockname(), _Connection, bind_and_activate=False)
+        self._server.socket.close()
+        self._server.socket = listener
+        self._server.handle_frame = handle_frame
+        self._owned = owned
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "LocalRpcServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.5},
+                                        name="local-rpc", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        if self._owned:
+            path = self._server.server_address
+            self._server.socket.close()
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+            release_lock(path)
+            self._owned = False
+
+
+_lock_files: Dict[str, Any] = {} # Socket path -> its open, flock()ed lock file
+# Bound by the gunicorn master before it forks workers (see gunicorn.conf.py); every worker accepts on it
+_shared_listener: Optional[socket.socket] = None
+
+
+def bind_listener(path: str, mode: int = 0o660) -> Optional[socket.socket]:
+    """
+    Binds and listens on a Unix socket at `path`, replacing a stale socket file left by an
+    earlier run. Returns None when another live process already serves `path` (it holds
+    `path.lock`). The socket is non-blocking, so several processes can accept on it.
+    """
+    if not hasattr(socket, "AF_UNIX") or fcntl is None:
+        print("Warning: Unix domain sockets are not available on this platform; local RPC disabled.")
+        return None
+    lock_file = open(path + ".lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        print(f"Local RPC socket {path} is served by another process.")
+        return None
+    _lock_files[path] = lock_file
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    os.chmod(path, mode) # Only the service's user and group may connect
+    listener.listen(128)
+    listener.setblocking(False) # A process that loses the race for a connection gets an error, not a hang
+    print(f"Local RPC listening on {path}.")
+    return listener
+
+
+def release_lock(path: str) -> None:
+    lock_file = _lock_files.pop(path, None)
+    if lock_file is not None:
+        lock_file.close() # Closing the file drops the flock
+
+
+def listener_from_env(environ: Optional[Dict[str, str]] = None) -> Optional[socket.socket]:
+    """A listener on SOLVE_SOCKET_PATH, or None when unset (or served by another process)."""
+    env = os.environ if environ is None else environ
+    path = env.get("SOLVE_SOCKET_PATH")
+    return bind_listener(path) if path else None
+
+
+def share_listener_from_env() -> None:
+    """Binds SOLVE_SOCKET_PATH in a pre-fork master, for server_from_env in every forked worker."""
+    global _shared_listener
+    _shared_listener = listener_from_env()
+
+
+def server_from_env(handle_frame: Callable[[bytes, bytes], bytes],
+                    environ: Optional[Dict[str, str]] = None) -> Optional[LocalRpcServer]:
+    """
+    A started server on the socket the master shared, else on SOLVE_SOCKET_PATH bound by this
+    process; None when local RPC is off. Called from the app's lifespan, so only processes
+    that serve the app ever bind the socket (not the offline tools that import main).
+    """
+    if _shared_listener is not None:
+        return LocalRpcServer(_shared_listener, handle_frame).start()
+    listener = listener_from_env(environ)
+    return LocalRpcServer(listener, handle_frame, owned=True).start() if listener is not None else None
+
+
+# --- Client ---
+
+class LocalRpcClient:
+    """Python client keeping one connection open across solves. Not thread-safe: use one per thread."""
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        self.path = path
+        self.timeout = timeout
+        self._socket: Optional[socket.socket] = None
+        self._stream = None
+
+    def solve(self, payload: Dict[str, Any], travel_matrix: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Solves a payload dict; with `travel_matrix` (dense, locations x locations) the payload's
+        own travelTimeMatrix is not sent. Returns the response dict, or raises RpcError.
+        """
+        if travel_matrix is not None:
+            payload = {**payload, "travelTimeMatrix": {}}
+            matrix = np.ascontiguousarray(travel_matrix, dtype=MATRIX_DTYPE).tobytes()
+        else:
+            matrix = b""
+        try:
+            stream = self._connect()
+            stream.write(encode_frame(json.dumps(payload).encode("utf-8"), matrix))
+            stream.flush()
+            frame = read_frame(stream)
+            if frame is None:
+                raise ProtocolError("Connection closed before the response.")
+        except (OSError, ProtocolError):
+            self.close() # The next call reconnects
+            raise
+        response = json.loads(frame[0])
+        if "error" in response:
+            raise RpcError(response["error"], response["statusCode"])
+        return response
+
+    def _connect(self):
+        if self._stream is None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.settimeout(self.timeout)
+            self._socket.connect(self.path)
+            self._stream = self._socket.makefile("rwb")
+        return self._stream
+
+    def close(self) -> None:
+        if self._stream is not None:
+            with contextlib.suppress(OSError):
+                self._stream.close()
+                self._socket.close()
+        self._socket = self._stream = None
+
+    def __enter__(self) -> "LocalRpcClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
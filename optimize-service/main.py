@@ -1,57 +1,138 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from models import (
     OptimizationRequestPayload, 
     OptimizationResponsePayload, 
     TechnicianRoute, 
-    RouteStop
+    RouteStop,
+    AlternativeSchedule,
+    SolverStats,
+    RouteEvaluationRequestPayload,
+    RouteEvaluationResponsePayload,
+    PlanEvaluation,
+    RouteViolation,
+    ScenarioRequestPayload,
+    ScenarioResponsePayload,
+    ScenarioSummary,
+    SolveJobStatus,
 )
-from ortools.constraint_solver import routing_enums_pb2
-from ortools.constraint_solver import pywrapcp
-from datetime import datetime, timedelta, timezone
-import pytz # For robust timezone handling if needed, though ISO strings often include offset
-from typing import List, Literal
-
-# --- Helper Functions ---
-
-# Define a reference epoch (e.g., start of the day or earliest time in payload)
-# Using UTC for consistency is generally best.
-# EPOCH = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) # Removed floating EPOCH
-
-def iso_to_seconds(iso_str: str) -> int:
-    """Converts ISO 8601 string to seconds since the Unix epoch (UTC)."""
-    # global EPOCH # Removed usage
-    dt = datetime.fromisoformat(iso_str)
-    # Ensure dt is offset-aware, defaulting to UTC if naive
-    if dt.tzinfo is None or dt.tzinfo.utcoffset(dt) is None:
-        # Attempt to handle strings ending with 'Z' correctly even if fromisoformat misses it sometimes
-        if iso_str.endswith('Z'):
-            dt = dt.replace(tzinfo=timezone.utc)
-        else:
-            # For truly naive strings, assume UTC. Consider logging a warning.
-            # print(f"Warning: ISO string '{iso_str}' is timezone-naive. Assuming UTC.")
-            dt = dt.replace(tzinfo=timezone.utc)
-            
-    # Convert to UTC timestamp (seconds since Unix epoch)
-    return int(dt.timestamp())
-    # return int((dt - EPOCH).total_seconds()) # Old logic
-
-def seconds_to_iso(seconds: int) -> str:
-    """Converts seconds since the Unix epoch back to ISO 8601 string (UTC)."""
-    # global EPOCH # Removed usage
-    # Convert seconds since epoch to UTC datetime object
-    dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
-    # dt = EPOCH + timedelta(seconds=seconds) # Old logic
-    # Use isoformat() with 'Z' suffix for explicit UTC indication
-    return dt.isoformat(timespec='seconds').replace('+00:00', 'Z')
+from solver_profile import load_solver_profile, resolve_solver_options
+# iso_to_seconds / seconds_to_iso / time_field_seconds are re-exported for callers importing them from main
+from core import (
+    InvalidProblemError,
+    SolveResult,
+    ProblemInstance,
+    compile_instance,
+    iso_to_seconds,
+    seconds_to_iso,
+    solve_instance,
+    time_field_seconds,
+)
+from evaluation import PlanResult, evaluate_plans
+from memory_guard import MB, MemoryBudgetError, PeakRssMeter, budget_from_env, estimate_payload_bytes, estimate_solve_bytes
+# Modules of opt-in features (capture, solve queue, local RPC, decomposition, scenarios) are
+# imported where they are first used, so `import main` stays fast (see startup_benchmark.py).
+from admission import QueueFullError, QueueTimeoutError, controller_from_env
+from fast_json import BodyTooLargeError, UnsupportedEncodingError, decode_body, encode_response, parse_request
+import asyncio
+import contextlib
+import os
+import sys
+import threading
+import time
+from typing import List, Optional
+
+# --- Solver Profile ---
+
+# Tuned per-size defaults written by tuner.py. Applied to any solver option a request leaves unset.
+SOLVER_PROFILE = load_solver_profile(os.environ.get("SOLVER_PROFILE_PATH"))
+
+# --- Request Capture ---
+
+# Opt-in recording of incoming payloads for offline replay (see capture.py / replay.py).
+REQUEST_RECORDER = None
+if os.environ.get("REQUEST_CAPTURE_DIR"):
+    from capture import recorder_from_env
+    REQUEST_RECORDER = recorder_from_env()
+
+# --- Admission Control ---
+
+# Caps concurrent solves at the core count with a bounded wait queue (see admission.py).
+SOLVE_ADMISSION = controller_from_env()
+
+# --- Memory Budget ---
+
+# Optional per-request memory budget (SOLVE_MEMORY_BUDGET_MB); oversized requests are rejected
+# or solved in parts (see memory_guard.py).
+MEMORY_BUDGET = budget_from_env()
+
+# --- Solve Queue ---
+
+# Optional broker (SOLVE_QUEUE_URL) that POST /jobs hands solves to, for solver workers on any
+# node to pick up (see solve_queue.py and solve_worker.py).
+SOLVE_QUEUE = None
+if os.environ.get("SOLVE_QUEUE_URL"):
+    from solve_queue import broker_from_env
+    SOLVE_QUEUE = broker_from_env()
 
 # --- FastAPI App ---
 
+SERVICE_STARTED = time.perf_counter()
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up without delaying startup: the port opens right away and /ready reports
+    # "cold" until the warm-up solve has finished. SOLVER_WARMUP=0 disables it.
+    if os.environ.get("SOLVER_WARMUP", "1") != "0" and SOLVER_WARM_UP_SECONDS is None:
+        threading.Thread(target=_warm_up_in_background, name="solver-warm-up", daemon=True).start()
+    # Optional Unix socket (SOLVE_SOCKET_PATH) for orchestrators on the same host (see local_rpc.py)
+    rpc_server = None
+    if os.environ.get("SOLVE_SOCKET_PATH"):
+        from local_rpc import server_from_env
+        rpc_server = server_from_env(handle_rpc_frame)
+    yield
+    if rpc_server is not None:
+        rpc_server.stop()
+    if "scenarios" in sys.modules: # Scenario worker processes, if any were started
+        sys.modules["scenarios"].shutdown_pool()
+
 app = FastAPI(
     title="Job Scheduler Optimization Service",
     description="Receives scheduling problems and returns optimized routes using OR-Tools.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
+# POST routes whose bodies are solve payloads, checked against the memory budget before they are read
+BUDGETED_PATHS = frozenset({"/optimize-schedule", "/optimize-schedule/fast", "/jobs", "/evaluate-routes", "/optimize-scenarios"})
+
+class BodyBudgetMiddleware:
+    """
+    Turns away bodies too large to parse within the memory budget (413), going by Content-Length
+    before anything is read. Compressed bodies to the fast endpoint are checked again once decoded.
+    Plain ASGI, so every other request passes straight through without being wrapped.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (MEMORY_BUDGET is not None and scope["type"] == "http" and scope["method"] == "POST"
+                and scope["path"] in BUDGETED_PATHS):
+            content_length = dict(scope["headers"]).get(b"content-length", b"")
+            if content_length.isdigit():
+                try:
+                    MEMORY_BUDGET.check_body(int(content_length))
+                except MemoryBudgetError as e:
+                    await JSONResponse(status_code=413, content={"detail": str(e)})(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+app.add_middleware(BodyBudgetMiddleware)
+
 @app.post("/optimize-schedule", 
             response_model=OptimizationResponsePayload,
             summary="Solve the vehicle routing problem for job scheduling",
@@ -61,470 +142,457 @@ async def optimize_schedule(payload: OptimizationRequestPayload) -> Optimization
     """
     Accepts a detailed scheduling problem description and returns optimized routes.
     """
-    print(f"Received optimization request with {len(payload.items)} items and {len(payload.technicians)} technicians.")
-    
-    if not payload.items:
-        return OptimizationResponsePayload(status='success', message='No items provided for scheduling.', routes=[], unassignedItemIds=[])
-    if not payload.technicians:
-        return OptimizationResponsePayload(status='error', message='No technicians available for scheduling.', routes=[], unassignedItemIds=[item.id for item in payload.items])
-
-    # --- Calculate Planning Epoch ---
-    # Use the earliest technician start time as the reference point (epoch) for relative time calculations.
+    return await admit_and_solve(payload)
+
+@app.post("/optimize-schedule/fast",
+            response_model=None,
+            summary="Same as /optimize-schedule, with compressed bodies and faster JSON handling",
+            tags=["Optimization"]
+            )
+async def optimize_schedule_fast(request: Request) -> Response:
+    """
+    Accepts the same JSON body as /optimize-schedule, optionally gzip/zstd compressed
+    (Content-Encoding), and returns the same response without re-validating it (see fast_json.py).
+    """
+    payload, _ = await read_request(request)
+    response = await admit_and_solve(payload)
+    return Response(content=encode_response(response), media_type="application/json")
+
+async def read_request(request: Request):
+    """
+    Decodes (gzip/zstd) and validates a raw /optimize-schedule body in one pass (see fast_json.py).
+    Returns (payload, decoded body bytes), or raises the HTTP error the regular endpoint would.
+    """
     try:
-        planning_epoch_seconds = min(iso_to_seconds(t.earliestStartTimeISO) for t in payload.technicians)
-        print(f"Planning Epoch (Earliest Tech Start): {planning_epoch_seconds} ({seconds_to_iso(planning_epoch_seconds)})")
-    except ValueError: # Handle case where iso_to_seconds might fail or list is empty (already checked)
-         print("Error calculating planning epoch. Check technician time formats.")
-         raise HTTPException(status_code=400, detail="Invalid technician start times provided.")
-
-    num_locations = len(payload.locations)
-    num_vehicles = len(payload.technicians)
-    num_items = len(payload.items)
-    
-    # Map item IDs to their index in the payload.items list for easier lookup
-    item_id_to_payload_index = {item.id: i for i, item in enumerate(payload.items)}
-    # Map solver indices back to location IDs/coords for travel matrix lookup
-    location_index_map = {loc.index: loc for loc in payload.locations}
-    
-    # Create the routing index manager.
-    # Number of nodes = locations. Start/End nodes are defined per vehicle.
-    manager = pywrapcp.RoutingIndexManager(num_locations, num_vehicles, 
-                                           [t.startLocationIndex for t in payload.technicians],
-                                           [t.endLocationIndex for t in payload.technicians])
-
-    # Create Routing Model.
-    routing = pywrapcp.RoutingModel(manager)
-
-    # --- Callbacks ---
-    
-    # Travel time callback
-    def travel_time_callback(from_index_mgr, to_index_mgr):
-        from_node = manager.IndexToNode(from_index_mgr)
-        to_node = manager.IndexToNode(to_index_mgr)
-        
-        # Use the precomputed matrix from the payload
-        # The matrix keys are expected to be the location indices defined in payload.locations
-        try:
-            # Matrix uses original location indices
-            # <<< Ensure location_index_map is accessible or defined earlier if needed >>>
-            # Assuming location_index_map is defined in the outer scope
-            from_loc_idx = location_index_map.get(from_node) # Use .get for safety
-            to_loc_idx = location_index_map.get(to_node)
-            
-            if from_loc_idx is None or to_loc_idx is None:
-                print(f"TRAVEL_CALLBACK WARN: Node index not found in location_index_map (from: {from_node}, to: {to_node}). Returning large cost.")
-                return 999999
-
-            # Access the actual index field from the location object
-            from_loc_payload_idx = from_loc_idx.index 
-            to_loc_payload_idx = to_loc_idx.index
-
-            travel_time = payload.travelTimeMatrix.get(from_loc_payload_idx, {}).get(to_loc_payload_idx, 999999)
-            return travel_time
-        except Exception as e:
-            print(f"TRAVEL_CALLBACK ERROR: Exception for nodes {from_node} -> {to_node}. Error: {e}. Returning large cost.")
-            return 999999
-
-    transit_callback_index = routing.RegisterTransitCallback(travel_time_callback)
-    # Arc cost is based *only* on travel time
-    routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
-
-    # Service time (demand) callback
-    item_solver_indices = {} 
-    def service_time_callback(index_mgr):
-        node = manager.IndexToNode(index_mgr)
-        for i, item in enumerate(payload.items):
-            if item.locationIndex == node:
-                item_solver_indices[item.id] = index_mgr
-                return item.durationSeconds
-        return 0 # Depots have zero service time
-
-    # Combined Transit + Service Time Callback for Time Dimension
-    def transit_plus_service_time_callback(from_index_mgr, to_index_mgr):
-        """Returns travel_time(from, to) + service_time(from)."""
-        travel = travel_time_callback(from_index_mgr, to_index_mgr)
-        service = service_time_callback(from_index_mgr)
-        # Add safety check for large costs indicating errors
-        if travel >= 999999 or service >= 999999:
-             return 999999 # Propagate large cost if inputs were invalid
-        return travel + service
-
-    # Register the combined callback
-    combined_time_callback_index = routing.RegisterTransitCallback(transit_plus_service_time_callback)
-
-    # --- Dimensions ---
-
-    # Time Dimension
-    # Calculate the maximum horizon needed relative to the planning epoch
-    max_relative_horizon = max(iso_to_seconds(t.latestEndTimeISO) - planning_epoch_seconds for t in payload.technicians)
-    horizon_with_buffer = max_relative_horizon + (7 * 24 * 3600) # Add a week buffer
-    # Ensure horizon is not negative if all end times are before the epoch (edge case)
-    horizon_with_buffer = max(0, horizon_with_buffer)
-
-    routing.AddDimensionWithVehicleCapacity(
-        combined_time_callback_index, # Use combined travel + service time for dimension propagation
-        0,  # Slack for the dimension (usually 0 for time)
-        # Provide a list of capacities, one for each vehicle
-        [horizon_with_buffer] * num_vehicles, 
-        False,  # start cumul to zero = False (start times vary based on tech availability)
-        "Time"
-    )
-    time_dimension = routing.GetDimensionOrDie("Time")
-    # Ensure the time dimension uses the travel time for transit calculations
-    # (This might already be implicit via SetArcCostEvaluatorOfAllVehicles, but let's be explicit if possible/needed)
-
-    # --- Constraints ---
-
-    # Technician Time Windows
-    for i, tech in enumerate(payload.technicians):
-        start_seconds_abs = iso_to_seconds(tech.earliestStartTimeISO)
-        end_seconds_abs = iso_to_seconds(tech.latestEndTimeISO)
-        
-        # Convert to relative seconds
-        start_seconds_rel = max(0, start_seconds_abs - planning_epoch_seconds)
-        end_seconds_rel = max(0, end_seconds_abs - planning_epoch_seconds)
-
-        # Ensure start <= end (basic sanity check)
-        if start_seconds_rel > end_seconds_rel:
-            print(f"Warning: Technician {tech.id} has relative start time after end time ({start_seconds_rel} > {end_seconds_rel}). Setting range to [{start_seconds_rel}, {start_seconds_rel}].")
-            end_seconds_rel = start_seconds_rel # Or handle as error?
-        
-        print(f"  Tech {tech.id}: Abs Window [{start_seconds_abs}, {end_seconds_abs}], Rel Window [{start_seconds_rel}, {end_seconds_rel}]") # Debug print
-        time_dimension.CumulVar(routing.Start(i)).SetRange(start_seconds_rel, end_seconds_rel)
-        time_dimension.CumulVar(routing.End(i)).SetRange(start_seconds_rel, end_seconds_rel)
-
-    # Fixed Time Constraints
-    for constraint in payload.fixedConstraints:
-        item_payload_idx = item_id_to_payload_index.get(constraint.itemId)
-        if item_payload_idx is None:
-            print(f"Warning: Fixed constraint for unknown item ID {constraint.itemId}. Skipping.")
-            continue
-
-        item_loc_index = payload.items[item_payload_idx].locationIndex
-        solver_index = manager.NodeToIndex(item_loc_index)
-
-        fixed_time_seconds_abs = iso_to_seconds(constraint.fixedTimeISO)
-        # Convert to relative seconds
-        fixed_time_seconds_rel = max(0, fixed_time_seconds_abs - planning_epoch_seconds)
-
-        # Add constraint for the specific item index
-        # For a fixed time, the range is [fixed_time_rel, fixed_time_rel]
-        time_dimension.CumulVar(solver_index).SetRange(fixed_time_seconds_rel, fixed_time_seconds_rel)
-        print(f"Applied fixed time constraint for item {constraint.itemId} at index {solver_index} to be {fixed_time_seconds_rel}s (relative)")
-
-
-    # Technician Eligibility (Disjunctions) & Priority Penalties
-    # Get lists of all start and end location indices for depot check
-    starts = [t.startLocationIndex for t in payload.technicians]
-    ends = [t.endLocationIndex for t in payload.technicians]
-
-    # Add high penalty for dropping high-priority nodes
-    # OR-Tools handles priority implicitly via penalties for dropping nodes
-    # Higher penalty means less likely to be dropped.
-    # Adjust penalty calculation as needed based on priority scale (e.g., 1 = highest)
-    max_priority = max((item.priority for item in payload.items if item.priority is not None), default=1)
-    # base_penalty = 1000 # Base penalty for being unserved
-    # <<< INCREASE PENALTY SIGNIFICANTLY >>>
-    # Ensure penalty outweighs reasonable travel times. If max travel is ~1hr (3600s), penalty should be higher.
-    base_penalty = 100000 
-
-    for i, item in enumerate(payload.items):
-        # Ensure locationIndex is valid
-        if not (0 <= item.locationIndex < num_locations):
-             print(f"Warning: Item {item.id} has invalid locationIndex {item.locationIndex}. Skipping disjunction.")
-             continue
-
-        # Convert payload location index to solver's internal node index
-        solver_index = manager.NodeToIndex(item.locationIndex)
-
-        # Determine if this solver index corresponds to ANY vehicle's start or end node.
-        # --- This block IS necessary again to handle items at depots correctly ---
-        is_depot_node = False
-        for v_idx in range(num_vehicles):
-            # Check against the *solver's* representation of start/end nodes
-            if solver_index == routing.Start(v_idx) or solver_index == routing.End(v_idx):
-                is_depot_node = True
-                break
-        # --- End block ---
-
-        # Per OR-Tools documentation, disjunctions cannot include start/end nodes.
-        if is_depot_node:
-            # If an item is at a depot location, treat it as mandatory if the location is visited.
-            # Do not add a disjunction or penalty for skipping.
-            # This branch IS relevant again for items at depot locations
-            print(f"Info: Item {item.id} (solver index {solver_index}) matched routing.Start/End. No disjunction added.")
-            continue # Skip disjunction logic
-        else:
-            # --- This logic only applies to non-depot nodes ---
-            
-            # Filter eligible vehicles for THIS item
-            eligible_vehicles = [
-                tech_idx for tech_idx, tech in enumerate(payload.technicians)
-                if tech.id in item.eligibleTechnicianIds # Check if tech's ID is in the item's eligible list
-            ]
-
-            # If a non-depot item has NO eligible vehicles, it cannot be served.
-            if not eligible_vehicles:
-                print(f"Warning: Non-depot Item {item.id} has no eligible technicians. Cannot be scheduled.")
-                # This item will naturally be unassigned as no vehicle can visit it.
-                continue # Skip to the next item
-
-            # Priority calculation (ensure priority is not None)
-            if item.priority is None:
-                 print(f"Warning: Item {item.id} has None priority. Using default base penalty.")
-                 priority_penalty = base_penalty
-            else:
-                priority_penalty = base_penalty * (max_priority - item.priority + 1)
+        body = decode_body(await request.body(), request.headers.get("content-encoding"))
+        if MEMORY_BUDGET is not None:
+            MEMORY_BUDGET.check_body(len(body))
+    except MemoryBudgetError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedEncodingError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except BodyTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return parse_request(body), body
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False)) # Same 422 as the regular endpoint
+
+@app.post("/jobs",
+            response_model=SolveJobStatus,
+            status_code=202,
+            summary="Queue a solve for the solver workers and return its job id",
+            tags=["Solve Queue"]
+            )
+async def enqueue_job(request: Request) -> SolveJobStatus:
+    """
+    Accepts the same body as /optimize-schedule (optionally gzip/zstd compressed), validates it
+    and queues it in the solve queue (see solve_queue.py) for a solver worker (solve_worker.py).
+    Poll GET /jobs/{jobId} for the response. 503 when no queue is configured (SOLVE_QUEUE_URL).
+    """
+    if SOLVE_QUEUE is None:
+        raise HTTPException(status_code=503, detail="No solve queue is configured (SOLVE_QUEUE_URL).")
+    from solve_queue import JOB_QUEUED
+    _, body = await read_request(request)
+    job_id = await run_in_threadpool(SOLVE_QUEUE.enqueue, body)
+    return SolveJobStatus(jobId=job_id, status=JOB_QUEUED)
+
+@app.get("/jobs/{job_id}",
+            response_model=SolveJobStatus,
+            summary="State of a queued solve, with its response once done",
+            tags=["Solve Queue"]
+            )
+async def get_job(job_id: str) -> SolveJobStatus:
+    """404 for unknown jobs, and for finished ones past the queue's retention time."""
+    if SOLVE_QUEUE is None:
+        raise HTTPException(status_code=503, detail="No solve queue is configured (SOLVE_QUEUE_URL).")
+    job = await run_in_threadpool(SOLVE_QUEUE.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}.")
+    return build_job_status(job)
+
+@app.post("/evaluate-routes",
+            response_model=RouteEvaluationResponsePayload,
+            summary="Check given routes for feasibility and cost without solving",
+            tags=["Optimization"]
+            )
+def evaluate_routes(payload: RouteEvaluationRequestPayload) -> RouteEvaluationResponsePayload:
+    """
+    Computes stop times, travel totals and constraint violations for each candidate plan's
+    stop sequences (see evaluation.py). No search runs, so this bypasses admission control.
+    """
+    return evaluate_schedule(payload)
 
-            # Ensure penalty is non-negative
-            if priority_penalty < 0:
-                print(f"Warning: Calculated negative penalty ({priority_penalty}) for item {item.id}. Clamping to 0.")
-                priority_penalty = 0
+@app.post("/optimize-scenarios",
+            response_model=ScenarioResponsePayload,
+            summary="Solve what-if variants of one payload in parallel and compare them",
+            tags=["Optimization"]
+            )
+async def optimize_scenarios(payload: ScenarioRequestPayload) -> ScenarioResponsePayload:
+    """
+    Compiles the base payload once and solves it under each scenario delta (see scenarios.py)
+    in parallel worker processes. Every scenario is one solve for admission control: the
+    request is turned away with 429 unless there is room for all of them.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+    from scenarios import default_workers, penalty_scale, scenario_pool, shutdown_pool, solve_variant
+    from shared_matrix import SharedMatrixStore
+
+    started = time.perf_counter()
+    deltas = ([None] if payload.includeBase else []) + list(payload.scenarios)
+    capacity = SOLVE_ADMISSION.max_concurrent + SOLVE_ADMISSION.max_queue
+    if len(deltas) > capacity:
+        raise HTTPException(status_code=400, detail=f"At most {capacity} scenarios (including the base) can be solved per request.")
+    # The same options for every scenario, so their objectives are comparable
+    solver_options = resolve_solver_options(payload.solverOptions, len(payload.items), SOLVER_PROFILE)
+    try:
+        base = await run_in_threadpool(compile_instance, payload)
+    except InvalidProblemError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        SOLVE_ADMISSION.reserve(len(deltas))
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after_seconds)})
+
+    pool = scenario_pool(default_workers(SOLVE_ADMISSION.max_concurrent))
+    # Workers get the base without its matrix, plus a handle to the matrix in shared memory
+    shared_base = base.replace(travel_matrix=None)
+
+    def solve_in_pool(handle, delta):
+        return pool.submit(solve_variant, shared_base, handle, delta, solver_options).result()
 
-            # Allow the solver to drop the NON-DEPOT node (item) with the calculated penalty.
-            # max_cardinality=1 means at most one technician will serve this item.
-            # print(f"  Attempting AddDisjunction for non-depot item {item.id} (solver_index {solver_index})") # <<< REMOVING DEBUG PRINT
+    with SharedMatrixStore() as store:
+        handle = store.publish(base.travel_matrix, refs=len(deltas))
+
+        async def run_scenario(delta):
             try:
-                 # === RESTORING AddDisjunction CALL ===
-                 # routing.AddDisjunction([solver_index], priority_penalty, 1) # <<< TEMPORARILY COMMENTED OUT FOR DEBUGGING
-                 routing.AddDisjunction([solver_index], priority_penalty, 1) # <<< RESTORED
-                 # === END RESTORED CALL ===
-                 # print(f"SKIPPED AddDisjunction for {item.id} (DEBUGGING)") # Indicate skipping for debugging
-                 print(f"Added disjunction for non-depot item {item.id} (idx {solver_index}), penalty {priority_penalty}, max_card=1")
-            except Exception as e:
-                 print(f"!!! CRITICAL ERROR adding disjunction for non-depot item {item.id} (locIdx: {item.locationIndex}, solverIdx: {solver_index}, penalty: {priority_penalty}): {e}")
-                 raise
-            # --- End logic for non-depot nodes ---
-
-        # Calculation of total travel time in post-processing seems complex and might need review later.
-        # Consider if OR-Tools provides a simpler way to get route travel times.
-
-    # --- Solve ---
-    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-    search_parameters.first_solution_strategy = (
-        routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC
+                return await run_in_threadpool(SOLVE_ADMISSION.run, solve_in_pool, handle, delta)
+            except (InvalidProblemError, QueueTimeoutError) as e:
+                return e
+            except Exception as e: # A crashed worker, out of memory, an OR-Tools error: only this scenario's row fails
+                print(f"Error: Scenario solve failed: {e!r}")
+                if isinstance(e, BrokenProcessPool):
+                    shutdown_pool() # The next request starts a fresh pool
+                return e
+            finally:
+                store.release(handle)
+
+        # Every scenario returns rather than raises, so the matrix stays published until all have settled
+        outcomes = await asyncio.gather(*(run_scenario(delta) for delta in deltas))
+
+    ids = (["base"] if payload.includeBase else []) + [scenario.id for scenario in payload.scenarios]
+    summaries = [build_scenario_summary(scenario_id, outcome, solver_options.basePenalty, penalty_scale(base),
+                                        payload.responseTimeFormat, payload.includeRoutes)
+                 for scenario_id, outcome in zip(ids, outcomes)]
+    if payload.includeBase:
+        base_summary = summaries[0]
+        for summary in summaries[1:]:
+            if summary.objectiveValue is not None and base_summary.objectiveValue is not None:
+                summary.objectiveDelta = summary.objectiveValue - base_summary.objectiveValue
+            if summary.unassignedCount is not None and base_summary.unassignedCount is not None:
+                summary.unassignedDelta = summary.unassignedCount - base_summary.unassignedCount
+    elapsed = time.perf_counter() - started
+    print(f"Solved {len(deltas)} scenarios in {elapsed:.2f}s.")
+    return ScenarioResponsePayload(scenarios=summaries, wallTimeSeconds=elapsed)
+
+@app.get("/ready", summary="Readiness: whether the solver is warmed up", tags=["Operations"])
+async def readiness(response: Response) -> dict:
+    """200 with status "warm" once the warm-up solve has run, 503 with status "cold" before that."""
+    if SOLVER_WARM_UP_SECONDS is None:
+        response.status_code = 503
+    return {
+        "status": "cold" if SOLVER_WARM_UP_SECONDS is None else "warm",
+        "warmUpSeconds": SOLVER_WARM_UP_SECONDS,
+        "uptimeSeconds": time.perf_counter() - SERVICE_STARTED,
+    }
+
+@app.get("/load", summary="Current solver load", tags=["Operations"])
+async def solver_load() -> dict:
+    """Running and queued solves against the configured limits, for callers and autoscalers."""
+    load = SOLVE_ADMISSION.load()
+    if SOLVE_QUEUE is not None:
+        load["solveQueue"] = await run_in_threadpool(SOLVE_QUEUE.counts) # Jobs per state, across all workers
+    return load
+
+async def admit_and_solve(payload: OptimizationRequestPayload) -> OptimizationResponsePayload:
+    """
+    Runs a solve in the threadpool once the admission controller grants a slot. Answers 429 when
+    the queue is full and 503 when the queue timeout passes, both with a Retry-After header.
+    """
+    try:
+        SOLVE_ADMISSION.reserve()
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after_seconds)})
+    try:
+        return await run_in_threadpool(SOLVE_ADMISSION.run, solve_and_record, payload)
+    except QueueTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after_seconds)})
+
+def solve_and_record(payload: OptimizationRequestPayload, travel_matrix=None) -> OptimizationResponsePayload:
+    """Solves a payload, capturing it for replay when REQUEST_CAPTURE_DIR is set."""
+    if REQUEST_RECORDER is None:
+        return solve_schedule(payload, travel_matrix)
+    started = time.perf_counter()
+    response = None
+    try:
+        response = solve_schedule(payload, travel_matrix)
+        return response
+    finally:
+        if travel_matrix is not None: # Captures hold the matrix in payload form, so replay.py can read them
+            payload = payload.model_copy(update={"travelTimeMatrix": {
+                i: dict(enumerate(row)) for i, row in enumerate(travel_matrix.tolist())}})
+        REQUEST_RECORDER.record(payload, response, time.perf_counter() - started)
+
+def handle_rpc_frame(header: bytes, matrix: bytes) -> bytes:
+    """
+    Answers one local RPC request frame (see local_rpc.py) with the response JSON, or an error
+    header carrying the status code /optimize-schedule would have answered. Runs on the
+    connection's own thread and waits for an admission slot there.
+    """
+    from local_rpc import ProtocolError, decode_request, encode_error
+
+    try:
+        if MEMORY_BUDGET is not None:
+            MEMORY_BUDGET.check_body(len(header))
+        payload, travel_matrix = decode_request(header, matrix)
+        SOLVE_ADMISSION.reserve()
+        return encode_response(SOLVE_ADMISSION.run(solve_and_record, payload, travel_matrix))
+    except ValidationError as e:
+        return encode_error(e.errors(include_url=False, include_context=False), 422)
+    except ProtocolError as e:
+        return encode_error(str(e), 400)
+    except MemoryBudgetError as e:
+        return encode_error(str(e), 413)
+    except QueueFullError as e:
+        return encode_error(str(e), 429)
+    except QueueTimeoutError as e:
+        return encode_error(str(e), 503)
+    except HTTPException as e:
+        return encode_error(e.detail, e.status_code)
+    except Exception as e:
+        print(f"Error: Local RPC solve failed: {e!r}")
+        return encode_error(repr(e), 500)
+
+def solve_schedule(payload: OptimizationRequestPayload, travel_matrix=None) -> OptimizationResponsePayload:
+    """
+    Compiles and solves a payload with the core (core.py) and builds the API response.
+    Shared by the HTTP endpoint and offline tools; `travel_matrix` is a dense matrix that
+    replaces `payload.travelTimeMatrix` (binary payload files). Invalid input raises a 400 HTTPException.
+    """
+    print(f"Received optimization request with {len(payload.items)} items and {len(payload.technicians)} technicians.")
+    # Request options win over the loaded solver profile, which wins over the built-in defaults.
+    solver_options = resolve_solver_options(payload.solverOptions, len(payload.items), SOLVER_PROFILE)
+
+    # --- Memory Estimate (from counts, before anything is built) ---
+    counts = (len(payload.locations), len(payload.items), len(payload.technicians))
+    payload_bytes = estimate_payload_bytes(sum(len(row) for row in payload.travelTimeMatrix.values()))
+    estimated_bytes = payload_bytes + estimate_solve_bytes(*counts)
+    parts = 1
+    if MEMORY_BUDGET is not None:
+        try:
+            parts = MEMORY_BUDGET.plan(payload_bytes, *counts)
+        except MemoryBudgetError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    with PeakRssMeter() as meter:
+        try:
+            instance = compile_instance(payload, travel_matrix)
+            if parts > 1:
+                print(f"Estimated {estimated_bytes // MB} MB is over the memory budget; solving in {parts} parts.")
+                if payload.alternatives:
+                    print("Warning: Alternatives are not collected when solving in parts.")
+                from decomposition import solve_decomposed
+                result = solve_decomposed(instance, solver_options, parts)
+            else:
+                result = solve_instance(instance, solver_options, payload.alternatives)
+        except InvalidProblemError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    response = build_response(instance, result, payload.responseTimeFormat)
+    if response.solverStats is not None:
+        response.solverStats.estimatedMemoryMb = round(estimated_bytes / MB, 1)
+        response.solverStats.peakRssMb = round(meter.peak_bytes / MB, 1) if meter.peak_bytes is not None else None
+        response.solverStats.decompositionParts = parts if parts > 1 else None
+    if payload.alternatives and parts == 1:
+        response.alternatives = build_alternatives(instance, result, payload.responseTimeFormat)
+    return response
+
+def build_alternatives(instance: ProblemInstance, result: SolveResult, time_format: str = 'iso') -> List[AlternativeSchedule]:
+    """
+    API schedules for the alternative solutions the search kept. The solver only records which
+    items each technician serves in which order; stop times come from evaluation.py, which
+    schedules stops the same way the solver does.
+    """
+    plans = [[(instance.tech_ids[vehicle], [instance.item_ids[i] for i in items]) for vehicle, items in alternative]
+             for _, alternative in result.alternatives]
+    return [
+        AlternativeSchedule(
+            rank=rank,
+            objectiveValue=objective,
+            routes=build_routes(instance, evaluated.routes, time_format),
+            unassignedItemIds=evaluated.unassigned_item_ids,
+            techniciansUsed=len(evaluated.routes),
+            totalTravelTimeSeconds=evaluated.total_travel_seconds,
+        )
+        for rank, ((objective, _), evaluated) in enumerate(zip(result.alternatives, evaluate_plans(instance, plans)), 1)
+    ]
+
+def evaluate_schedule(payload: RouteEvaluationRequestPayload) -> RouteEvaluationResponsePayload:
+    """Compiles the payload once and evaluates every candidate plan against it. Invalid input raises a 400 HTTPException."""
+    started = time.perf_counter()
+    try:
+        instance = compile_instance(payload)
+    except InvalidProblemError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    plans = [[(route.technicianId, [stop.itemId for stop in route.stops]) for route in plan.routes]
+             for plan in payload.plans]
+    results = evaluate_plans(instance, plans)
+    evaluations = [build_plan_evaluation(instance, plan.id, result, payload.responseTimeFormat)
+                   for plan, result in zip(payload.plans, results)]
+    elapsed = time.perf_counter() - started
+    print(f"Evaluated {len(plans)} plans in {elapsed:.4f}s; {sum(r.feasible for r in results)} feasible.")
+    return RouteEvaluationResponsePayload(plans=evaluations, evaluationTimeSeconds=elapsed)
+
+def build_scenario_summary(scenario_id: str, outcome, base_penalty: int, max_priority: int, time_format: str = 'iso',
+                           include_routes: bool = False) -> ScenarioSummary:
+    """One comparison-table row from a scenario's (SolveResult, instance), or from the error it raised."""
+    from scenarios import scenario_objective
+
+    if isinstance(outcome, Exception):
+        return ScenarioSummary(id=scenario_id, status='error', message=str(outcome) or repr(outcome))
+    result, instance = outcome
+    response = build_response(instance, result, time_format)
+    return ScenarioSummary(
+        id=scenario_id,
+        status=result.status,
+        message=result.message,
+        objectiveValue=scenario_objective(instance, result, base_penalty, max_priority),
+        unassignedCount=len(result.unassigned_item_ids),
+        totalTravelTimeSeconds=sum(route.total_travel_seconds for route in result.routes),
+        techniciansUsed=len(result.routes),
+        solveTimeSeconds=result.solve_time_seconds,
+        response=response if include_routes else None,
     )
-    search_parameters.local_search_metaheuristic = (
-        routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+
+def build_plan_evaluation(instance: ProblemInstance, plan_id: Optional[str], result: PlanResult,
+                          time_format: str = 'iso') -> PlanEvaluation:
+    return PlanEvaluation(
+        id=plan_id,
+        feasible=result.feasible,
+        routes=build_routes(instance, result.routes, time_format),
+        unassignedItemIds=result.unassigned_item_ids,
+        violations=[
+            RouteViolation(code=v.code, technicianId=v.technician_id, itemId=v.item_id, amountSeconds=v.amount_seconds)
+            for v in result.violations
+        ],
+        totalTravelTimeSeconds=result.total_travel_seconds,
+        totalIdleTimeSeconds=result.total_idle_seconds,
     )
-    # search_parameters.time_limit.seconds = 30 # Example time limit
-    search_parameters.time_limit.FromSeconds(1) # TODO: SET TO REAL TIME LIMIT
-    # <<< Add solution limit to stop after first solution >>>
-    # search_parameters.solution_limit = 1 # <<< REMOVED
 
-    print("Starting OR-Tools solver...")
-    assignment = routing.SolveWithParameters(search_parameters)
-    print("Solver finished.")
+def build_job_status(job) -> SolveJobStatus:
+    """API status of a solve_queue.Job."""
+    status = SolveJobStatus(
+        jobId=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        waitSeconds=job.started_at - job.enqueued_at if job.started_at is not None else None,
+        solveSeconds=job.finished_at - job.started_at if job.finished_at is not None and job.started_at is not None else None,
+        error=job.error,
+        errorStatusCode=job.status_code,
+    )
+    if job.result is not None:
+        status.result = OptimizationResponsePayload.model_validate_json(job.result)
+    return status
 
-    # --- Process Results ---
+def build_routes(instance: ProblemInstance, route_results, time_format: str = 'iso') -> List[TechnicianRoute]:
+    """API routes from core RouteResults; time_format 'unix' leaves out the ISO strings."""
+    include_iso = time_format == 'iso'
     routes: List[TechnicianRoute] = []
-    assigned_item_ids = set()
-
-    if assignment:
-        print("Solution found.")
-        # Define helper to find item by location index safely
-        def find_item_by_location(loc_idx):
-            for item in payload.items:
-                if item.locationIndex == loc_idx:
-                    return item
-            return None
-            
-        for vehicle_id in range(num_vehicles):
-            index = routing.Start(vehicle_id)
-            technician_id = payload.technicians[vehicle_id].id
-            route_stops: List[RouteStop] = []
-            total_travel_time_seconds = 0
-            is_first_segment = True # Flag to handle the first move differently
-
-            while True: # Loop until we explicitly break at the end node
-                # Get the next index in the route assigned by the solver
-                next_index = assignment.Value(routing.NextVar(index))
-
-                # Calculate travel time for the segment from current index to next index
-                # Use the original travel_time_callback which returns duration in seconds
-                segment_travel_time = travel_time_callback(index, next_index)
-                
-                # --- Accumulate travel time ---
-                # Only add segment travel if it's not a loop back to the start or from the start to itself immediately
-                # And only if the travel time is reasonable (not the large penalty)
-                if index != next_index and segment_travel_time < 999999:
-                    # Check if 'index' is the start node for this vehicle
-                    is_start_node = (index == routing.Start(vehicle_id))
-                    # Check if 'next_index' is the end node for this vehicle
-                    is_end_node = routing.IsEnd(next_index)
-
-                    # Accumulate travel time unless it's the very first move from start OR the very last move to end?
-                    # OR-Tools objective includes all travel. Let's just sum it simply first.
-                    # Correction: Sum ALL valid segment travel times. The total is needed later.
-                    total_travel_time_seconds += segment_travel_time
-
-                # --- Check if the next node is the end node for this vehicle ---
-                if routing.IsEnd(next_index):
-                    # We have completed the route segments for this vehicle.
-                    print(f"Vehicle {vehicle_id}: Reached end node {manager.IndexToNode(next_index)}. Total travel calculated: {total_travel_time_seconds}s")
-                    break # Exit the while loop
-
-                # --- Process the stop at `next_index` (it's not the end node) ---
-                node_index = manager.IndexToNode(next_index)
-                current_item = find_item_by_location(node_index)
-
-                if current_item:
-                    assigned_item_ids.add(current_item.id)
-
-                    # --- Get relative times from solver ---
-                    current_start_time_var = time_dimension.CumulVar(next_index)
-                    current_start_time_rel = assignment.Value(current_start_time_var)
-                    
-                    # --- Calculate Arrival Time using Slack Var ---
-                    #current_slack_var = time_dimension.SlackVar(next_index)
-                    #current_wait_time_rel = assignment.Value(current_slack_var) # Wait time before service
-                    #arrival_at_next_rel = current_start_time_rel - current_wait_time_rel
-                    # --- End Arrival Time Calculation ---
-                    
-                    current_service_duration = current_item.durationSeconds # Duration is absolute
-                    current_end_time_rel = current_start_time_rel + current_service_duration
-                    
-                    # Calculate arrival time relative to planning epoch
-                    if is_first_segment:
-                        # For the first segment, departure is based on technician's earliest start
-                        tech_earliest_start_abs = iso_to_seconds(payload.technicians[vehicle_id].earliestStartTimeISO)
-                        departure_from_index_rel = max(0, tech_earliest_start_abs - planning_epoch_seconds)
-                        # No service duration at the actual start node
-                    else:
-                        # For subsequent segments, departure is based on the previous stop's scheduled start + service
-                        start_cumul_var = time_dimension.CumulVar(index)
-                        start_cumul_rel = assignment.Value(start_cumul_var) # Time when service at 'index' CAN start
-                        previous_service_duration = service_time_callback(index) # Service duration at the previous node 'index'
-                        departure_from_index_rel = start_cumul_rel + previous_service_duration
-
-                    # Physical arrival is departure + travel
-                    physical_arrival_at_next_rel = departure_from_index_rel + segment_travel_time # <-- Use this for arrivalTimeISO
-
-                    # Scheduled start time is dictated by the solver, respecting constraints (like fixed times)
-                    scheduled_start_time_rel = assignment.Value(time_dimension.CumulVar(next_index)) # <-- Use this for startTimeISO
-                    scheduled_end_time_rel = scheduled_start_time_rel + current_service_duration # <-- Use this for endTimeISO
-                    # --- End Calculation ---
-
-                    # --- Convert relative times to absolute Unix seconds ---
-                    arrival_at_next_abs = physical_arrival_at_next_rel + planning_epoch_seconds
-                    current_start_time_abs = scheduled_start_time_rel + planning_epoch_seconds
-                    current_end_time_abs = scheduled_end_time_rel + planning_epoch_seconds
-
-                    # Consistency check (optional but good for debugging)
-                    # Check if absolute start time is >= absolute arrival time (allowing for minimal slack)
-                    # if current_start_time_abs < arrival_at_next_abs - 1: # Allow 1s tolerance
-                    #      print(f"!!! WARNING Vehicle {vehicle_id}, Item {current_item.id}: Solver abs start time {current_start_time_abs} ({seconds_to_iso(current_start_time_abs)}) is earlier than calculated abs arrival {arrival_at_next_abs} ({seconds_to_iso(arrival_at_next_abs)}). Diff: {arrival_at_next_abs - current_start_time_abs}s. Check model.")
-
-                    # <<< Remove Debug Prints (already removed most in previous edit)
-                    # print(f"DEBUG Vehicle {vehicle_id}, Item {current_item.id}:")
-                    # print(f"  - Prev Node Idx: {manager.IndexToNode(index)}, Curr Node Idx: {manager.IndexToNode(next_index)}")
-                    # print(f"  - physical_arrival_at_next_rel: {physical_arrival_at_next_rel}")
-                    # print(f"  - scheduled_start_time_rel:   {scheduled_start_time_rel}")
-                    # print(f"  - arrival_at_next_abs:        {arrival_at_next_abs} -> {seconds_to_iso(arrival_at_next_abs)}")
-                    # print(f"  - current_start_time_abs:     {current_start_time_abs} -> {seconds_to_iso(current_start_time_abs)}")
-                    # print(f"  - current_end_time_abs:       {current_end_time_abs} -> {seconds_to_iso(current_end_time_abs)}")
-                    # <<< End Debug Prints >>>
-
-                    route_stops.append(RouteStop(
-                        itemId=current_item.id,
-                        arrivalTimeISO=seconds_to_iso(arrival_at_next_abs),
-                        startTimeISO=seconds_to_iso(current_start_time_abs),
-                        endTimeISO=seconds_to_iso(current_end_time_abs)
-                    ))
-                else:
-                    # This case should ideally not happen if only item locations are visited besides start/end
-                    # unless an item is located *at* a depot.
-                    # Let's verify if node_index corresponds to a start/end depot location for this vehicle.
-                    tech_start_loc = payload.technicians[vehicle_id].startLocationIndex
-                    tech_end_loc = payload.technicians[vehicle_id].endLocationIndex
-                    if node_index == tech_start_loc:
-                        print(f"Debug: Vehicle {vehicle_id} visited its own start depot {node_index} mid-route?")
-                    elif node_index == tech_end_loc:
-                         print(f"Debug: Vehicle {vehicle_id} visited its own end depot {node_index} mid-route?")
-                    else:
-                         # Check if it's another vehicle's depot
-                         is_any_depot = False
-                         for t in payload.technicians:
-                             if node_index == t.startLocationIndex or node_index == t.endLocationIndex:
-                                 is_any_depot = True
-                                 break
-                         if is_any_depot:
-                            print(f"Debug: Vehicle {vehicle_id} visited depot node {node_index} (solver index {next_index}) mid-route. No item found.")
-                         else:
-                             # Truly unexpected node
-                             print(f"Warning: Could not find item for non-depot node index {node_index} (solver index {next_index}) in route for vehicle {vehicle_id}")
-
-                # Move to the next node for the next iteration
-                index = next_index
-                is_first_segment = False # No longer the first segment
-                # --- End of loop iteration ---
-
-            # --- After loop for one vehicle --- 
-            total_duration_seconds = 0
-            if route_stops:
-                 # Duration from first arrival to last end time
-                 first_stop_arrival = iso_to_seconds(route_stops[0].arrivalTimeISO)
-                 last_stop_end = iso_to_seconds(route_stops[-1].endTimeISO)
-                 total_duration_seconds = last_stop_end - first_stop_arrival
-            
-            # Only add routes that actually have stops
-            if route_stops:
-                # Re-verify technician eligibility (should be guaranteed by solver if model is correct, but good practice)
-                is_route_valid = True
-                for stop in route_stops:
-                    item_payload_idx = item_id_to_payload_index.get(stop.itemId)
-                    if item_payload_idx is None: continue 
-                    item = payload.items[item_payload_idx]
-                    if technician_id not in item.eligibleTechnicianIds:
-                        print(f"Error: Solver assigned item {stop.itemId} to ineligible technician {technician_id}. Route invalid.")
-                        is_route_valid = False
-                        # Mark items from this invalid route as unassigned
-                        for s in route_stops: assigned_item_ids.discard(s.itemId)
-                        break 
-                
-                if is_route_valid:
-                    routes.append(TechnicianRoute(
-                        technicianId=technician_id,
-                        stops=route_stops,
-                        totalTravelTimeSeconds=total_travel_time_seconds,
-                        totalDurationSeconds=total_duration_seconds
-                    ))
-
-        # --- After processing all vehicles --- 
-        unassigned_item_ids = [item.id for item in payload.items if item.id not in assigned_item_ids]
-        
-        status: Literal['success', 'partial', 'error']
-        message: str
-        if not unassigned_item_ids:
-            status = 'success'
-            message = 'Optimization successful. All items scheduled.'
-        elif len(unassigned_item_ids) < num_items:
-            status = 'partial'
-            message = f'Optimization partially successful. {len(unassigned_item_ids)} items could not be scheduled.'
-            print(f"Unassigned items: {unassigned_item_ids}")
-        else: # All items unassigned
-             status = 'error' # Treat as error if nothing could be scheduled
-             message = 'Optimization failed. No routes could be assigned.'
-             print(f"All items were unassigned.")
-
-        if assignment: # Check if a solution was found
-            print(f"Solver finished. Final Objective Value: {assignment.ObjectiveValue()}")
-
-        return OptimizationResponsePayload(
-            status=status,
-            message=message,
-            routes=routes,
-            unassignedItemIds=unassigned_item_ids
+    for route in route_results:
+        stops = [
+            RouteStop(
+                itemId=instance.item_ids[item_idx],
+                arrivalTimeISO=seconds_to_iso(arrival) if include_iso else None,
+                startTimeISO=seconds_to_iso(start) if include_iso else None,
+                endTimeISO=seconds_to_iso(end) if include_iso else None,
+                arrivalTimeUnix=arrival,
+                startTimeUnix=start,
+                endTimeUnix=end,
+                travelTimeSeconds=travel,
+                idleTimeSeconds=idle,
+            )
+            for item_idx, arrival, start, end, travel, idle
+            in zip(route.item_indices, route.arrival, route.start, route.end, route.travel, route.idle)
+        ]
+        routes.append(TechnicianRoute(
+            technicianId=route.technician_id,
+            stops=stops,
+            totalTravelTimeSeconds=route.total_travel_seconds,
+            totalDurationSeconds=route.total_duration_seconds,
+            totalIdleTimeSeconds=route.total_idle_seconds,
+        ))
+    return routes
+
+def build_response(instance: ProblemInstance, result: SolveResult, time_format: str = 'iso') -> OptimizationResponsePayload:
+    """Turns a core SolveResult into the API response; time_format 'unix' leaves out the ISO strings."""
+    routes = build_routes(instance, result.routes, time_format)
+    solver_stats = None
+    if result.solver_ran:
+        solver_stats = SolverStats(
+            objectiveValue=result.objective_value,
+            solveTimeSeconds=result.solve_time_seconds,
+            vehicleClasses=result.vehicle_classes,
+            stopReason=result.stop_reason,
         )
-    else:
-        print("No solution found by the solver.")
-        # No solution found
-        return OptimizationResponsePayload(
-            status='error',
-            message='Optimization failed. No solution found.',
-            routes=[],
-            unassignedItemIds=[item.id for item in payload.items] # All items are unassigned
+    return OptimizationResponsePayload(
+        status=result.status,
+        message=result.message,
+        routes=routes,
+        unassignedItemIds=result.unassigned_item_ids,
+        unassignedItemReasons=result.unassigned_reasons,
+        solverStats=solver_stats,
+    )
+
+# --- Warm-up ---
+
+# Seconds the warm-up solve took; None while the worker is still cold
+SOLVER_WARM_UP_SECONDS: Optional[float] = None
+_WARM_UP_LOCK = threading.Lock()
+
+def warm_up_solver() -> float:
+    """
+    Runs a one-item solve so OR-Tools, numpy and the pydantic validators are initialised before
+    the first real request. Called per worker by gunicorn.conf.py, or in the background at app
+    startup otherwise; only the first call solves. Returns the warm-up's elapsed seconds.
+    """
+    global SOLVER_WARM_UP_SECONDS
+    with _WARM_UP_LOCK:
+        if SOLVER_WARM_UP_SECONDS is not None:
+            return SOLVER_WARM_UP_SECONDS
+        payload = OptimizationRequestPayload(
+            locations=[{"id": i, "index": i, "coords": {"lat": 0.0, "lng": 0.0}} for i in range(2)],
+            technicians=[{"id": 1, "startLocationIndex": 0, "endLocationIndex": 0,
+                          "earliestStartTimeUnix": 0, "latestEndTimeUnix": 3600}],
+            items=[{"id": "warmup", "locationIndex": 1, "durationSeconds": 60, "priority": 1, "eligibleTechnicianIds": [1]}],
+            fixedConstraints=[],
+            travelTimeMatrix={0: {1: 60}, 1: {0: 60}},
+            solverOptions={"solutionLimit": 1, "timeLimitSeconds": 1},
         )
+        print("Warming up the solver...")
+        started = time.perf_counter()
+        response = solve_schedule(payload)
+        if response.status != 'success':
+            raise RuntimeError(f"Solver warm-up failed: {response.message}")
+        SOLVER_WARM_UP_SECONDS = time.perf_counter() - started
+        print(f"Solver warm-up finished in {SOLVER_WARM_UP_SECONDS:.3f}s.")
+        return SOLVER_WARM_UP_SECONDS
+
+def _warm_up_in_background() -> None:
+    try:
+        warm_up_solver()
+    except Exception as e: # The worker still serves; /ready just stays cold
+        print(f"Warning: solver warm-up failed: {e}")
 
 # Example of how to run this locally (requires uvicorn):
 # uvicorn main:app --reload --port 8000 
@@ -0,0 +1,183 @@
+"""
+Memory estimates, a per-request memory budget, and peak RSS measurement for solves.
+
+A request's memory grows with the square of its size and goes to two places:
+
+- the parsed payload: as Python objects, the nested-dict travel matrix holds about 100 bytes
+  per entry for the whole request, and parsing it peaks at about 13x the JSON body;
+- the solve: the dense matrix and pre-solve's shortest-path temporaries (about 30 bytes per
+  location pair), then per-node tables, arc masks and the OR-Tools model (about 17 bytes per
+  pair of routing nodes).
+
+A single oversized payload can push the container past its memory limit and take down every
+solve running on it. With `SOLVE_MEMORY_BUDGET_MB` set, requests are checked against that
+budget from their counts, before anything is built:
+
+- body too large to even parse within the budget  -> MemoryBudgetError (HTTP 413)
+- solve over budget, SOLVE_MEMORY_OVERFLOW=reject -> MemoryBudgetError (HTTP 413, the default)
+- solve over budget, SOLVE_MEMORY_OVERFLOW=decompose -> solved in parts that each fit
+  (decomposition.py), unless even those would not fit
+
+The budget is per request; with several concurrent solves, set it to the container limit
+divided by SOLVER_MAX_CONCURRENT. The coefficients below were measured on generated payloads.
+Each solve reports its estimate and its measured peak RSS, so they can be recalibrated from
+captured traffic.
+"""
+import math
+import os
+import threading
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+MB = 1024 * 1024
+PARSED_BYTES_PER_BODY_BYTE = 13     # Peak while parsing a JSON request body into the pydantic models
+PARSED_BYTES_PER_MATRIX_ENTRY = 100 # Held by the parsed payload afterwards
+SOLVE_BASE_BYTES = 20 * MB          # Model scaffolding, independent of size
+SOLVE_BYTES_PER_LOCATION_PAIR = 30  # Dense int64 travel matrix, pre-solve temporaries
+SOLVE_BYTES_PER_NODE_PAIR = 17      # Node tables, arc masks, OR-Tools successor domains
+
+OVERFLOW_REJECT = "reject"
+OVERFLOW_DECOMPOSE = "decompose"
+# Parts beyond this aren't worth it: routes can't cross parts, so quality drops with every split
+MAX_PARTS = 16
+
+
+class MemoryBudgetError(Exception):
+    """The request's estimated memory is over the budget (and it can't be split to fit)."""
+    def __init__(self, message: str, estimated_bytes: int):
+        super().__init__(message)
+        self.estimated_bytes = estimated_bytes
+
+
+def estimate_body_bytes(body_bytes: int) -> int:
+    """Memory of a JSON request body once parsed into the pydantic models."""
+    return PARSED_BYTES_PER_BODY_BYTE * body_bytes
+
+
+def estimate_payload_bytes(matrix_entries: int) -> int:
+    """Memory held by an already parsed payload, dominated by its nested-dict travel matrix."""
+    return PARSED_BYTES_PER_MATRIX_ENTRY * matrix_entries
+
+
+def routing_nodes(num_locations: int, num_items: int, num_techs: int) -> int:
+    """Routing nodes of a solve: one per item plus the distinct start/end locations (at most two per technician)."""
+    return num_items + min(num_locations, 2 * num_techs)
+
+
+def estimate_solve_bytes(num_locations: int, num_items: int, num_techs: int) -> int:
+    """Peak memory a solve adds on top of the parsed payload."""
+    nodes = routing_nodes(num_locations, num_items, num_techs)
+    return (SOLVE_BASE_BYTES + SOLVE_BYTES_PER_LOCATION_PAIR * num_locations ** 2
+            + SOLVE_BYTES_PER_NODE_PAIR * nodes ** 2)
+
+
+class MemoryBudget:
+    """Checks request estimates against a budget in bytes; `overflow` is OVERFLOW_REJECT or OVERFLOW_DECOMPOSE."""
+
+    def __init__(self, budget_bytes: int, overflow: str = OVERFLOW_REJECT):
+        if overflow not in (OVERFLOW_REJECT, OVERFLOW_DECOMPOSE):
+            raise ValueError(f"Unknown memory overflow mode '{overflow}'. Expected '{OVERFLOW_REJECT}' or '{OVERFLOW_DECOMPOSE}'.")
+        self.budget_bytes = budget_bytes
+        self.overflow = overflow
+
+    def check_body(self, body_bytes: int) -> None:
+        """Raises MemoryBudgetError if parsing a body of this size alone would exceed the budget."""
+        estimate = estimate_body_bytes(body_bytes)
+        if estimate > self.budget_bytes:
+            raise MemoryBudgetError(
+                f"Request body of {body_bytes // MB} MB would need about {estimate // MB} MB to parse, "
+                f"over the {self.budget_bytes // MB} MB memory budget.", estimate)
+
+    def plan(self, payload_bytes: int, num_locations: int, num_items: int, num_techs: int) -> int:
+        """
+        How many parts to solve the request in: 1 when it fits, more with OVERFLOW_DECOMPOSE.
+        Each part solves about 1/parts of the nodes, so its node-pair memory drops by parts².
+        Raises MemoryBudgetError when the request doesn't fit either way.
+        """
+        solve_bytes = estimate_solve_bytes(num_locations, num_items, num_techs)
+        total = payload_bytes + solve_bytes
+        if total <= self.budget_bytes:
+            return 1
+        # The parsed payload and the dense matrix stay whole; only the node pairs shrink
+        fixed = payload_bytes + SOLVE_BASE_BYTES + SOLVE_BYTES_PER_LOCATION_PAIR * num_locations ** 2
+        node_pairs = SOLVE_BYTES_PER_NODE_PAIR * routing_nodes(num_locations, num_items, num_techs) ** 2
+        parts = math.ceil(math.sqrt(node_pairs / (self.budget_bytes - fixed))) if self.budget_bytes > fixed else None
+        message = (f"Request needs an estimated {total // MB} MB ({num_locations} locations, {num_items} items, "
+                   f"{num_techs} technicians), over the {self.budget_bytes // MB} MB memory budget.")
+        if self.overflow == OVERFLOW_REJECT:
+            raise MemoryBudgetError(message, total)
+        if parts is None or parts > min(MAX_PARTS, num_techs, max(1, num_items)):
+            raise MemoryBudgetError(message + " It is too large to solve in parts either.", total)
+        return parts
+
+
+def budget_from_env(environ: Optional[Dict[str, str]] = None) -> Optional[MemoryBudget]:
+    """A MemoryBudget from SOLVE_MEMORY_BUDGET_MB and SOLVE_MEMORY_OVERFLOW, or None when no budget is set."""
+    env = os.environ if environ is None else environ
+    budget_mb = float(env.get("SOLVE_MEMORY_BUDGET_MB") or 0)
+    if budget_mb <= 0:
+        return None
+    return MemoryBudget(int(budget_mb * MB), env.get("SOLVE_MEMORY_OVERFLOW") or OVERFLOW_REJECT)
+
+
+# --- Peak RSS ---
+
+_PROC_STATUS = "/proc/self/status"
+_PROC_CLEAR_REFS = "/proc/self/clear_refs"
+_meter_lock = threading.Lock()
+_active_meters = 0
+
+
+def _read_peak_rss() -> Optional[int]:
+    """The process's peak RSS in bytes: VmHWM on Linux, else getrusage's lifetime maximum."""
+    try:
+        with open(_PROC_STATUS) as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024 # Bytes on macOS, KB elsewhere
+
+
+def _reset_peak_rss() -> bool:
+    """Resets VmHWM to the current RSS (Linux 4.0+); False where that isn't possible."""
+    try:
+        with open(_PROC_CLEAR_REFS, "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+class PeakRssMeter:
+    """
+    Context manager recording the process's peak RSS over a block in `peak_bytes`. The peak is
+    reset on entry when no other meter is active, so it covers just this block, plus anything
+    running alongside it (the process is shared). Where it can't be reset, it is the process's
+    lifetime peak, an upper bound.
+    """
+
+    def __init__(self):
+        self.peak_bytes: Optional[int] = None
+
+    def __enter__(self) -> "PeakRssMeter":
+        global _active_meters
+        with _meter_lock:
+            if _active_meters == 0:
+                _reset_peak_rss()
+            _active_meters += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        global _active_meters
+        self.peak_bytes = _read_peak_rss()
+        with _meter_lock:
+            _active_meters -= 1
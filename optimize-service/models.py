@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Dict, Optional, Union, Literal
 
 # --- Request Payload Models ---
@@ -16,8 +16,18 @@ class OptimizationTechnician(BaseModel):
     id: int                 # Technician ID
     startLocationIndex: int # Index of their starting location in the locations array
     endLocationIndex: int   # Index of their ending location (e.g., depot or home base)
-    earliestStartTimeISO: str # ISO 8601 string for earliest availability
-    latestEndTimeISO: str   # ISO 8601 string for end of work day
+    earliestStartTimeISO: Optional[str] = None # ISO 8601 string for earliest availability
+    latestEndTimeISO: Optional[str] = None     # ISO 8601 string for end of work day
+    earliestStartTimeUnix: Optional[int] = None # Same times as Unix seconds; used instead of the ISO strings when set
+    latestEndTimeUnix: Optional[int] = None
+
+    @model_validator(mode='after')
+    def _require_times(self):
+        if self.earliestStartTimeISO is None and self.earliestStartTimeUnix is None:
+            raise ValueError("earliestStartTimeISO or earliestStartTimeUnix is required")
+        if self.latestEndTimeISO is None and self.latestEndTimeUnix is None:
+            raise ValueError("latestEndTimeISO or latestEndTimeUnix is required")
+        return self
 
 class OptimizationItem(BaseModel):
     id: str                 # Unique identifier (e.g., "job_123", "bundle_456")
@@ -28,7 +38,30 @@ class OptimizationItem(BaseModel):
 
 class OptimizationFixedConstraint(BaseModel):
     itemId: str             # ID of the OptimizationItem this applies to
-    fixedTimeISO: str       # ISO 8601 string for the mandatory start time
+    fixedTimeISO: Optional[str] = None  # ISO 8601 string for the mandatory start time
+    fixedTimeUnix: Optional[int] = None # Same time as Unix seconds; used instead of fixedTimeISO when set
+
+    @model_validator(mode='after')
+    def _require_time(self):
+        if self.fixedTimeISO is None and self.fixedTimeUnix is None:
+            raise ValueError("fixedTimeISO or fixedTimeUnix is required")
+        return self
+
+class OptimizationSolverOptions(BaseModel):
+    # Every field is optional; unset fields fall back to the loaded solver profile, then built-in defaults
+    firstSolutionStrategy: Optional[str] = None    # Name of an OR-Tools FirstSolutionStrategy, e.g. "PATH_CHEAPEST_ARC"
+    localSearchMetaheuristic: Optional[str] = None # Name of an OR-Tools LocalSearchMetaheuristic, e.g. "GUIDED_LOCAL_SEARCH"
+    timeLimitSeconds: Optional[float] = None       # Solver wall-clock budget
+    basePenalty: Optional[int] = None              # Penalty per priority level for dropping an item
+    solutionLimit: Optional[int] = None            # Stop after this many solutions (deterministic, unlike the time limit)
+    randomSeed: Optional[int] = None               # Re-seeds the solver's random generator for reproducible runs
+    symmetryBreaking: Optional[bool] = None        # Restrict interchangeable technicians to one ordering of their routes
+    candidateSuccessors: Optional[int] = None      # Keep only each stop's k nearest successors/predecessors as arcs
+    # Early stopping (timeLimitSeconds stays the hard cap); checked whenever the search accepts a solution
+    stallSeconds: Optional[float] = None           # Stop once the objective hasn't improved for this long
+    stallSolutions: Optional[int] = None           # Stop once the objective hasn't improved for this many solutions
+    minRelativeImprovement: Optional[float] = None # Smallest relative improvement that counts for the stall rules (default 0: any)
+    stopGap: Optional[float] = None                # Stop once every item is assigned and the objective is within this fraction of a travel lower bound
 
 # Type alias for the nested dictionary structure
 TravelTimeMatrix = Dict[int, Dict[int, int]]
@@ -39,23 +72,129 @@ class OptimizationRequestPayload(BaseModel):
     items: List[OptimizationItem]
     fixedConstraints: List[OptimizationFixedConstraint]
     travelTimeMatrix: TravelTimeMatrix
+    solverOptions: Optional[OptimizationSolverOptions] = None # Optional: overrides for the solver search
+    responseTimeFormat: Literal['iso', 'unix'] = 'iso' # 'unix' leaves the ISO strings out of route stops
+    alternatives: int = Field(0, ge=0, le=20) # Also return up to this many other distinct good solutions found by the search
 
 # --- Response Payload Models ---
 
 class RouteStop(BaseModel):
     itemId: str             # ID of the OptimizationItem (job or bundle)
-    arrivalTimeISO: str     # Calculated arrival time
-    startTimeISO: str       # Calculated service start time
-    endTimeISO: str         # Calculated service end time
+    arrivalTimeISO: Optional[str] = None # Calculated arrival time (omitted with responseTimeFormat='unix')
+    startTimeISO: Optional[str] = None   # Calculated service start time
+    endTimeISO: Optional[str] = None     # Calculated service end time
+    arrivalTimeUnix: Optional[int] = None   # Same times as Unix seconds
+    startTimeUnix: Optional[int] = None
+    endTimeUnix: Optional[int] = None
+    travelTimeSeconds: Optional[int] = None # Travel on the leg into this stop
+    idleTimeSeconds: Optional[int] = None   # Waiting between arrival and service start
 
 class TechnicianRoute(BaseModel):
     technicianId: int
     stops: List[RouteStop]
     totalTravelTimeSeconds: Optional[int] = None # Optional: Total travel time for the route
     totalDurationSeconds: Optional[int] = None   # Optional: Total duration including service and travel
+    totalIdleTimeSeconds: Optional[int] = None   # Optional: Total waiting before stops
+
+class SolverStats(BaseModel):
+    objectiveValue: Optional[int] = None # Final objective (travel + drop penalties); None if no solution
+    solveTimeSeconds: float              # Wall time spent inside the OR-Tools search
+    vehicleClasses: Optional[int] = None # Distinct vehicle classes in the model (equivalent technicians share one)
+    stopReason: Optional[str] = None     # Why the search ended: TIME_LIMIT, SOLUTION_LIMIT, STALLED, GAP_REACHED or SEARCH_COMPLETED
+    estimatedMemoryMb: Optional[float] = None # Memory estimated from the request's counts before solving (see memory_guard.py)
+    peakRssMb: Optional[float] = None         # Measured process peak RSS during compile and solve
+    decompositionParts: Optional[int] = None  # Set when the request was solved in parts to fit the memory budget
+
+class AlternativeSchedule(BaseModel):
+    rank: int                     # 1 = the best alternative; the main routes are at least as good
+    objectiveValue: int           # Same measure as solverStats.objectiveValue
+    routes: List[TechnicianRoute]
+    unassignedItemIds: List[str]
+    techniciansUsed: int          # Technicians with at least one stop
+    totalTravelTimeSeconds: int
 
 class OptimizationResponsePayload(BaseModel):
     status: Literal['success', 'error', 'partial']
     message: Optional[str] = None # Optional message, especially on error
     routes: List[TechnicianRoute]
-    unassignedItemIds: Optional[List[str]] = None # List of item IDs that could not be scheduled 
\ No newline at end of file
+    unassignedItemIds: Optional[List[str]] = None # List of item IDs that could not be scheduled
+    unassignedItemReasons: Optional[Dict[str, str]] = None # Optional: reason code per unassigned item ID (see presolve.py)
+    solverStats: Optional[SolverStats] = None     # Optional: present whenever the solver actually ran 
+    alternatives: Optional[List[AlternativeSchedule]] = None # Only when the request asked for alternatives; best first
+# --- Route Evaluation (/evaluate-routes) ---
+
+class CandidatePlan(BaseModel):
+    id: Optional[str] = None      # Caller's label for the plan, echoed back in its evaluation
+    routes: List[TechnicianRoute] # Stop sequences to check; only technicianId and each stop's itemId are read
+
+class RouteEvaluationRequestPayload(OptimizationRequestPayload):
+    plans: List[CandidatePlan] # Evaluated independently against the payload's technicians, items and matrix
+
+class RouteViolation(BaseModel):
+    code: str                           # Violation code (see evaluation.py), e.g. "FIXED_TIME_MISSED"
+    technicianId: Optional[int] = None
+    itemId: Optional[str] = None
+    amountSeconds: Optional[int] = None # How late / how far over, for time violations
+
+class PlanEvaluation(BaseModel):
+    id: Optional[str] = None
+    feasible: bool                  # True if the plan has no violations
+    routes: List[TechnicianRoute]   # Computed stop times and totals, as /optimize-schedule reports them
+    unassignedItemIds: List[str]    # Payload items no route visits
+    violations: List[RouteViolation]
+    totalTravelTimeSeconds: int
+    totalIdleTimeSeconds: int
+
+class RouteEvaluationResponsePayload(BaseModel):
+    plans: List[PlanEvaluation]    # One per requested plan, in order
+    evaluationTimeSeconds: float   # Wall time spent evaluating all plans
+
+# --- What-if Scenarios (/optimize-scenarios) ---
+
+class TechnicianShiftChange(BaseModel):
+    technicianId: int
+    earliestStartTimeISO: Optional[str] = None  # Unset times keep the base shift's
+    latestEndTimeISO: Optional[str] = None
+    earliestStartTimeUnix: Optional[int] = None # Used instead of the ISO strings when set
+    latestEndTimeUnix: Optional[int] = None
+
+class ScenarioDelta(BaseModel):
+    id: str                                    # Scenario label in the comparison table
+    removeTechnicianIds: List[int] = []        # Technicians unavailable in this scenario (e.g. off sick)
+    addItems: List[OptimizationItem] = []      # Extra items; locationIndex refers to the base payload's locations
+    removeItemIds: List[str] = []
+    technicianWindows: List[TechnicianShiftChange] = [] # Changed shifts
+
+class ScenarioRequestPayload(OptimizationRequestPayload):
+    scenarios: List[ScenarioDelta]  # Deltas against this payload, each solved separately
+    includeBase: bool = True        # Also solve the unchanged payload as scenario "base" and compare against it
+    includeRoutes: bool = False     # Return every scenario's full response, not only its summary row
+
+class ScenarioSummary(BaseModel):
+    id: str
+    status: Literal['success', 'error', 'partial']
+    message: Optional[str] = None
+    objectiveValue: Optional[int] = None          # Travel + drop penalties, including items pre-solve ruled out (see scenarios.py)
+    unassignedCount: Optional[int] = None         # None if the scenario could not be solved at all
+    totalTravelTimeSeconds: Optional[int] = None
+    techniciansUsed: Optional[int] = None         # Technicians with at least one stop
+    objectiveDelta: Optional[int] = None  # Against the base scenario, when it was solved
+    unassignedDelta: Optional[int] = None
+    solveTimeSeconds: Optional[float] = None
+    response: Optional[OptimizationResponsePayload] = None # Only with includeRoutes
+
+class ScenarioResponsePayload(BaseModel):
+    scenarios: List[ScenarioSummary] # The base first (if included), then in request order
+    wallTimeSeconds: float
+
+# --- Solve Queue (/jobs) ---
+
+class SolveJobStatus(BaseModel):
+    jobId: str
+    status: Literal['queued', 'running', 'done', 'failed']
+    attempts: int = 0                        # Times a worker has claimed the job (more than 1 after a worker died)
+    waitSeconds: Optional[float] = None      # Queued until a worker claimed it (the last claim)
+    solveSeconds: Optional[float] = None     # Claimed until finished
+    result: Optional[OptimizationResponsePayload] = None # Once done
+    error: Optional[str] = None              # Once failed, with the status code /optimize-schedule would have answered
+    errorStatusCode: Optional[int] = None
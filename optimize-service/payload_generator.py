@@ -0,0 +1,154 @@
+"""Synthetic `OptimizationRequestPayload` generator.
+
+Produces realistic-looking scheduling problems (items scattered around a city
+centre, technicians with their own start locations and a shared end depot)
+for load testing and benchmarking without needing recorded production data.
+"""
+import math
+import random
+from typing import Any, Dict, List, Optional
+
+# Rough centre of the service area and the radius jobs are spread over.
+CENTER_LAT = 40.7128
+CENTER_LNG = -74.0060
+SPREAD_DEGREES = 0.15
+
+AVERAGE_SPEED_KMH = 40.0 # Used to turn straight-line distance into drive time
+FIXED_LEG_OVERHEAD_SECONDS = 120 # Parking / walking overhead added to every non-zero leg
+
+# Named problem sizes used by the load test and tuner: (items, technicians)
+PROFILES = {
+    "tiny": (3, 1),
+    "small": (8, 2),
+    "medium": (25, 4),
+    "large": (60, 8),
+}
+
+
+def _haversine_km(a: Dict[str, float], b: Dict[str, float]) -> float:
+    """Great-circle distance between two lat/lng dicts in kilometres."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (a["lat"], a["lng"], b["lat"], b["lng"]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def _travel_seconds(a: Dict[str, float], b: Dict[str, float]) -> int:
+    km = _haversine_km(a, b)
+    if km == 0:
+        return 0
+    return int(km / AVERAGE_SPEED_KMH * 3600) + FIXED_LEG_OVERHEAD_SECONDS
+
+
+def generate_payload(
+    num_items: int,
+    num_technicians: int,
+    seed: int = 0,
+    day: str = "2024-04-15",
+    fixed_constraint_ratio: float = 0.1,
+    eligibility_ratio: float = 0.8,
+    crew: bool = False,
+) -> Dict[str, Any]:
+    """
+    Builds a JSON-ready request payload dict.
+
+    Locations are laid out as items first, then one start location per technician,
+    then a single shared end depot, so item and depot indices never collide.
+    With `crew=True` every technician starts and ends at the depot on the same 08:00-17:00
+    shift, which (with `eligibility_ratio=1.0`) makes them fully interchangeable.
+    """
+    rng = random.Random(seed)
+
+    coords: List[Dict[str, float]] = []
+    locations: List[Dict[str, Any]] = []
+
+    def add_location(loc_id: str) -> int:
+        point = {
+            "lat": round(CENTER_LAT + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES), 6),
+            "lng": round(CENTER_LNG + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES), 6),
+        }
+        index = len(locations)
+        coords.append(point)
+        locations.append({"id": loc_id, "index": index, "coords": point})
+        return index
+
+    item_location_indices = [add_location(f"item_loc_{i}") for i in range(num_items)]
+    tech_start_indices = [add_location(f"tech_start_{t + 1}") for t in range(num_technicians)]
+    depot_index = add_location("depot")
+
+    technician_ids = [t + 1 for t in range(num_technicians)]
+    technicians = []
+    for tech_id, start_index in zip(technician_ids, tech_start_indices):
+        start_hour = rng.choice([7, 8, 8, 9])
+        end_hour = start_hour + rng.choice([8, 9, 10])
+        if crew:
+            start_index, start_hour, end_hour = depot_index, 8, 17
+        technicians.append({
+            "id": tech_id,
+            "startLocationIndex": start_index,
+            "endLocationIndex": depot_index,
+            "earliestStartTimeISO": f"{day}T{start_hour:02d}:00:00Z",
+            "latestEndTimeISO": f"{day}T{end_hour:02d}:00:00Z",
+        })
+
+    items = []
+    for i, loc_index in enumerate(item_location_indices):
+        eligible = [tech_id for tech_id in technician_ids if rng.random() < eligibility_ratio]
+        if not eligible and technician_ids:
+            eligible = [rng.choice(technician_ids)]
+        items.append({
+            "id": f"job_{i}",
+            "locationIndex": loc_index,
+            "durationSeconds": rng.choice([900, 1800, 2700, 3600, 5400]),
+            "priority": rng.randint(1, 3),
+            "eligibleTechnicianIds": eligible,
+        })
+
+    fixed_constraints = []
+    for item in items:
+        if rng.random() < fixed_constraint_ratio:
+            hour = rng.randint(10, 15)
+            fixed_constraints.append({"itemId": item["id"], "fixedTimeISO": f"{day}T{hour:02d}:00:00Z"})
+
+    travel_time_matrix = {
+        i: {j: _travel_seconds(coords[i], coords[j]) for j in range(len(coords))}
+        for i in range(len(coords))
+    }
+
+    return {
+        "locations": locations,
+        "technicians": technicians,
+        "items": items,
+        "fixedConstraints": fixed_constraints,
+        "travelTimeMatrix": travel_time_matrix,
+    }
+
+
+def generate_profile_payload(profile: str, seed: int = 0, **kwargs: Any) -> Dict[str, Any]:
+    """Generates a payload for one of the named `PROFILES`."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown payload profile '{profile}'. Expected one of {sorted(PROFILES)}.")
+    num_items, num_technicians = PROFILES[profile]
+    return generate_payload(num_items, num_technicians, seed=seed, **kwargs)
+
+
+def parse_mix(mix: str, default_profile: Optional[str] = "small") -> Dict[str, int]:
+    """
+    Parses a weighted profile mix such as ``"small=3,medium=1"`` into ``{"small": 3, "medium": 1}``.
+    A bare profile name gets weight 1.
+    """
+    weights: Dict[str, int] = {}
+    for part in (p.strip() for p in mix.split(",")):
+        if not part:
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in PROFILES:
+            raise ValueError(f"Unknown payload profile '{name}'. Expected one of {sorted(PROFILES)}.")
+        weights[name] = int(weight) if weight else 1
+        if weights[name] < 0:
+            raise ValueError(f"Weight for profile '{name}' must be non-negative.")
+    if not weights and default_profile:
+        weights[default_profile] = 1
+    if not any(weights.values()):
+        raise ValueError("Payload mix must contain at least one profile with a positive weight.")
+    return weights
@@ -0,0 +1,106 @@
+"""Reading saved request payloads from disk for the offline tools (tuner, replay, batch)."""
+import gzip
+import io
+import json
+import os
+from typing import Any, Dict, Iterator, List, Tuple
+
+try:
+    import zstandard
+except ImportError: # Optional: only needed for .json.zst files
+    zstandard = None
+
+# Extensions recognised as payload files when scanning a directory
+PAYLOAD_EXTENSIONS = (".json", ".json.gz", ".json.zst", ".npz")
+# Files batch.py writes next to payloads; never read back as payloads
+RESPONSE_SUFFIX = ".response.json"
+BATCH_SUMMARY_NAME = "batch_summary.json"
+
+def is_payload_file(path: str) -> bool:
+    name = os.path.basename(path)
+    if name.endswith(RESPONSE_SUFFIX) or name == BATCH_SUMMARY_NAME:
+        return False
+    return name.endswith(PAYLOAD_EXTENSIONS)
+
+
+def load_json_file(path: str) -> Dict[str, Any]:
+    """Loads a plain, gzip- or zstd-compressed JSON file."""
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the 'zstandard' package.")
+        with open(path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            return json.load(io.TextIOWrapper(reader, encoding="utf-8"))
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_npz_payload(path: str):
+    """
+    Loads a binary payload file: an .npz with the payload JSON (minus its matrix) as bytes
+    under "payload" and the dense travel matrix under "travel_time_matrix".
+    Returns (payload dict, matrix array).
+    """
+    import numpy as np
+    with np.load(path, allow_pickle=False) as data:
+        payload = json.loads(data["payload"].tobytes().decode("utf-8"))
+        matrix = data["travel_time_matrix"]
+    payload.setdefault("travelTimeMatrix", {})
+    return payload, matrix
+
+
+def dense_travel_matrix(payload: Dict[str, Any]):
+    """A payload dict's travelTimeMatrix as a dense int32 (locations x locations) array; missing legs get the sentinel."""
+    import numpy as np
+    from presolve import TRAVEL_TIME_SENTINEL
+    n = len(payload["locations"])
+    matrix = np.full((n, n), TRAVEL_TIME_SENTINEL, dtype=np.int32)
+    for from_idx, row in payload.get("travelTimeMatrix", {}).items():
+        for to_idx, seconds in row.items():
+            if 0 <= int(from_idx) < n and 0 <= int(to_idx) < n:
+                matrix[int(from_idx), int(to_idx)] = seconds
+    return matrix
+
+
+def save_npz_payload(path: str, payload: Dict[str, Any]) -> None:
+    """Writes a payload dict as a binary payload file, densifying its travelTimeMatrix."""
+    import numpy as np
+    header = json.dumps({**payload, "travelTimeMatrix": {}}).encode("utf-8")
+    np.savez(path, payload=np.frombuffer(header, dtype=np.uint8), travel_time_matrix=dense_travel_matrix(payload))
+
+
+def load_payload_and_matrix(path: str):
+    """
+    Loads a payload dict plus, for binary payload files, its dense travel matrix (else None).
+    Capture records written by capture.py are unwrapped.
+    """
+    if path.endswith(".npz"):
+        return load_npz_payload(path)
+    data = load_json_file(path)
+    if "payload" in data and "items" not in data:
+        return data["payload"], None
+    return data, None
+
+
+def load_payload_file(path: str) -> Dict[str, Any]:
+    """Loads a payload dict, unwrapping capture records written by capture.py."""
+    payload, matrix = load_payload_and_matrix(path)
+    if matrix is not None: # The JSON-only tools get the matrix back in dict form
+        payload["travelTimeMatrix"] = {i: {j: int(v) for j, v in enumerate(row)} for i, row in enumerate(matrix.tolist())}
+    return payload
+
+
+def list_payload_files(path: str) -> List[str]:
+    """Returns `path` itself if it is a file, otherwise every payload file under it, sorted."""
+    if os.path.isfile(path):
+        return [path]
+    found = []
+    for root, _, files in os.walk(path):
+        found.extend(os.path.join(root, name) for name in files if is_payload_file(name))
+    return sorted(found)
+
+
+def iter_payloads(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields (file path, payload dict) for every payload file under `path`."""
+    for file_path in list_payload_files(path):
+        yield file_path, load_payload_file(file_path)
@@ -0,0 +1,292 @@
+"""
+Pre-solve reduction: decides up front which items can possibly be served, and by whom.
+
+Everything is computed on dense numpy arrays (items x technicians) so the cost stays
+negligible next to the solve even for large payloads. Items no technician can serve are
+reported as unassigned with a reason code and never become routing nodes.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Travel time used by the payload builder (and the service) for unknown/unreachable legs
+TRAVEL_TIME_SENTINEL = 999999
+
+# Unassigned reason codes reported in `unassignedItemReasons`
+REASON_INVALID_LOCATION = "INVALID_LOCATION"             # locationIndex outside the locations list
+REASON_NO_ELIGIBLE_TECHNICIAN = "NO_ELIGIBLE_TECHNICIAN" # none of the eligible technician ids are in the payload
+REASON_UNREACHABLE = "UNREACHABLE"                       # every eligible tech's start->item or item->end leg is the sentinel
+REASON_OUTSIDE_TIME_WINDOW = "OUTSIDE_TIME_WINDOW"       # travel + service can't fit in any eligible tech's shift
+REASON_FIXED_TIME_UNREACHABLE = "FIXED_TIME_UNREACHABLE" # no eligible tech can be there at the fixed time and still finish
+REASON_DROPPED_BY_SOLVER = "DROPPED_BY_SOLVER"           # viable, but the solver chose not to serve it
+REASON_INELIGIBLE_ASSIGNMENT = "INELIGIBLE_ASSIGNMENT"   # removed by the post-solve eligibility re-check
+REASON_NO_SOLUTION = "NO_SOLUTION"                       # the solver found no solution at all
+
+
+def build_travel_matrix(payload, num_locations: int, dense: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Dense (locations x locations) travel matrix from a request's `travelTimeMatrix`, or from
+    `dense` when the matrix arrived as an array (binary payload files). A declared location is
+    0 from itself; missing entries, and rows/columns of indices not declared in
+    `payload.locations`, become the sentinel.
+    """
+    matrix = np.full((num_locations, num_locations), TRAVEL_TIME_SENTINEL, dtype=np.int64)
+    if dense is not None:
+        n = min(num_locations, dense.shape[0], dense.shape[1])
+        matrix[:n, :n] = dense[:n, :n]
+    else:
+        for from_idx, row in payload.travelTimeMatrix.items():
+            if not (0 <= from_idx < num_locations) or not row:
+                continue
+            to_indices = np.fromiter(row.keys(), dtype=np.int64, count=len(row))
+            values = np.fromiter(row.values(), dtype=np.int64, count=len(row))
+            in_range = (to_indices >= 0) & (to_indices < num_locations)
+            matrix[from_idx, to_indices[in_range]] = values[in_range]
+    np.fill_diagonal(matrix, 0)
+    undeclared = np.ones(num_locations, dtype=bool)
+    undeclared[[loc.index for loc in payload.locations if 0 <= loc.index < num_locations]] = False
+    matrix[undeclared, :] = TRAVEL_TIME_SENTINEL
+    matrix[:, undeclared] = TRAVEL_TIME_SENTINEL
+    return matrix
+
+
+def shortest_travel_from(matrix: np.ndarray, sources: np.ndarray) -> np.ndarray:
+    """
+    (sources x locations) shortest travel times, allowing stops in between. Road matrices
+    don't always satisfy the triangle inequality, so a direct leg alone is not a safe
+    lower bound. Iterates a min-plus relaxation per source until nothing improves; in
+    practice that's two or three rounds.
+    """
+    dist = matrix[sources].copy()
+    for s in range(len(sources)):
+        row = dist[s]
+        for _ in range(matrix.shape[0]):
+            relaxed = np.minimum(row, (row[:, None] + matrix).min(axis=0))
+            if np.array_equal(relaxed, row):
+                break
+            row = relaxed
+        dist[s] = np.minimum(row, TRAVEL_TIME_SENTINEL)
+    return dist
+
+
+@dataclass
+class PresolveResult:
+    feasible: np.ndarray       # bool (items x techs): tech can serve item within its shift
+    allowed: np.ndarray        # bool (items x techs): feasible, minus symmetric duplicates (see break_symmetry)
+    earliest_start: np.ndarray # int (items x techs): earliest service start relative to the planning epoch
+    latest_start: np.ndarray   # int (items x techs): latest service start that still lets the tech get home
+    window_start: np.ndarray   # int (items): earliest start over the techs that can serve the item
+    window_end: np.ndarray     # int (items): latest start over the techs that can serve the item
+    viable_items: List[int]    # payload indices of items that at least one tech can serve
+    reasons: Dict[str, str]    # item id -> reason code for items pruned before building the model
+    vehicle_groups: List[List[int]] # interchangeable technicians (2+ per group), in payload order
+
+    def vehicles_for(self, item_idx: int) -> List[int]:
+        """Vehicles the routing model may use for an item."""
+        return np.flatnonzero(self.allowed[item_idx]).tolist()
+
+
+def presolve(instance, symmetry_breaking: bool = False) -> PresolveResult:
+    """
+    Checks every (item, technician) pair against eligibility, the travel matrix and the
+    technician's shift: start + travel + duration + travel to the end location must fit
+    in [shift start, shift end], and fixed-time items must be reachable by their fixed time.
+    Travel here is the shortest path, so these are necessary conditions and never exclude
+    a schedule the solver could actually find.
+
+    `instance` is a compiled core.ProblemInstance: shifts and fixed times are relative to its
+    planning epoch. With `symmetry_breaking`, allowed vehicle sets are further reduced by
+    `break_symmetry`.
+    """
+    matrix = instance.travel_matrix
+    num_locations = matrix.shape[0]
+    item_loc = instance.item_location
+    duration = instance.item_duration
+    fixed = instance.item_fixed_time
+    start_loc = instance.tech_start_location
+    end_loc = instance.tech_end_location
+    win_start = instance.tech_window_start
+    win_end = instance.tech_window_end
+    eligible = instance.eligible
+
+    valid_loc = (item_loc >= 0) & (item_loc < num_locations)
+    safe_loc = np.where(valid_loc, item_loc, 0) # Keeps fancy indexing in bounds; masked out below
+
+    # Shortest start->item and item->end travel (items x techs), computed once per distinct depot
+    start_sources, start_column = np.unique(start_loc, return_inverse=True)
+    end_sources, end_column = np.unique(end_loc, return_inverse=True)
+    from_starts = shortest_travel_from(matrix, start_sources)
+    to_ends = shortest_travel_from(matrix.T, end_sources)
+    to_item = from_starts[start_column][:, safe_loc].T
+    from_item = to_ends[end_column][:, safe_loc].T
+    reachable = (to_item < TRAVEL_TIME_SENTINEL) & (from_item < TRAVEL_TIME_SENTINEL)
+
+    earliest_start = win_start[None, :] + to_item
+    latest_start = win_end[None, :] - duration[:, None] - from_item
+    has_fixed = fixed >= 0
+    # A fixed-time item must be reachable by its fixed time; its start then is that time.
+    fixed_ok = ~has_fixed[:, None] | (earliest_start <= fixed[:, None])
+    start = np.where(has_fixed[:, None], fixed[:, None], earliest_start)
+    fits = (start <= latest_start) & fixed_ok
+
+    feasible = eligible & reachable & fits & valid_loc[:, None]
+
+    # Per-item service-start window: the union of the windows of the techs that can serve it
+    window_start = np.where(feasible, start, np.iinfo(np.int64).max).min(axis=1)
+    window_end = np.where(feasible, np.where(has_fixed[:, None], fixed[:, None], latest_start), -1).max(axis=1)
+
+    reasons: Dict[str, str] = {}
+    any_eligible = eligible.any(axis=1)
+    any_reachable = (eligible & reachable).any(axis=1)
+    any_fits_ignoring_fixed = (eligible & reachable & (earliest_start <= latest_start)).any(axis=1)
+    viable = feasible.any(axis=1)
+    for i in np.flatnonzero(~viable):
+        if not valid_loc[i]:
+            reason = REASON_INVALID_LOCATION
+        elif not any_eligible[i]:
+            reason = REASON_NO_ELIGIBLE_TECHNICIAN
+        elif not any_reachable[i]:
+            reason = REASON_UNREACHABLE
+        elif has_fixed[i] and any_fits_ignoring_fixed[i]:
+            reason = REASON_FIXED_TIME_UNREACHABLE
+        else:
+            reason = REASON_OUTSIDE_TIME_WINDOW
+        reasons[instance.item_ids[i]] = reason
+
+    vehicle_groups = equivalent_vehicle_groups(start_loc, end_loc, win_start, win_end, feasible)
+    return PresolveResult(
+        feasible=feasible,
+        allowed=break_symmetry(feasible, vehicle_groups) if symmetry_breaking else feasible,
+        earliest_start=earliest_start,
+        latest_start=latest_start,
+        window_start=window_start,
+        window_end=window_end,
+        viable_items=np.flatnonzero(viable).tolist(),
+        reasons=reasons,
+        vehicle_groups=vehicle_groups,
+    )
+
+
+def equivalent_vehicle_groups(
+    start_loc: np.ndarray,
+    end_loc: np.ndarray,
+    win_start: np.ndarray,
+    win_end: np.ndarray,
+    feasible: np.ndarray,
+) -> List[List[int]]:
+    """
+    Groups technicians that are interchangeable in the model: same start and end location,
+    same shift and the same set of servable items. Any route of one is a valid route of
+    the others at the same cost, so OR-Tools puts them in one vehicle class.
+    """
+    groups: Dict[tuple, List[int]] = {}
+    for v in range(len(start_loc)):
+        key = (int(start_loc[v]), int(end_loc[v]), int(win_start[v]), int(win_end[v]), feasible[:, v].tobytes())
+        groups.setdefault(key, []).append(v)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def break_symmetry(feasible: np.ndarray, vehicle_groups: List[List[int]]) -> np.ndarray:
+    """
+    Removes symmetric solutions among interchangeable technicians by shrinking allowed
+    vehicle sets: within a group, the r-th item (in payload order) the group can serve may
+    only go to the group's first r+1 technicians. Any solution can be relabelled to satisfy
+    this (number the group's routes by their first item), so nothing is lost.
+
+    This is a pure domain reduction rather than an ordering constraint between vehicles,
+    which the routing heuristics handle badly (PATH_CHEAPEST_ARC stalls on it). It does
+    split the group's shared vehicle class, which usually costs more than the pruned
+    permutations save under a short time limit, so it is opt-in.
+    """
+    allowed = feasible.copy()
+    for group in vehicle_groups:
+        group_items = np.flatnonzero(feasible[:, group[0]]) # Identical for every vehicle in the group
+        for rank, item_idx in enumerate(group_items[:len(group) - 1]):
+            allowed[item_idx, group[rank + 1:]] = False
+    return allowed
+
+
+def format_reason_counts(reasons: Dict[str, str]) -> Optional[str]:
+    if not reasons:
+        return None
+    counts: Dict[str, int] = {}
+    for code in reasons.values():
+        counts[code] = counts.get(code, 0) + 1
+    return ", ".join(f"{code}={n}" for code, n in sorted(counts.items()))
+
+
+def pin_fixed_items(instance, presolved: PresolveResult) -> Dict[int, int]:
+    """
+    Assigns fixed-time items to technicians up front, forming each technician's route
+    skeleton. Items are taken in fixed-time order; each goes to an allowed technician whose
+    previously pinned item (or shift start) still leaves time to travel there, preferring
+    the tightest fit so later appointments keep the most options. The order within a
+    skeleton follows from the fixed times.
+
+    Returns item index -> vehicle. Fixed items that fit no technician are left out and stay
+    ordinary (droppable) fixed-time items.
+    """
+    matrix = instance.travel_matrix
+    viable = set(presolved.viable_items)
+    fixed_items = sorted(
+        (int(instance.item_fixed_time[i]), i) for i in instance.fixed_items() if i in viable
+    )
+    last_end: Dict[int, tuple] = {} # vehicle -> (time the last pinned item ends, its location)
+    pinned: Dict[int, int] = {}
+    for fixed_time, i in fixed_items:
+        loc = int(instance.item_location[i])
+        best = None
+        for v in np.flatnonzero(presolved.allowed[i]).tolist():
+            if v in last_end:
+                end_time, end_loc = last_end[v]
+                ready = end_time + int(matrix[end_loc, loc])
+            else:
+                ready = int(presolved.earliest_start[i, v])
+            if ready <= fixed_time and (best is None or fixed_time - ready < best[0]):
+                best = (fixed_time - ready, v)
+        if best is None:
+            print(f"Info: Fixed item {instance.item_ids[i]} conflicts with other fixed items on every technician. Leaving it unpinned.")
+            continue
+        pinned[i] = best[1]
+        last_end[best[1]] = (fixed_time + int(instance.item_duration[i]), loc)
+    return pinned
+
+
+# Below this many candidates per item the k-nearest filter noticeably hurts solution quality
+MIN_CANDIDATE_SUCCESSORS = 10
+
+
+def successor_mask(
+    node_travel: np.ndarray,
+    node_service: np.ndarray,
+    window_start: np.ndarray,
+    window_end: np.ndarray,
+    is_item: np.ndarray,
+    k: Optional[int] = None,
+) -> np.ndarray:
+    """
+    (nodes x nodes) bool mask of arcs the routing model may use.
+
+    Sentinel legs are never allowed, and neither is i->j when even the earliest start at i
+    plus its service and the leg would miss j's window. With `k`, an arc between two item
+    nodes is also kept only if j is among i's k nearest item successors or i among j's k
+    nearest item predecessors, so every item keeps up to k ways in and out. Arcs from a
+    start and into an end are never thinned by `k`, and self-arcs are always kept (they
+    mark unperformed items).
+    """
+    allowed = node_travel < TRAVEL_TIME_SENTINEL
+    allowed &= window_start[:, None] + node_service[:, None] + node_travel <= window_end[None, :]
+    items = np.flatnonzero(is_item)
+    if k is not None and k < len(items) - 1:
+        among_items = np.ix_(items, items)
+        ranked = np.where(allowed[among_items], node_travel[among_items], np.iinfo(np.int64).max)
+        np.fill_diagonal(ranked, np.iinfo(np.int64).max)
+        rows = np.arange(len(items))[:, None]
+        nearest_out = np.zeros(ranked.shape, dtype=bool)
+        nearest_out[rows, np.argpartition(ranked, k, axis=1)[:, :k]] = True
+        nearest_in = np.zeros(ranked.shape, dtype=bool)
+        nearest_in[rows, np.argpartition(ranked.T, k, axis=1)[:, :k]] = True
+        allowed[among_items] &= nearest_out | nearest_in.T
+    np.fill_diagonal(allowed, True)
+    return allowed
@@ -0,0 +1,151 @@
+"""
+Deterministic replay of captured requests against the current code.
+
+Re-runs capture records written by capture.py (or plain payload files) one at a time in
+this process, with a fixed solver seed, and reports time and objective deltas against
+what the service recorded when the request was captured. Use `--solution-limit` to
+replace the wall-clock limit with a solution count, which makes the search itself
+repeatable run to run, and `--cprofile` to dump a cProfile per capture for offline
+analysis of slow cases.
+
+Examples:
+    python replay.py captures/
+    python replay.py captures/capture_20240415T101500123456Z_ab12cd34.json.gz --solution-limit 200 --cprofile prof/
+"""
+import argparse
+import contextlib
+import cProfile
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from payload_io import list_payload_files, load_json_file
+
+DETERMINISTIC_TIME_LIMIT_SECONDS = 600.0 # Safety net when replaying with a solution limit
+
+
+def replay_options(captured: Optional[Dict[str, Any]], seed: int, solution_limit: Optional[int],
+                   time_limit: Optional[float]) -> Dict[str, Any]:
+    """Captured solverOptions with the replay's seed and limits applied on top."""
+    options = dict(captured or {})
+    options["randomSeed"] = seed
+    if solution_limit is not None:
+        options["solutionLimit"] = solution_limit
+        options["timeLimitSeconds"] = time_limit or DETERMINISTIC_TIME_LIMIT_SECONDS
+    elif time_limit is not None:
+        options["timeLimitSeconds"] = time_limit
+    return options
+
+
+def replay_file(path: str, seed: int = 0, solution_limit: Optional[int] = None,
+                time_limit: Optional[float] = None, profile_dir: Optional[str] = None,
+                verbose: bool = False) -> Dict[str, Any]:
+    """Replays one capture (or plain payload) file and returns a comparison row."""
+    import main as service
+    from models import OptimizationRequestPayload
+
+    record = load_json_file(path)
+    is_capture = "payload" in record and "items" not in record
+    payload = record["payload"] if is_capture else record
+    captured = record.get("result", {}) if is_capture else {}
+
+    payload = {**payload, "solverOptions": replay_options(payload.get("solverOptions"), seed,
+                                                          solution_limit, time_limit)}
+    request = OptimizationRequestPayload(**payload)
+
+    profiler = cProfile.Profile() if profile_dir else None
+    started = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+        if profiler:
+            profiler.enable()
+        try:
+            response = service.solve_schedule(request)
+        finally:
+            if profiler:
+                profiler.disable()
+    elapsed = time.perf_counter() - started
+
+    if profiler:
+        os.makedirs(profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(profile_dir, os.path.basename(path).split(".")[0] + ".prof"))
+
+    objective = response.solverStats.objectiveValue if response.solverStats else None
+    row = {
+        "file": path,
+        "items": len(request.items),
+        "technicians": len(request.technicians),
+        "status": response.status,
+        "elapsedSeconds": elapsed,
+        "objectiveValue": objective,
+        "unassignedCount": len(response.unassignedItemIds or []),
+        "capturedStatus": captured.get("status"),
+        "capturedElapsedSeconds": record.get("elapsedSeconds") if is_capture else None,
+        "capturedObjectiveValue": captured.get("objectiveValue"),
+        "capturedUnassignedCount": captured.get("unassignedCount"),
+    }
+    row["elapsedDeltaSeconds"] = _delta(row["elapsedSeconds"], row["capturedElapsedSeconds"])
+    row["objectiveDelta"] = _delta(row["objectiveValue"], row["capturedObjectiveValue"])
+    row["unassignedDelta"] = _delta(row["unassignedCount"], row["capturedUnassignedCount"])
+    return row
+
+
+def _delta(current, baseline):
+    if current is None or baseline is None:
+        return None
+    return current - baseline
+
+
+def _fmt(value, spec: str = "") -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'file':<48} {'items':>5} {'time':>8} {'dtime':>8} {'objective':>12} {'dobj':>10} {'unasg':>5} {'dun':>4}"]
+    for r in rows:
+        lines.append(
+            f"{os.path.basename(r['file'])[:48]:<48} {r['items']:>5} {_fmt(r['elapsedSeconds'], '.3f'):>8} "
+            f"{_fmt(r['elapsedDeltaSeconds'], '+.3f'):>8} {_fmt(r['objectiveValue']):>12} "
+            f"{_fmt(r['objectiveDelta'], '+d'):>10} {r['unassignedCount']:>5} {_fmt(r['unassignedDelta'], '+d'):>4}"
+        )
+    worse = sum(1 for r in rows if (r["objectiveDelta"] or 0) > 0)
+    better = sum(1 for r in rows if (r["objectiveDelta"] or 0) < 0)
+    time_deltas = [r["elapsedDeltaSeconds"] for r in rows if r["elapsedDeltaSeconds"] is not None]
+    summary = f"Replayed {len(rows)} request(s): objective better={better} worse={worse}"
+    if time_deltas:
+        summary += f", mean time delta={sum(time_deltas) / len(time_deltas):+.3f}s"
+    lines.append(summary)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay captured optimization requests deterministically.")
+    parser.add_argument("paths", nargs="+", help="Capture files or directories")
+    parser.add_argument("--seed", type=int, default=0, help="Solver random seed")
+    parser.add_argument("--solution-limit", type=int, help="Stop after N solutions instead of the time limit")
+    parser.add_argument("--time-limit", type=float, help="Override the captured time limit (seconds)")
+    parser.add_argument("--cprofile", metavar="DIR", help="Write a cProfile .prof per replayed request")
+    parser.add_argument("--limit", type=int, help="Replay at most this many captures")
+    parser.add_argument("--json", dest="json_path", help="Also write the comparison rows as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show the service's own log output")
+    args = parser.parse_args(argv)
+
+    files = [f for p in args.paths for f in list_payload_files(p)][:args.limit]
+    if not files:
+        print("No capture files found.")
+        return 1
+
+    rows = [replay_file(f, args.seed, args.solution_limit, args.time_limit, args.cprofile, args.verbose)
+            for f in files]
+    print(format_rows(rows))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(rows, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+What-if scenarios: one base problem, solved under several small variations.
+
+The base request is compiled once (times, eligibility, dense travel matrix). Each scenario
+is a delta applied to that ProblemInstance: technicians removed, items added or removed,
+shifts changed. Unchanged arrays, including the travel matrix, are shared rather than copied.
+
+Scenarios are solved in parallel worker processes rather than threads: the routing
+callbacks run in Python and hold the GIL for most of a solve. The base matrix is published
+once in shared memory (shared_matrix.py), so each worker only receives the small per-item
+arrays and its delta.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+
+from core import InvalidProblemError, ProblemInstance, SolveResult, solve_instance, time_field_seconds
+from presolve import REASON_DROPPED_BY_SOLVER, REASON_INELIGIBLE_ASSIGNMENT, REASON_NO_SOLUTION
+from shared_matrix import MatrixHandle, call_with_matrix
+
+# Unassigned reasons of items that reached the search (their penalties are in the objective)
+_SEARCH_REASONS = {REASON_DROPPED_BY_SOLVER, REASON_INELIGIBLE_ASSIGNMENT, REASON_NO_SOLUTION}
+
+
+def apply_delta(base: ProblemInstance, delta) -> ProblemInstance:
+    """
+    The scenario `delta` (a ScenarioDelta, or anything with the same attributes) applied to
+    `base`. Raises InvalidProblemError for added items that clash with existing ids, or for
+    unparseable shift times. Unknown ids in removals are skipped with a warning, like unknown
+    items in fixed constraints are.
+    """
+    # --- Technicians ---
+    removed_techs = set(delta.removeTechnicianIds)
+    for tech_id in removed_techs - set(base.tech_ids):
+        print(f"Warning: Scenario removes unknown technician {tech_id}. Skipping.")
+    keep_techs = [v for v, tech_id in enumerate(base.tech_ids) if tech_id not in removed_techs]
+    tech_ids = [base.tech_ids[v] for v in keep_techs]
+    tech_column = {tech_id: v for v, tech_id in enumerate(tech_ids)}
+    window_start = base.tech_window_start[keep_techs]
+    window_end = base.tech_window_end[keep_techs]
+
+    # --- Shift changes (absolute times; the epoch moves back if a shift now starts earlier) ---
+    epoch = base.planning_epoch
+    shift_changes = []
+    for change in delta.technicianWindows:
+        if change.technicianId not in tech_column:
+            print(f"Warning: Scenario changes the shift of unknown or removed technician {change.technicianId}. Skipping.")
+            continue
+        try:
+            start = end = None
+            if change.earliestStartTimeUnix is not None or change.earliestStartTimeISO is not None:
+                start = time_field_seconds(change.earliestStartTimeUnix, change.earliestStartTimeISO)
+            if change.latestEndTimeUnix is not None or change.latestEndTimeISO is not None:
+                end = time_field_seconds(change.latestEndTimeUnix, change.latestEndTimeISO)
+        except (TypeError, ValueError) as e:
+            raise InvalidProblemError(f"Invalid shift change for technician {change.technicianId}: {e}") from e
+        shift_changes.append((tech_column[change.technicianId], start, end))
+    new_epoch = min([epoch] + [start for _, start, _ in shift_changes if start is not None])
+    shift = epoch - new_epoch # Added to every relative time when the epoch moves back
+    window_start = window_start + shift
+    window_end = window_end + shift
+    for v, start, end in shift_changes:
+        if start is not None:
+            window_start[v] = start - new_epoch
+        if end is not None:
+            window_end[v] = max(0, end - new_epoch)
+        if window_start[v] > window_end[v]:
+            print(f"Warning: Technician {tech_ids[v]} has relative start time after end time in a scenario. Setting range to [{window_start[v]}, {window_start[v]}].")
+            window_end[v] = window_start[v]
+
+    # --- Items ---
+    removed_items = set(delta.removeItemIds)
+    for item_id in removed_items - set(base.item_ids):
+        print(f"Warning: Scenario removes unknown item {item_id}. Skipping.")
+    keep_items = [i for i, item_id in enumerate(base.item_ids) if item_id not in removed_items]
+    item_ids = [base.item_ids[i] for i in keep_items]
+    fixed_time = base.item_fixed_time[keep_items]
+    fixed_time = np.where(fixed_time >= 0, fixed_time + shift, -1)
+    eligible = base.eligible[np.ix_(keep_items, keep_techs)]
+    added = delta.addItems
+    existing = set(item_ids)
+    for item in added:
+        if item.id in existing:
+            raise InvalidProblemError(f"Scenario adds item {item.id}, which already exists.")
+        existing.add(item.id)
+    added_eligible = np.zeros((len(added), len(tech_ids)), dtype=bool)
+    for i, item in enumerate(added):
+        added_eligible[i, [tech_column[t] for t in item.eligibleTechnicianIds if t in tech_column]] = True
+
+    return base.replace(
+        item_ids=item_ids + [item.id for item in added],
+        item_location=np.concatenate((base.item_location[keep_items], [item.locationIndex for item in added])).astype(np.int64),
+        item_duration=np.concatenate((base.item_duration[keep_items], [item.durationSeconds for item in added])).astype(np.int64),
+        item_priority=np.concatenate((base.item_priority[keep_items], [item.priority for item in added])).astype(np.int64),
+        item_fixed_time=np.concatenate((fixed_time, np.full(len(added), -1))).astype(np.int64),
+        eligible=np.vstack((eligible, added_eligible)),
+        tech_ids=tech_ids,
+        tech_start_location=base.tech_start_location[keep_techs],
+        tech_end_location=base.tech_end_location[keep_techs],
+        tech_window_start=window_start,
+        tech_window_end=window_end,
+        planning_epoch=new_epoch,
+        num_fixed_constraints=int((fixed_time >= 0).sum()),
+    )
+
+
+def solve_variant(base: ProblemInstance, matrix_handle: MatrixHandle, delta, options):
+    """
+    Solves one scenario; a None delta solves the base itself. Runs inside a worker process:
+    `base` arrives without its travel matrix, which is read from shared memory. Returns
+    (SolveResult, the scenario's instance without its matrix) for building the response.
+    """
+    return call_with_matrix(matrix_handle, _solve_variant, base, delta, options)
+
+
+def _solve_variant(matrix: np.ndarray, base: ProblemInstance, delta, options):
+    instance = base.replace(travel_matrix=matrix)
+    if delta is not None:
+        instance = apply_delta(instance, delta)
+    result = solve_instance(instance, options, max_priority=penalty_scale(base))
+    return result, instance.replace(travel_matrix=None)
+
+
+def penalty_scale(base: ProblemInstance) -> int:
+    """
+    The base's highest priority, which every scenario's drop penalties are computed from. A
+    scenario's own would change whenever a delta adds or removes its least important items,
+    and with it the price of every dropped item.
+    """
+    return int(base.item_priority.max()) if base.num_items else 1
+
+
+def scenario_objective(instance: ProblemInstance, result: SolveResult, base_penalty: int,
+                       max_priority: int) -> Optional[int]:
+    """
+    The solver's objective plus the drop penalty of every item pre-solve ruled out. Those items
+    never reach the search, so the solver's own objective leaves them out; with them added,
+    scenarios that make different items infeasible (a technician off sick) compare fairly.
+    `max_priority` is the base's (penalty_scale), as in the solve.
+    """
+    if result.objective_value is None:
+        return None
+    index = {item_id: i for i, item_id in enumerate(instance.item_ids)}
+    pruned = [index[item_id] for item_id in result.unassigned_item_ids
+              if (result.unassigned_reasons or {}).get(item_id) not in _SEARCH_REASONS]
+    if not pruned:
+        return result.objective_value
+    penalties = np.maximum(base_penalty * (max_priority - instance.item_priority[pruned] + 1), 0) # Clamped as in the solve
+    return result.objective_value + int(penalties.sum())
+
+
+# --- Worker Pool ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def scenario_pool(max_workers: int) -> ProcessPoolExecutor:
+    """
+    The process pool scenarios are solved in, created on first use. Workers come from a fork
+    server (a clean, single-threaded process) rather than being forked from the threaded web
+    server.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            context = multiprocessing.get_context(method)
+            if method == "forkserver":
+                context.set_forkserver_preload(["scenarios"])
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def default_workers(max_concurrent: int) -> int:
+    """SCENARIO_WORKERS, else one worker per admitted concurrent solve."""
+    return int(os.environ.get("SCENARIO_WORKERS") or max_concurrent)
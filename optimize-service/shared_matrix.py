@@ -0,0 +1,106 @@
+"""
+Zero-copy travel matrices for worker processes.
+
+Sending a payload to a process-pool worker pickles it, and for an N x N travel matrix that
+costs about as much as a short solve, once per task and per worker. Instead the parent
+decodes each matrix once into a `multiprocessing.shared_memory` segment and sends workers a
+`MatrixHandle` (segment name, shape, dtype: a few dozen bytes); workers map the segment and
+read the matrix in place.
+
+    with SharedMatrixStore() as store:
+        handle = store.publish(matrix, refs=len(tasks)) # one reference per task using it
+        ...                                             # worker: call_with_matrix(handle, fn, ...)
+        store.release(handle)                           # per finished task; the last one frees it
+
+Segments are reference-counted in the parent and unlinked when the last reference is
+released, or when the store is closed. Unlinking only frees the memory once no process maps
+the segment any more, so workers map it for the length of one task and unmap it right after.
+"""
+import threading
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, NamedTuple, Tuple
+
+import numpy as np
+
+
+class MatrixHandle(NamedTuple):
+    """What a worker needs to map a published matrix. Cheap to pickle."""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedMatrixStore:
+    """Owns the shared-memory segments published by this process. Thread-safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._segments: Dict[str, shared_memory.SharedMemory] = {}
+        self._refs: Dict[str, int] = {}
+
+    def publish(self, matrix: np.ndarray, refs: int = 1) -> MatrixHandle:
+        """Copies `matrix` into a new segment holding `refs` references and returns its handle."""
+        matrix = np.ascontiguousarray(matrix)
+        segment = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes))
+        np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=segment.buf)[...] = matrix
+        with self._lock:
+            self._segments[segment.name] = segment
+            self._refs[segment.name] = refs
+        return MatrixHandle(segment.name, matrix.shape, matrix.dtype.str)
+
+    def acquire(self, handle: MatrixHandle) -> None:
+        with self._lock:
+            self._refs[handle.name] += 1
+
+    def release(self, handle: MatrixHandle) -> None:
+        """Drops one reference; the segment is unlinked when none are left."""
+        with self._lock:
+            self._refs[handle.name] -= 1
+            if self._refs[handle.name] > 0:
+                return
+            del self._refs[handle.name]
+            segment = self._segments.pop(handle.name)
+        segment.close()
+        segment.unlink()
+
+    def live_segments(self) -> int:
+        with self._lock:
+            return len(self._segments)
+
+    def close(self) -> None:
+        """Unlinks every segment still published, whatever its reference count."""
+        with self._lock:
+            segments = list(self._segments.values())
+            self._segments.clear()
+            self._refs.clear()
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+    def __enter__(self) -> "SharedMatrixStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+# --- Worker Side ---
+
+def call_with_matrix(handle: MatrixHandle, fn: Callable[..., Any], *args) -> Any:
+    """
+    Calls `fn(matrix, *args)` with the published matrix mapped into this process as a
+    read-only array (no copy), and unmaps it again once `fn` returns, so a segment its
+    publisher has released is freed when the task ends. `fn`'s result must not keep views
+    of the matrix.
+    """
+    segment = shared_memory.SharedMemory(name=handle.name)
+    try:
+        matrix = np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=segment.buf)
+        matrix.flags.writeable = False
+        return fn(matrix, *args)
+    finally:
+        matrix = None
+        try:
+            segment.close()
+        except BufferError: # Still viewed (e.g. from a traceback); unmapped when those views go
+            print(f"Warning: Shared matrix {handle.name} is still in use after its task; it stays mapped until released.")
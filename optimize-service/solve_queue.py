@@ -0,0 +1,285 @@
+"""
+Solve queue: accepting a solve apart from running it.
+
+With the queue, `POST /jobs` stores the request body in a broker and answers right away.
+Solver workers (solve_worker.py) on any node each claim one job at a time, solve it with the
+same code as /optimize-schedule and post the response back, where `GET /jobs/{id}` picks it up.
+A worker only takes the next job once it is free, so long and short solves spread over the
+workers by their actual cost, and adding workers adds capacity without touching the API.
+
+A claimed job is leased to its worker for `lease_seconds`, and the worker renews the lease with
+a heartbeat while it solves. A worker that dies stops heartbeating, and once its lease has run
+out the job goes back to the queue for another worker (every claim checks for expired leases
+first). A job abandoned `max_attempts` times, typically one that crashes every worker that takes
+it, fails instead of being retried forever. A worker that lost its lease can no longer post a
+result for the job.
+
+SQLiteBroker keeps the queue in one SQLite file, which is enough for workers on one host, local
+development and tests. Other backends implement Broker and register a URL scheme with
+`register_broker`; `SOLVE_QUEUE_URL` picks one (e.g. `sqlite:///var/lib/solver/queue.db`).
+"""
+import abc
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+DEFAULT_LEASE_SECONDS = 30.0
+DEFAULT_MAX_ATTEMPTS = 3
+# Finished jobs are deleted this long after finishing; clients are expected to have fetched them by then
+DEFAULT_RETENTION_SECONDS = 24 * 3600.0
+
+
+class Job:
+    __slots__ = (
+        "id",
+        "status",        # JOB_QUEUED / JOB_RUNNING / JOB_DONE / JOB_FAILED
+        "payload",       # Request body (JSON bytes); only set on claimed jobs
+        "result",        # Response body (JSON bytes) of a done job
+        "error",         # Error detail of a failed job
+        "status_code",   # HTTP status the error corresponds to (400, 413, 422, 500)
+        "attempts",      # Times the job has been claimed
+        "worker_id",     # Worker holding (or last holding) the job
+        "enqueued_at",   # Unix seconds
+        "started_at",
+        "finished_at",
+    )
+
+    def __init__(self, id: str, status: str, payload: Optional[bytes] = None, result: Optional[bytes] = None,
+                 error: Optional[str] = None, status_code: Optional[int] = None, attempts: int = 0,
+                 worker_id: Optional[str] = None, enqueued_at: Optional[float] = None,
+                 started_at: Optional[float] = None, finished_at: Optional[float] = None):
+        self.id = id
+        self.status = status
+        self.payload = payload
+        self.result = result
+        self.error = error
+        self.status_code = status_code
+        self.attempts = attempts
+        self.worker_id = worker_id
+        self.enqueued_at = enqueued_at
+        self.started_at = started_at
+        self.finished_at = finished_at
+
+
+class Broker(abc.ABC):
+    """
+    A solve queue backend. Implementations must be safe to use from several threads, and
+    from several processes on every node that runs API processes or workers.
+    """
+
+    lease_seconds = DEFAULT_LEASE_SECONDS
+
+    @abc.abstractmethod
+    def enqueue(self, payload: bytes) -> str:
+        """Queues a request body; returns the new job's id."""
+
+    @abc.abstractmethod
+    def claim(self, worker_id: str) -> Optional[Job]:
+        """Leases the oldest queued job (with its payload) to `worker_id`, or returns None if there is none."""
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Renews the worker's lease on a job; False if the worker no longer holds it."""
+
+    @abc.abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: bytes) -> bool:
+        """Stores a job's response; False (and nothing stored) if the worker no longer holds it."""
+
+    @abc.abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str, status_code: int) -> bool:
+        """Marks a job failed; False (and nothing stored) if the worker no longer holds it."""
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job's state and result, without its payload; None if unknown (or already deleted)."""
+
+    @abc.abstractmethod
+    def requeue_expired(self) -> int:
+        """Requeues (or, after max_attempts, fails) running jobs whose lease has run out; returns how many."""
+
+    @abc.abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Jobs per state, for /load."""
+
+
+class SQLiteBroker(Broker):
+    """Broker in a SQLite file (WAL mode), shared by every process on the host that opens the same path."""
+
+    _COLUMNS = "id, status, result, error, status_code, attempts, worker_id, enqueued_at, started_at, finished_at"
+
+    def __init__(self, path: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        if lease_seconds <= 0 or max_attempts < 1:
+            raise ValueError("lease_seconds must be positive and max_attempts at least 1")
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self._local = threading.local() # One connection per thread; sqlite3 connections can't be shared
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._transaction() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload BLOB,
+                    result BLOB,
+                    error TEXT,
+                    status_code INTEGER,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    enqueued_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )""")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, enqueued_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit mode: transactions are opened explicitly with BEGIN IMMEDIATE
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer, nor the writer them
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def enqueue(self, payload: bytes) -> str:
+        job_id = uuid.uuid4().hex
+        with self._transaction() as db:
+            db.execute("INSERT INTO jobs (id, status, payload, enqueued_at) VALUES (?, ?, ?, ?)",
+                       (job_id, JOB_QUEUED, payload, time.time()))
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Job]:
+        with self._transaction() as db:
+            now = time.time()
+            self._requeue_expired(db, now)
+            db.execute("DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                       (JOB_DONE, JOB_FAILED, now - self.retention_seconds))
+            row = db.execute("SELECT id, payload, attempts, enqueued_at FROM jobs WHERE status = ? "
+                             "ORDER BY enqueued_at, rowid LIMIT 1", (JOB_QUEUED,)).fetchone()
+            if row is None:
+                return None
+            job_id, payload, attempts, enqueued_at = row
+            db.execute("UPDATE jobs SET status = ?, worker_id = ?, attempts = ?, lease_expires = ?, started_at = ? "
+                       "WHERE id = ?", (JOB_RUNNING, worker_id, attempts + 1, now + self.lease_seconds, now, job_id))
+        return Job(job_id, JOB_RUNNING, payload=payload, attempts=attempts + 1, worker_id=worker_id,
+                   enqueued_at=enqueued_at, started_at=now)
+
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                                (time.time() + self.lease_seconds, job_id, worker_id, JOB_RUNNING))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: bytes) -> bool:
+        return self._finish(job_id, worker_id, JOB_DONE, result=result)
+
+    def fail(self, job_id: str, worker_id: str, error: str, status_code: int) -> bool:
+        return self._finish(job_id, worker_id, JOB_FAILED, error=error, status_code=status_code)
+
+    def _finish(self, job_id: str, worker_id: str, status: str, result: Optional[bytes] = None,
+                error: Optional[str] = None, status_code: Optional[int] = None) -> bool:
+        with self._transaction() as db:
+            # The payload isn't needed any more; only the result is kept until retention runs out
+            cursor = db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, status_code = ?, payload = NULL, "
+                "lease_expires = NULL, finished_at = ? WHERE id = ? AND worker_id = ? AND status = ?",
+                (status, result, error, status_code, time.time(), job_id, worker_id, JOB_RUNNING))
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connection().execute(f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job_id, status, result, error, status_code, attempts, worker_id, enqueued_at, started_at, finished_at = row
+        return Job(job_id, status, result=result, error=error, status_code=status_code, attempts=attempts,
+                   worker_id=worker_id, enqueued_at=enqueued_at, started_at=started_at, finished_at=finished_at)
+
+    def requeue_expired(self) -> int:
+        with self._transaction() as db:
+            return self._requeue_expired(db, time.time())
+
+    def _requeue_expired(self, db: sqlite3.Connection, now: float) -> int:
+        failed = db.execute(
+            "UPDATE jobs SET status = ?, error = ?, status_code = 500, payload = NULL, lease_expires = NULL, "
+            "finished_at = ? WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (JOB_FAILED, f"Job was abandoned by {self.max_attempts} workers (no heartbeat within the lease).",
+             now, JOB_RUNNING, now, self.max_attempts)).rowcount
+        requeued = db.execute(
+            "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires = NULL WHERE status = ? AND lease_expires < ?",
+            (JOB_QUEUED, JOB_RUNNING, now)).rowcount
+        if failed or requeued:
+            print(f"Solve queue: requeued {requeued} and failed {failed} job(s) whose worker stopped heartbeating.")
+        return failed + requeued
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0, **dict(rows)}
+
+    @classmethod
+    def from_url(cls, url: str, **options) -> "SQLiteBroker":
+        """sqlite:///relative/path.db or sqlite:////absolute/path.db, as in SQLAlchemy URLs."""
+        return cls(url[len("sqlite:///"):], **options)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, rolled back on error. IMMEDIATE takes the write lock up front,
+    so two workers can't both read the same queued job before either has claimed it."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.db.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+
+
+# --- Broker Registry ---
+
+# URL scheme -> factory(url, lease_seconds=..., max_attempts=...)
+BROKERS: Dict[str, Callable[..., Broker]] = {"sqlite": SQLiteBroker.from_url}
+
+
+def register_broker(scheme: str, factory: Callable[..., Broker]) -> None:
+    """Makes `scheme://...` URLs in SOLVE_QUEUE_URL open brokers built by `factory`."""
+    BROKERS[scheme] = factory
+
+
+def open_broker(url: str, **options) -> Broker:
+    scheme = url.split("://", 1)[0] if "://" in url else ""
+    if scheme not in BROKERS:
+        raise ValueError(f"Unknown solve queue URL '{url}'. Supported schemes: {', '.join(sorted(BROKERS))}.")
+    return BROKERS[scheme](url, **options)
+
+
+def broker_from_env(environ: Optional[Dict[str, str]] = None) -> Optional[Broker]:
+    """The broker named by SOLVE_QUEUE_URL (with SOLVE_QUEUE_LEASE_SECONDS / SOLVE_QUEUE_MAX_ATTEMPTS), or None."""
+    env = os.environ if environ is None else environ
+    url = env.get("SOLVE_QUEUE_URL")
+    if not url:
+        return None
+    options = {
+        "lease_seconds": float(env.get("SOLVE_QUEUE_LEASE_SECONDS") or DEFAULT_LEASE_SECONDS),
+        "max_attempts": int(env.get("SOLVE_QUEUE_MAX_ATTEMPTS") or DEFAULT_MAX_ATTEMPTS),
+    }
+    print(f"Solve queue: {url} (lease {options['lease_seconds']:g}s, {options['max_attempts']} attempts).")
+    return open_broker(url, **options)
@@ -0,0 +1,147 @@
+"""
+Solver worker for the solve queue (solve_queue.py).
+
+Claims jobs from the broker one at a time, solves each with the same code as
+/optimize-schedule (`main.solve_and_record`) and posts the response, or the error, back.
+While a job is solving, a background thread renews its lease every `heartbeat_seconds`; if
+the worker dies, the lease runs out and the job is requeued for another worker. Run as many
+workers, on as many nodes, as the queue needs: each one takes the next job only when it is free.
+
+SIGTERM/SIGINT stop a worker after its current job.
+
+Examples:
+    SOLVE_QUEUE_URL=sqlite:///queue.db python solve_worker.py
+    python solve_worker.py --queue sqlite:////var/lib/solver/queue.db --processes 4
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+from typing import Optional
+
+from solve_queue import Broker, Job, broker_from_env
+
+DEFAULT_POLL_SECONDS = 1.0
+
+
+@contextlib.contextmanager
+def heartbeating(broker: Broker, job: Job, worker_id: str, interval_seconds: float):
+    """Renews the job's lease every `interval_seconds` while the block runs. Yields an Event set once the lease is lost."""
+    done, lost = threading.Event(), threading.Event()
+
+    def beat():
+        while not done.wait(interval_seconds):
+            try:
+                if not broker.heartbeat(job.id, worker_id):
+                    print(f"Worker {worker_id} lost its lease on job {job.id}; its result will be discarded.")
+                    lost.set()
+                    return
+            except Exception as e: # A broker hiccup: keep trying until the lease runs out
+                print(f"Warning: Heartbeat for job {job.id} failed: {e!r}")
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield lost
+    finally:
+        done.set()
+        thread.join()
+
+
+def solve_job(job: Job):
+    """Solves one job's payload. Returns (response bytes, None) or (None, (error detail, HTTP status))."""
+    import main as service # Imported lazily, as in batch.py, so the CLI starts without OR-Tools loaded
+    from fastapi import HTTPException
+    from fast_json import encode_response, parse_request
+    from pydantic import ValidationError
+
+    try:
+        payload = parse_request(job.payload)
+        return encode_response(service.solve_and_record(payload)), None
+    except ValidationError as e: # Only for jobs enqueued without going through POST /jobs
+        return None, (str(e), 422)
+    except HTTPException as e:
+        return None, (str(e.detail), e.status_code)
+    except Exception as e:
+        return None, (repr(e), 500)
+
+
+def run_worker(
+    broker: Broker,
+    worker_id: Optional[str] = None,
+    poll_seconds: float = DEFAULT_POLL_SECONDS,
+    heartbeat_seconds: Optional[float] = None,
+    max_jobs: Optional[int] = None,
+    stop: Optional[threading.Event] = None,
+) -> int:
+    """Claims and solves jobs until `stop` is set (or `max_jobs` are done); returns the number of jobs processed."""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    heartbeat_seconds = heartbeat_seconds or broker.lease_seconds / 3 # Two beats can be missed before the lease runs out
+    stop = stop or threading.Event()
+    processed = 0
+    print(f"Worker {worker_id} started.")
+    while not stop.is_set() and (max_jobs is None or processed < max_jobs):
+        job = broker.claim(worker_id)
+        if job is None:
+            stop.wait(poll_seconds)
+            continue
+        print(f"Worker {worker_id} solving job {job.id} (attempt {job.attempts}).")
+        with heartbeating(broker, job, worker_id, heartbeat_seconds) as lost:
+            result, error = solve_job(job)
+        if not lost.is_set():
+            posted = broker.complete(job.id, worker_id, result) if error is None else broker.fail(job.id, worker_id, *error)
+            if not posted:
+                print(f"Worker {worker_id} no longer holds job {job.id}; its result was discarded.")
+        processed += 1
+    print(f"Worker {worker_id} stopped after {processed} job(s).")
+    return processed
+
+
+def _stop_on_signals(stop: threading.Event) -> None:
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+
+
+def _worker_process(poll_seconds: float) -> None:
+    stop = threading.Event()
+    _stop_on_signals(stop)
+    run_worker(broker_from_env(), poll_seconds=poll_seconds, stop=stop)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Solve jobs from the solve queue.")
+    parser.add_argument("--queue", default=os.environ.get("SOLVE_QUEUE_URL"),
+                        help="Broker URL, e.g. sqlite:///queue.db (default: SOLVE_QUEUE_URL)")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to run on this node")
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS, help="Wait between claims when the queue is empty")
+    args = parser.parse_args(argv)
+    if not args.queue:
+        parser.error("no broker URL: pass --queue or set SOLVE_QUEUE_URL")
+
+    os.environ["SOLVE_QUEUE_URL"] = args.queue # Worker processes open the broker from the environment
+    broker_from_env() # Fails early on a bad URL, and creates the queue before the workers start
+    if args.processes <= 1:
+        _worker_process(args.poll_seconds)
+        return 0
+
+    processes = [multiprocessing.Process(target=_worker_process, args=(args.poll_seconds,))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    stop = threading.Event()
+    _stop_on_signals(stop)
+    while not stop.is_set() and any(process.is_alive() for process in processes):
+        stop.wait(1.0)
+    for process in processes:
+        process.terminate() # SIGTERM: each finishes its current job first
+    for process in processes:
+        process.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Solver profiles: tuned default `OptimizationSolverOptions` per problem-size bucket.
+
+A profile is a JSON file written by `tuner.py`:
+
+    {
+      "buckets": [
+        {"maxItems": 10, "options": {"firstSolutionStrategy": "PATH_CHEAPEST_ARC", ...}},
+        {"maxItems": 40, "options": {...}},
+        {"maxItems": null, "options": {...}}   # everything larger
+      ],
+      "generatedAt": "...", "corpus": {...}     # informational only
+    }
+
+The service loads the file named by `SOLVER_PROFILE_PATH` at startup and uses the
+matching bucket's options for any field a request leaves unset.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from models import OptimizationSolverOptions
+
+# Built-in defaults, used when neither the request nor a profile sets a field.
+DEFAULT_SOLVER_OPTIONS = OptimizationSolverOptions(
+    firstSolutionStrategy="PATH_CHEAPEST_ARC",
+    localSearchMetaheuristic="GUIDED_LOCAL_SEARCH",
+    timeLimitSeconds=1.0,
+    basePenalty=100000,
+    symmetryBreaking=False,
+)
+
+
+class SolverProfile:
+    """Ordered list of (max_items, options) buckets; the first bucket that fits wins."""
+
+    def __init__(self, buckets: List[Dict[str, Any]], metadata: Optional[Dict[str, Any]] = None):
+        self.buckets = sorted(
+            ((b.get("maxItems"), OptimizationSolverOptions(**b.get("options", {}))) for b in buckets),
+            key=lambda b: float("inf") if b[0] is None else b[0],
+        )
+        self.metadata = metadata or {}
+
+    def options_for(self, num_items: int) -> Optional[OptimizationSolverOptions]:
+        for max_items, options in self.buckets:
+            if max_items is None or num_items <= max_items:
+                return options
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(self.metadata)
+        data["buckets"] = [
+            {"maxItems": max_items, "options": options.model_dump(exclude_none=True)}
+            for max_items, options in self.buckets
+        ]
+        return data
+
+
+def load_solver_profile(path: Optional[str]) -> Optional[SolverProfile]:
+    """Reads a profile file; returns None when no path is configured."""
+    if not path:
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    metadata = {k: v for k, v in data.items() if k != "buckets"}
+    profile = SolverProfile(data.get("buckets", []), metadata)
+    print(f"Loaded solver profile from {path} with {len(profile.buckets)} bucket(s).")
+    return profile
+
+
+def save_solver_profile(profile: SolverProfile, path: str) -> None:
+    with open(path, "w") as f:
+        json.dump(profile.to_dict(), f, indent=2)
+
+
+def resolve_solver_options(
+    requested: Optional[OptimizationSolverOptions],
+    num_items: int,
+    profile: Optional[SolverProfile] = None,
+) -> OptimizationSolverOptions:
+    """
+    Merges solver options field by field: explicit request values, then the profile
+    bucket for this problem size, then `DEFAULT_SOLVER_OPTIONS`.
+    """
+    merged = DEFAULT_SOLVER_OPTIONS.model_dump()
+    profile_options = profile.options_for(num_items) if profile else None
+    for layer in (profile_options, requested):
+        if layer is not None:
+            merged.update(layer.model_dump(exclude_none=True))
+    return OptimizationSolverOptions(**merged)
@@ -0,0 +1,134 @@
+"""
+Cold-start benchmark for scale-to-zero deployments.
+
+Every measurement runs in a fresh interpreter, like a new container instance:
+
+- the import profile of `import main` (`python -X importtime`), as the modules main imports
+  directly, with their cumulative import time,
+- time-to-first-solve: interpreter start, `import main`, then the first (warm-up) solve.
+
+Usage:
+    python startup_benchmark.py                      # profile + 5 runs, checked against the budget
+    python startup_benchmark.py --runs 10 --json startup.json
+    python startup_benchmark.py --budget-seconds 1.5 # exit code 1 if the median run is over budget
+
+tests/test_startup.py runs the same checks with a single run.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Median time-to-first-solve allowed, in seconds (about 0.8s measured on one core)
+DEFAULT_BUDGET_SECONDS = 2.0
+# Modules only the solve itself needs; `import main` must not load them
+LAZY_MODULES = ("ortools.constraint_solver.pywrapcp", "ortools.constraint_solver.routing_enums_pb2")
+# Opt-in features and their heavier stdlib dependencies; loaded when first used, never by `import main`
+FEATURE_MODULES = ("capture", "decomposition", "local_rpc", "scenarios", "shared_matrix", "solve_queue",
+                   "multiprocessing", "socketserver", "sqlite3")
+# Must never be loaded at all
+UNUSED_MODULES = ("pytz",)
+
+_FIRST_SOLVE_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+loaded = {name: name in sys.modules for name in %r}
+main.warm_up_solver()
+solved = time.perf_counter()
+print(json.dumps({"importSeconds": imported - started, "firstSolveSeconds": solved - imported,
+                  "loadedAtImport": loaded}))
+"""
+
+
+def _run_python(args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+    full_env = dict(os.environ, SOLVER_WARMUP="0", **(env or {}))
+    return subprocess.run([sys.executable] + args, cwd=SERVICE_DIR, env=full_env,
+                          capture_output=True, text=True, check=True)
+
+
+def import_profile(top: int = 15) -> List[Dict[str, Any]]:
+    """The modules `main` imports directly, slowest first, with cumulative import times in seconds."""
+    result = _run_python(["-X", "importtime", "-c", "import main"])
+    # -X importtime lists a module's imports (one level deeper) right before the module itself
+    rows, children = [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, self_us, cumulative_us, name = line.replace("import time:", "|", 1).split("|")
+        if not self_us.strip().isdigit():
+            continue # Header line
+        name = name[1:] # Drop the separator's space; the rest is two spaces per nesting level
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        if depth == 1:
+            children.append({"module": name.strip(), "cumulativeSeconds": int(cumulative_us) / 1e6})
+        elif depth == 0:
+            if name.strip() == "main":
+                rows = children + [{"module": "main (total)", "cumulativeSeconds": int(cumulative_us) / 1e6}]
+            children = [] # Imports of interpreter startup (site etc.), not of main
+    rows.sort(key=lambda row: -row["cumulativeSeconds"])
+    return rows[:top]
+
+
+def time_to_first_solve() -> Dict[str, Any]:
+    """One cold start: process wall time until the first solve has returned, plus its parts."""
+    started = time.perf_counter()
+    result = _run_python(["-c", _FIRST_SOLVE_SCRIPT % ((LAZY_MODULES + FEATURE_MODULES + UNUSED_MODULES),)])
+    wall = time.perf_counter() - started
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement["timeToFirstSolveSeconds"] = wall
+    return measurement
+
+
+def run_benchmark(runs: int = 5, budget_seconds: float = DEFAULT_BUDGET_SECONDS, top: int = 15) -> Dict[str, Any]:
+    measurements = [time_to_first_solve() for _ in range(runs)]
+    median = statistics.median(m["timeToFirstSolveSeconds"] for m in measurements)
+    eagerly_loaded = sorted({name for m in measurements for name, loaded in m["loadedAtImport"].items() if loaded})
+    return {
+        "importProfile": import_profile(top),
+        "runs": measurements,
+        "medianTimeToFirstSolveSeconds": median,
+        "medianImportSeconds": statistics.median(m["importSeconds"] for m in measurements),
+        "budgetSeconds": budget_seconds,
+        "eagerlyLoaded": eagerly_loaded,
+        "withinBudget": median <= budget_seconds and not eagerly_loaded,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = ["Import profile (cumulative):"]
+    for row in report["importProfile"]:
+        lines.append(f"  {row['cumulativeSeconds'] * 1000:8.1f} ms  {row['module']}")
+    lines.append(f"Median import:              {report['medianImportSeconds']:.3f}s")
+    lines.append(f"Median time-to-first-solve: {report['medianTimeToFirstSolveSeconds']:.3f}s "
+                 f"(budget {report['budgetSeconds']:.3f}s, {len(report['runs'])} runs)")
+    if report["eagerlyLoaded"]:
+        lines.append(f"Loaded by `import main` but should not be: {', '.join(report['eagerlyLoaded'])}")
+    lines.append("OK" if report["withinBudget"] else "OVER BUDGET")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the service's cold start in fresh interpreters.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-seconds", type=float, default=DEFAULT_BUDGET_SECONDS)
+    parser.add_argument("--top", type=int, default=15, help="Modules to show in the import profile")
+    parser.add_argument("--json", help="Also write the full report to this file")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.runs, args.budget_seconds, args.top)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report["withinBudget"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from admission import AdmissionController, QueueFullError, QueueTimeoutError, controller_from_env
+from main import app
+from tests.test_main import MINIMAL_VALID_PAYLOAD
+
+
+def _hold_slot(controller):
+    """Occupies one slot from a background thread until the returned event is set."""
+    release, started = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    controller.reserve()
+    thread = threading.Thread(target=controller.run, args=(hold,))
+    thread.start()
+    started.wait(5)
+    return release, thread
+
+
+def test_controller_runs_queues_and_rejects():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout_seconds=0.05)
+    controller.reserve()
+    assert controller.run(lambda x: x * 2, 21) == 42
+
+    release, thread = _hold_slot(controller)
+    assert controller.load()["running"] == 1
+    controller.reserve() # Takes the single queue place
+    with pytest.raises(QueueFullError) as full:
+        controller.reserve()
+    assert full.value.retry_after_seconds >= 1
+    with pytest.raises(QueueTimeoutError):
+        controller.run(lambda: None) # The held slot never frees up in time
+    release.set()
+    thread.join()
+
+    load = controller.load()
+    assert (load["running"], load["queued"]) == (0, 0)
+    assert (load["completed"], load["rejected"], load["timedOut"]) == (2, 1, 1)
+
+
+def test_controller_from_env():
+    controller = controller_from_env({"SOLVER_MAX_CONCURRENT": "3", "SOLVER_QUEUE_TIMEOUT_SECONDS": "2.5"})
+    assert controller.max_concurrent == 3
+    assert controller.max_queue == 6 # Defaults to twice the concurrency
+    assert controller.queue_timeout_seconds == 2.5
+    assert controller_from_env({}).max_concurrent >= 1
+
+
+def test_endpoint_returns_429_with_retry_after_when_saturated(monkeypatch):
+    controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout_seconds=0.05)
+    monkeypatch.setattr(main, "SOLVE_ADMISSION", controller)
+    client = TestClient(app)
+    release, thread = _hold_slot(controller)
+    try:
+        response = client.post("/optimize-schedule", json=MINIMAL_VALID_PAYLOAD)
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        load = client.get("/load").json()
+        assert load["running"] == 1 and load["rejected"] == 1
+    finally:
+        release.set()
+        thread.join()
+    assert client.post("/optimize-schedule", json=MINIMAL_VALID_PAYLOAD).status_code == 200
+
+
+def test_endpoint_returns_503_when_queue_times_out(monkeypatch):
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout_seconds=0.05)
+    monkeypatch.setattr(main, "SOLVE_ADMISSION", controller)
+    client = TestClient(app)
+    release, thread = _hold_slot(controller)
+    try:
+        response = client.post("/optimize-schedule", json=MINIMAL_VALID_PAYLOAD)
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+    finally:
+        release.set()
+        thread.join()
@@ -0,0 +1,73 @@
+import gzip
+import json
+import os
+
+import main
+from batch import main as batch_main, response_path, run_batch
+from models import OptimizationRequestPayload
+from payload_generator import generate_profile_payload
+from payload_io import BATCH_SUMMARY_NAME, list_payload_files, load_payload_and_matrix, save_npz_payload
+
+SOLVER_OPTIONS = {"solutionLimit": 1, "timeLimitSeconds": 5}
+
+
+def _payload(seed):
+    return {**generate_profile_payload("tiny", seed=seed), "solverOptions": SOLVER_OPTIONS}
+
+
+def test_npz_payload_solves_like_json(tmp_path):
+    """A binary payload file carries the same problem as its JSON form."""
+    payload = _payload(3)
+    path = str(tmp_path / "p.npz")
+    save_npz_payload(path, payload)
+    loaded, matrix = load_payload_and_matrix(path)
+    assert loaded["travelTimeMatrix"] == {}
+    assert matrix.shape == (len(payload["locations"]),) * 2
+
+    from_json = main.solve_schedule(OptimizationRequestPayload(**payload))
+    from_npz = main.solve_schedule(OptimizationRequestPayload(**loaded), matrix)
+    assert from_npz.routes == from_json.routes
+    assert from_npz.unassignedItemIds == from_json.unassignedItemIds
+
+
+def test_response_path_and_listing(tmp_path):
+    """Responses sit next to the payload (or mirrored under --output-dir) and are never listed as payloads."""
+    (tmp_path / "day").mkdir()
+    payload_path = str(tmp_path / "day" / "a.json.gz")
+    assert response_path(payload_path, str(tmp_path)) == str(tmp_path / "day" / "a.response.json")
+    assert response_path(payload_path, str(tmp_path), str(tmp_path / "out")) == str(tmp_path / "out" / "day" / "a.response.json")
+
+    for name in ["a.json", "a.response.json", BATCH_SUMMARY_NAME, "b.npz", "notes.txt"]:
+        (tmp_path / name).write_text("{}")
+    assert [os.path.basename(p) for p in list_payload_files(str(tmp_path))] == ["a.json", "b.npz"]
+
+
+def test_batch_solves_and_resumes(tmp_path):
+    """Every format is solved once; a second run skips them and --force re-solves."""
+    (tmp_path / "a.json").write_text(json.dumps(_payload(0)))
+    with gzip.open(tmp_path / "b.json.gz", "wt") as f:
+        json.dump({"payload": _payload(1), "result": {"status": "success"}}, f) # Capture record
+    save_npz_payload(str(tmp_path / "c.npz"), _payload(2))
+    (tmp_path / "broken.json").write_text(json.dumps({"items": []}))
+
+    summary = run_batch(str(tmp_path), jobs=2)
+    assert (summary["solved"], summary["failed"], summary["skipped"]) == (3, 1, 0)
+    for name in "abc":
+        response = json.loads((tmp_path / f"{name}.response.json").read_text())
+        assert response["status"] in ("success", "partial")
+    assert json.loads((tmp_path / BATCH_SUMMARY_NAME).read_text())["solved"] == 3
+
+    resumed = run_batch(str(tmp_path), jobs=2)
+    assert (resumed["solved"], resumed["failed"], resumed["skipped"]) == (0, 1, 3)
+    assert batch_main([str(tmp_path / "a.json"), "--force", "--jobs", "1", "--time-limit", "2"]) == 0
+
+
+def test_batch_output_dir(tmp_path):
+    """With --output-dir the input tree is left untouched."""
+    source = tmp_path / "in"
+    source.mkdir()
+    (source / "a.json").write_text(json.dumps(_payload(0)))
+    summary = run_batch(str(source), output_dir=str(tmp_path / "out"), jobs=1)
+    assert summary["solved"] == 1
+    assert sorted(os.listdir(source)) == ["a.json"]
+    assert sorted(os.listdir(tmp_path / "out")) == ["a.response.json", BATCH_SUMMARY_NAME]
@@ -0,0 +1,88 @@
+import gzip
+import json
+import os
+
+import main
+from capture import RequestRecorder, anonymize_payload
+from models import OptimizationRequestPayload
+from payload_generator import generate_profile_payload
+from payload_io import load_payload_file
+from replay import replay_file, replay_options
+
+
+def _read_capture(path):
+    with gzip.open(path, "rt") as f:
+        return json.load(f)
+
+
+def test_anonymize_payload_keeps_structure():
+    """Ids and coordinates are replaced consistently; solver-relevant fields are untouched."""
+    payload = generate_profile_payload("small", seed=2)
+    payload["fixedConstraints"] = [{"itemId": payload["items"][0]["id"], "fixedTimeISO": "2024-04-15T10:00:00Z"}]
+    anonymized = anonymize_payload(payload, salt=b"s")
+
+    assert all(loc["coords"] == {"lat": 0.0, "lng": 0.0} for loc in anonymized["locations"])
+    assert all(a["id"] != o["id"] for a, o in zip(anonymized["items"], payload["items"]))
+    assert anonymized["fixedConstraints"][0]["itemId"] == anonymized["items"][0]["id"]
+    tech_ids = {t["id"] for t in anonymized["technicians"]}
+    assert all(set(i["eligibleTechnicianIds"]) <= tech_ids for i in anonymized["items"])
+    for a, o in zip(anonymized["items"], payload["items"]):
+        assert (a["locationIndex"], a["durationSeconds"], a["priority"]) == (o["locationIndex"], o["durationSeconds"], o["priority"])
+    assert anonymized["travelTimeMatrix"] == payload["travelTimeMatrix"]
+    OptimizationRequestPayload(**anonymized)
+
+
+def test_recorder_rotates_oldest_captures(tmp_path):
+    """Only the newest max_files captures are kept."""
+    recorder = RequestRecorder(str(tmp_path), max_files=2)
+    payload = OptimizationRequestPayload(**generate_profile_payload("tiny", seed=0))
+    paths = [recorder.record(payload, None, 0.5) for _ in range(3)]
+    remaining = sorted(os.listdir(tmp_path))
+    assert len(remaining) == 2
+    assert os.path.basename(paths[0]) not in remaining
+    record = _read_capture(paths[-1])
+    assert record["result"] == {"status": "exception"}
+    assert record["elapsedSeconds"] == 0.5
+    assert load_payload_file(paths[-1])["items"] == payload.model_dump()["items"]
+
+
+def test_endpoint_captures_when_enabled(tmp_path, monkeypatch):
+    """The endpoint records the payload, elapsed time and result summary when a recorder is set."""
+    from fastapi.testclient import TestClient
+    monkeypatch.setattr(main, "REQUEST_RECORDER", RequestRecorder(str(tmp_path), anonymize=True))
+    payload = generate_profile_payload("tiny", seed=1)
+    payload["solverOptions"] = {"timeLimitSeconds": 0.2}
+    with TestClient(main.app) as client:
+        response = client.post("/optimize-schedule", json=payload)
+    assert response.status_code == 200
+
+    (capture_name,) = os.listdir(tmp_path)
+    record = _read_capture(tmp_path / capture_name)
+    assert record["result"]["status"] == response.json()["status"]
+    assert record["result"]["objectiveValue"] == response.json()["solverStats"]["objectiveValue"]
+    assert record["result"]["stopReason"] == response.json()["solverStats"]["stopReason"] == "TIME_LIMIT"
+    assert record["elapsedSeconds"] > 0
+    assert record["payload"]["items"][0]["id"] != payload["items"][0]["id"]
+
+
+def test_replay_is_deterministic_with_solution_limit(tmp_path):
+    """Replaying a capture twice with a solution limit gives identical objectives and reports deltas."""
+    recorder = RequestRecorder(str(tmp_path))
+    request = OptimizationRequestPayload(**generate_profile_payload("small", seed=4))
+    response = main.solve_schedule(request)
+    path = recorder.record(request, response, 1.0)
+
+    first = replay_file(path, seed=0, solution_limit=20)
+    second = replay_file(path, seed=0, solution_limit=20)
+    assert first["objectiveValue"] == second["objectiveValue"]
+    assert first["capturedObjectiveValue"] == response.solverStats.objectiveValue
+    assert first["objectiveDelta"] == first["objectiveValue"] - response.solverStats.objectiveValue
+    assert first["elapsedDeltaSeconds"] is not None
+
+
+def test_replay_options_override():
+    options = replay_options({"timeLimitSeconds": 1.0, "basePenalty": 5}, seed=3, solution_limit=10, time_limit=None)
+    assert options["randomSeed"] == 3
+    assert options["solutionLimit"] == 10
+    assert options["basePenalty"] == 5
+    assert options["timeLimitSeconds"] > 1.0
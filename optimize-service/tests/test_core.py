@@ -0,0 +1,151 @@
+import copy
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core import (
+    STOP_GAP_REACHED,
+    STOP_SEARCH_COMPLETED,
+    STOP_SOLUTION_LIMIT,
+    STOP_STALLED,
+    STOP_TIME_LIMIT,
+    InvalidProblemError,
+    ProblemInstance,
+    SearchProgress,
+    SolutionPool,
+    compile_instance,
+    iso_to_seconds,
+    solve_instance,
+    travel_lower_bound,
+)
+from models import OptimizationRequestPayload
+from solver_profile import DEFAULT_SOLVER_OPTIONS
+from tests.test_main import MINIMAL_VALID_PAYLOAD
+
+
+def _options(**overrides):
+    """Plain attribute bag: the core never needs the pydantic options model."""
+    return SimpleNamespace(**{**DEFAULT_SOLVER_OPTIONS.model_dump(), "solutionLimit": 10, **overrides})
+
+
+def _payload(**changes):
+    payload = copy.deepcopy(MINIMAL_VALID_PAYLOAD)
+    payload.update(changes)
+    return OptimizationRequestPayload(**payload)
+
+
+def test_compile_instance_builds_arrays_relative_to_the_epoch():
+    payload = _payload(fixedConstraints=[{"itemId": "item_1", "fixedTimeISO": "2024-04-11T10:00:00Z"}])
+    instance = compile_instance(payload)
+    assert instance.planning_epoch == iso_to_seconds("2024-04-11T08:00:00Z")
+    assert instance.item_ids == ["item_1"] and instance.tech_ids == [1]
+    assert instance.item_fixed_time.tolist() == [7200]
+    assert (instance.tech_window_start.tolist(), instance.tech_window_end.tolist()) == ([0], [9 * 3600])
+    assert instance.eligible.tolist() == [[True]]
+    assert instance.travel_matrix[1, 0] == 600
+    assert instance.fixed_items() == [0]
+    assert not hasattr(instance, "__dict__") # __slots__ only
+    with pytest.raises(AttributeError):
+        instance.extra = 1
+
+
+def test_solve_instance_returns_plain_results():
+    instance = compile_instance(_payload())
+    result = solve_instance(instance, _options())
+    assert result.status == "success"
+    (route,) = result.routes
+    assert route.technician_id == 1 and route.item_indices == [0]
+    assert route.arrival == [instance.planning_epoch + 600]
+    assert route.end[0] - route.start[0] == 1800
+    assert route.total_travel_seconds == 600 + 700
+    assert result.objective_value == 1300 and result.solver_ran
+
+
+def test_invalid_input_raises_invalid_problem_error():
+    instance = compile_instance(_payload())
+    with pytest.raises(InvalidProblemError):
+        solve_instance(instance, _options(firstSolutionStrategy="NOT_A_STRATEGY"))
+    with pytest.raises(ValueError): # InvalidProblemError is a ValueError
+        solve_instance(instance, _options(timeLimitSeconds=0))
+    with pytest.raises(InvalidProblemError):
+        solve_instance(instance, _options(minRelativeImprovement=1.5))
+    bad_time = copy.deepcopy(MINIMAL_VALID_PAYLOAD)
+    bad_time["technicians"] = [{**bad_time["technicians"][0], "earliestStartTimeISO": "not a time"}]
+    with pytest.raises(InvalidProblemError):
+        compile_instance(OptimizationRequestPayload(**bad_time))
+
+
+def test_solve_instance_without_items_or_technicians_skips_the_solver():
+    empty = compile_instance(_payload(items=[]))
+    assert solve_instance(empty, _options()).status == "success"
+    no_techs = compile_instance(_payload(technicians=[]))
+    result = solve_instance(no_techs, _options())
+    assert result.status == "error" and result.unassigned_item_ids == ["item_1"]
+    assert not result.solver_ran
+    assert isinstance(no_techs, ProblemInstance) and no_techs.eligible.shape == (1, 0)
+    assert np.array_equal(no_techs.tech_window_start, [])
+
+
+def test_core_imports_without_web_or_model_layers():
+    import subprocess, sys
+    code = "import core, sys; print(any(m in sys.modules for m in ('pydantic', 'fastapi', 'models')))"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip() == "False"
+
+
+def test_solution_pool_keeps_best_distinct_assignments():
+    """Reorderings of the same assignment count once (cheapest kept); only the best `size` stay."""
+    pool = SolutionPool(2)
+    pool.offer(100, ((0, (1, 2)), (1, (3,))))
+    pool.offer(90, ((0, (2, 1)), (1, (3,)))) # Same assignment, cheaper order
+    pool.offer(120, ((0, (1,)), (1, (2, 3))))
+    assert pool.wants(110) and not pool.wants(120)
+    pool.offer(110, ((0, (1, 2, 3)),))
+    assert [objective for objective, _ in pool.ranked()] == [90, 110]
+    best_key = SolutionPool.key([(0, [1, 2]), (1, [3])])
+    assert [objective for objective, _ in pool.ranked(exclude=best_key)] == [110]
+
+
+def test_search_progress_stalls_without_relative_improvement():
+    progress = SearchProgress(stall_seconds=None, stall_solutions=3, min_improvement=0.01)
+    assert not progress.update(1000, now=0.0)
+    assert not progress.update(995, now=1.0) # Under 1%: doesn't reset the count
+    assert not progress.update(980, now=2.0) # 2% better than 1000: counts again from here
+    assert [progress.update(979, now=t) for t in (3.0, 4.0, 5.0)] == [False, False, True]
+    timed = SearchProgress(stall_seconds=2.0, stall_solutions=None, min_improvement=0.0)
+    assert not timed.update(1000, now=10.0)
+    assert not timed.update(999, now=11.5) # Any improvement counts
+    assert not timed.update(999, now=13.0)
+    assert timed.update(999, now=13.5)
+
+
+def test_travel_lower_bound():
+    # Node 0 is a depot; items 1 and 2 are 5 apart and 10 from the depot; 2 -> 1 is unknown
+    travel = np.array([[0, 10, 10], [10, 0, 5], [10, 999999, 0]])
+    is_item = np.array([False, True, True])
+    assert travel_lower_bound(travel, is_item) == 10 + 5 # Entering 1 costs 10, 2 costs 5
+
+
+def test_early_stopping_rules_end_the_search():
+    """Stop reasons: the stall and gap rules end the search before the solution limit."""
+    from payload_generator import generate_profile_payload
+    instance = compile_instance(OptimizationRequestPayload(**generate_profile_payload("small", seed=5)))
+    limited = solve_instance(instance, _options(solutionLimit=100, timeLimitSeconds=30))
+    assert limited.stop_reason == STOP_SOLUTION_LIMIT
+    stalled = solve_instance(instance, _options(solutionLimit=100, timeLimitSeconds=30, stallSolutions=5))
+    assert stalled.stop_reason == STOP_STALLED
+    assert stalled.solve_time_seconds < limited.solve_time_seconds
+    # A gap of 1 stops at the first solution that assigns every item
+    first = solve_instance(instance, _options(solutionLimit=100, timeLimitSeconds=30, stopGap=1.0))
+    assert first.stop_reason == STOP_GAP_REACHED and not first.unassigned_item_ids
+
+
+def test_stop_reason_comes_from_the_routing_status():
+    """A descent that reaches its local optimum completes; guided local search only ever stops at a limit."""
+    from payload_generator import generate_profile_payload
+    instance = compile_instance(OptimizationRequestPayload(**generate_profile_payload("small", seed=5)))
+    completed = solve_instance(instance, _options(solutionLimit=None, timeLimitSeconds=30,
+                                                  localSearchMetaheuristic="GREEDY_DESCENT"))
+    assert completed.stop_reason == STOP_SEARCH_COMPLETED
+    timed_out = solve_instance(instance, _options(solutionLimit=None, timeLimitSeconds=0.2))
+    assert timed_out.stop_reason == STOP_TIME_LIMIT
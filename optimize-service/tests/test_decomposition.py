@@ -0,0 +1,52 @@
+from fastapi.testclient import TestClient
+
+import main
+from core import compile_instance
+from decomposition import partition
+from evaluation import evaluate_plans
+from memory_guard import (
+    OVERFLOW_DECOMPOSE,
+    SOLVE_BASE_BYTES,
+    SOLVE_BYTES_PER_LOCATION_PAIR,
+    SOLVE_BYTES_PER_NODE_PAIR,
+    MemoryBudget,
+    estimate_payload_bytes,
+    routing_nodes,
+)
+from models import OptimizationRequestPayload
+from payload_generator import generate_payload
+
+
+def test_partition_covers_everything_once():
+    instance = compile_instance(OptimizationRequestPayload(**generate_payload(60, 8, seed=2)))
+    groups = partition(instance, 3)
+    assert len(groups) == 3 and all(techs for _, techs in groups)
+    assert sorted(i for items, _ in groups for i in items) == list(range(instance.num_items))
+    assert sorted(v for _, techs in groups for v in techs) == list(range(instance.num_techs))
+    for items, techs in groups: # Items go to a part with an eligible technician whenever there is one
+        for i in items:
+            assert instance.eligible[i, techs].any() or not instance.eligible[i].any()
+
+
+def test_oversized_request_is_solved_in_parts(monkeypatch):
+    """With the decompose overflow, a request just over budget is split; the merged routes are feasible."""
+    raw = {**generate_payload(40, 6, seed=3), "solverOptions": {"timeLimitSeconds": 2, "solutionLimit": 50}}
+    payload = OptimizationRequestPayload(**raw)
+    num_locations = len(raw["locations"])
+    payload_bytes = estimate_payload_bytes(sum(len(row) for row in raw["travelTimeMatrix"].values()))
+    fixed = payload_bytes + SOLVE_BASE_BYTES + SOLVE_BYTES_PER_LOCATION_PAIR * num_locations ** 2
+    node_pairs = SOLVE_BYTES_PER_NODE_PAIR * routing_nodes(num_locations, 40, 6) ** 2
+    monkeypatch.setattr(main, "MEMORY_BUDGET", MemoryBudget(fixed + node_pairs // 3, OVERFLOW_DECOMPOSE))
+    response = TestClient(main.app).post("/optimize-schedule", json=raw)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["solverStats"]["decompositionParts"] == 2
+    visited = [stop["itemId"] for route in data["routes"] for stop in route["stops"]]
+    assert len(visited) == len(set(visited))
+    assert sorted(visited + data["unassignedItemIds"]) == sorted(item["id"] for item in raw["items"])
+    instance = compile_instance(payload)
+    [plan] = evaluate_plans(instance, [[(route["technicianId"], [s["itemId"] for s in route["stops"]])
+                                        for route in data["routes"]]])
+    assert plan.feasible
+    assert [s["startTimeUnix"] for r in data["routes"] for s in r["stops"]] == [
+        t for route in plan.routes for t in route.start]
@@ -0,0 +1,78 @@
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+from models import OptimizationRequestPayload, RouteEvaluationRequestPayload
+from payload_generator import generate_profile_payload
+
+# Locations: 0 = start depot, 1 = end depot, 2..4 = items a..c
+PAYLOAD = {
+    "locations": [{"id": i, "index": i, "coords": {"lat": 0.0, "lng": 0.0}} for i in range(5)],
+    "technicians": [
+        {"id": 1, "startLocationIndex": 0, "endLocationIndex": 1,
+         "earliestStartTimeISO": "2024-04-15T08:00:00Z", "latestEndTimeISO": "2024-04-15T10:00:00Z"},
+        {"id": 2, "startLocationIndex": 0, "endLocationIndex": 1,
+         "earliestStartTimeISO": "2024-04-15T09:00:00Z", "latestEndTimeISO": "2024-04-15T17:00:00Z"},
+    ],
+    "items": [
+        {"id": "a", "locationIndex": 2, "durationSeconds": 1800, "priority": 1, "eligibleTechnicianIds": [1, 2]},
+        {"id": "b", "locationIndex": 3, "durationSeconds": 3600, "priority": 1, "eligibleTechnicianIds": [1, 2]},
+        {"id": "c", "locationIndex": 4, "durationSeconds": 600, "priority": 2, "eligibleTechnicianIds": [2]},
+    ],
+    "fixedConstraints": [{"itemId": "b", "fixedTimeISO": "2024-04-15T08:45:00Z"}],
+    "travelTimeMatrix": {i: {j: 0 if i == j else 600 for j in range(5)} for i in range(5)},
+}
+
+
+def _route(tech_id, *item_ids):
+    return {"technicianId": tech_id, "stops": [{"itemId": item_id} for item_id in item_ids]}
+
+
+def _evaluate(*plans):
+    with TestClient(app) as client:
+        response = client.post("/evaluate-routes", json={**PAYLOAD, "plans": [{"id": str(i), "routes": routes}
+                                                                            for i, routes in enumerate(plans)]})
+    assert response.status_code == 200, response.text
+    return response.json()["plans"]
+
+
+def test_feasible_plan_times():
+    """Stops start on arrival, fixed-time items wait for their time, totals add up."""
+    [plan] = _evaluate([_route(1, "b"), _route(2, "a", "c")])
+    assert plan["feasible"] and plan["violations"] == [] and plan["unassignedItemIds"] == []
+    [b] = plan["routes"][0]["stops"]
+    assert (b["arrivalTimeISO"], b["startTimeISO"], b["endTimeISO"], b["idleTimeSeconds"]) == (
+        "2024-04-15T08:10:00Z", "2024-04-15T08:45:00Z", "2024-04-15T09:45:00Z", 2100)
+    a, c = plan["routes"][1]["stops"]
+    assert (a["arrivalTimeISO"], a["startTimeISO"], a["endTimeISO"]) == (
+        "2024-04-15T09:10:00Z", "2024-04-15T09:10:00Z", "2024-04-15T09:40:00Z")
+    assert (c["arrivalTimeISO"], c["travelTimeSeconds"]) == ("2024-04-15T09:50:00Z", 600)
+    assert plan["routes"][1]["totalTravelTimeSeconds"] == 3 * 600
+    assert plan["routes"][1]["totalDurationSeconds"] == 50 * 60 # 09:10 to 10:00
+    assert (plan["totalTravelTimeSeconds"], plan["totalIdleTimeSeconds"]) == (5 * 600, 2100)
+
+
+def test_violations_are_reported():
+    [late, overrun, bad_ids] = _evaluate(
+        [_route(1, "a", "b")],                      # b's fixed time is 08:45, arrival 08:50
+        [_route(1, "b", "a", "c")],                 # c is not eligible for 1, and the shift ends at 10:00
+        [_route(3, "a"), _route(2, "x", "a", "a")], # unknown tech and item, a visited twice
+    )
+    assert [(v["code"], v["itemId"], v["amountSeconds"]) for v in late["violations"]] == [("FIXED_TIME_MISSED", "b", 300)]
+    assert late["unassignedItemIds"] == ["c"]
+    codes = [v["code"] for v in overrun["violations"]]
+    assert codes == ["INELIGIBLE_TECHNICIAN", "SHIFT_END_EXCEEDED"]
+    assert overrun["violations"][1]["amountSeconds"] == 55 * 60 # Back at 10:55
+    assert [v["code"] for v in bad_ids["violations"]] == ["UNKNOWN_TECHNICIAN", "UNKNOWN_ITEM", "DUPLICATE_ITEM"]
+    assert not bad_ids["feasible"]
+
+
+def test_solver_routes_evaluate_to_the_same_times():
+    """Evaluating the solver's own routes reproduces its stop times and totals exactly."""
+    raw = {**generate_profile_payload("small", seed=4), "solverOptions": {"solutionLimit": 20, "timeLimitSeconds": 5}}
+    solved = main.solve_schedule(OptimizationRequestPayload(**raw)).model_dump()
+    [plan] = main.evaluate_schedule(RouteEvaluationRequestPayload(
+        **raw, plans=[{"routes": solved["routes"]}])).model_dump()["plans"]
+    assert plan["feasible"], plan["violations"]
+    assert plan["routes"] == solved["routes"]
+    assert plan["unassignedItemIds"] == solved["unassignedItemIds"]
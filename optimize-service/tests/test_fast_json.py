@@ -0,0 +1,67 @@
+import copy
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import fast_json
+from fast_json import BodyTooLargeError, UnsupportedEncodingError, decode_body
+from main import app
+from tests.test_main import MINIMAL_VALID_PAYLOAD
+
+
+def _body():
+    return json.dumps(copy.deepcopy(MINIMAL_VALID_PAYLOAD)).encode()
+
+
+def _without_timing(response_json):
+    response_json["solverStats"].pop("solveTimeSeconds")
+    response_json["solverStats"].pop("peakRssMb") # Measured, like the solve time
+    return response_json
+
+
+def test_fast_endpoint_matches_regular_endpoint():
+    client = TestClient(app)
+    regular = client.post("/optimize-schedule", content=_body(), headers={"Content-Type": "application/json"})
+    fast = client.post("/optimize-schedule/fast", content=_body(), headers={"Content-Type": "application/json"})
+    assert regular.status_code == fast.status_code == 200
+    assert _without_timing(fast.json()) == _without_timing(regular.json())
+    assert fast.json()["routes"][0]["stops"][0]["itemId"] == "item_1"
+
+
+def test_fast_endpoint_accepts_gzip_body():
+    client = TestClient(app)
+    response = client.post("/optimize-schedule/fast", content=gzip.compress(_body()),
+                           headers={"Content-Type": "application/json", "Content-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.json()["status"] == "success"
+
+
+def test_fast_endpoint_rejects_unknown_encoding_and_invalid_payload():
+    client = TestClient(app)
+    response = client.post("/optimize-schedule/fast", content=_body(), headers={"Content-Encoding": "br"})
+    assert response.status_code == 415
+    response = client.post("/optimize-schedule/fast", content=b"not gzip", headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 400
+    response = client.post("/optimize-schedule/fast", content=json.dumps({"items": []}).encode())
+    assert response.status_code == 422
+
+
+def test_decode_body_limits_decompressed_size():
+    compressed = gzip.compress(b" " * 10_000)
+    assert decode_body(compressed, "gzip") == b" " * 10_000
+    with pytest.raises(BodyTooLargeError):
+        decode_body(compressed, "gzip", max_bytes=1000)
+
+
+def test_decode_body_zstd_needs_optional_package(monkeypatch):
+    monkeypatch.setattr(fast_json, "zstandard", None)
+    with pytest.raises(UnsupportedEncodingError):
+        decode_body(b"\x28\xb5\x2f\xfd", "zstd")
+    assert "zstd" not in fast_json.supported_encodings()
+
+
+def test_dumps_falls_back_to_standard_json(monkeypatch):
+    monkeypatch.setattr(fast_json, "orjson", None)
+    assert json.loads(fast_json.dumps({"a": [1, None]})) == {"a": [1, None]}
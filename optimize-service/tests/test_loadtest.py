@@ -0,0 +1,49 @@
+import pytest
+
+from loadtest import TestClientTarget, percentile, run_load, summarize_latencies
+from models import OptimizationRequestPayload
+from payload_generator import PROFILES, generate_profile_payload, parse_mix
+
+
+def test_percentile_nearest_rank():
+    """Nearest-rank percentiles on a small sorted sample."""
+    values = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0]
+    assert percentile(values, 50) == 5.0
+    assert percentile(values, 95) == 10.0
+    assert percentile(values, 10) == 1.0
+    assert percentile([], 99) == 0.0
+    stats = summarize_latencies([3.0, 1.0, 2.0])
+    assert stats["min"] == 1.0 and stats["max"] == 3.0 and stats["p50"] == 2.0
+
+
+def test_generated_payloads_are_valid():
+    """Every named profile produces a payload the service accepts, deterministically per seed."""
+    for profile, (num_items, num_techs) in PROFILES.items():
+        payload = generate_profile_payload(profile, seed=7)
+        parsed = OptimizationRequestPayload(**payload)
+        assert len(parsed.items) == num_items
+        assert len(parsed.technicians) == num_techs
+        depot_indices = {t.startLocationIndex for t in parsed.technicians} | {t.endLocationIndex for t in parsed.technicians}
+        assert not depot_indices & {item.locationIndex for item in parsed.items}
+    assert generate_profile_payload("small", seed=1) == generate_profile_payload("small", seed=1)
+
+
+def test_parse_mix():
+    """Weighted mixes parse, bare names default to weight 1 and unknown profiles are rejected."""
+    assert parse_mix("small=3,medium") == {"small": 3, "medium": 1}
+    assert parse_mix("") == {"small": 1}
+    with pytest.raises(ValueError):
+        parse_mix("enormous=1")
+
+
+def test_run_load_against_testclient():
+    """A short closed-loop run reports every request and no errors."""
+    with TestClientTarget() as target:
+        report, results = run_load(target, {"tiny": 1}, total_requests=2, concurrency=2, variants=1)
+    assert report.requests == 2
+    assert report.errors == 0
+    assert len(results) == 2
+    assert report.latency_seconds["p99"] >= report.latency_seconds["p50"] > 0
+    assert report.throughput_rps > 0
+    assert report.cpu_seconds is not None
+    assert sum(report.solver_statuses.values()) == 2
@@ -0,0 +1,115 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from local_rpc import (
+    LocalRpcClient,
+    LocalRpcServer,
+    ProtocolError,
+    RpcError,
+    bind_listener,
+    decode_request,
+    encode_frame,
+    read_frame,
+)
+from main import app
+from payload_generator import generate_profile_payload
+from payload_io import dense_travel_matrix
+from presolve import TRAVEL_TIME_SENTINEL
+
+
+def _payload():
+    payload = generate_profile_payload("tiny", seed=1)
+    payload["solverOptions"] = {"solutionLimit": 20}
+    return payload
+
+
+def test_frames_round_trip_and_reject_garbage():
+    stream = io.BytesIO(encode_frame(b'{"a": 1}', b"\x01\x00\x00\x00") + encode_frame(b"{}"))
+    assert read_frame(stream) == (b'{"a": 1}', b"\x01\x00\x00\x00")
+    assert read_frame(stream) == (b"{}", b"")
+    assert read_frame(stream) is None
+    with pytest.raises(ProtocolError, match="Not a frame"):
+        read_frame(io.BytesIO(b"POST / HTTP/1.1\r\n"))
+    with pytest.raises(ProtocolError, match="middle of a frame"):
+        read_frame(io.BytesIO(encode_frame(b"{}", b"\x00" * 8)[:-1]))
+
+
+def test_decode_request_dense_matrix():
+    payload = _payload()
+    n = len(payload["locations"])
+    matrix = dense_travel_matrix(payload)
+    matrix[0, 1] = -1 # Unknown leg
+    header = json.dumps({**payload, "travelTimeMatrix": {}}).encode()
+    decoded, dense = decode_request(header, matrix.astype("<i4").tobytes())
+    assert len(decoded.items) == len(payload["items"]) and dense.shape == (n, n)
+    assert dense[0, 1] == TRAVEL_TIME_SENTINEL and dense[1, 0] == matrix[1, 0]
+    assert decode_request(json.dumps(payload).encode(), b"")[1] is None
+    with pytest.raises(ProtocolError, match="locations need"):
+        decode_request(header, matrix[:-1].astype("<i4").tobytes())
+
+
+def test_local_rpc_solves_over_one_connection(tmp_path):
+    """Dense and dict matrices give the HTTP endpoint's routes; errors don't end the connection."""
+    path = str(tmp_path / "solve.sock")
+    server = LocalRpcServer(bind_listener(path), main.handle_rpc_frame).start()
+    payload = _payload()
+    try:
+        with LocalRpcClient(path, timeout=30) as client:
+            dense = client.solve(payload, dense_travel_matrix(payload))
+            connection = client._socket
+            from_dict = client.solve(payload)
+            with pytest.raises(RpcError) as invalid:
+                client.solve({"items": 1})
+            with pytest.raises(RpcError) as wrong_size:
+                client.solve(payload, np.zeros((2, 2)))
+            again = client.solve(payload, dense_travel_matrix(payload))
+            assert client._socket is connection # Every solve reused the first connection
+    finally:
+        server.stop()
+    with TestClient(app) as http:
+        expected = http.post("/optimize-schedule", json=payload).json()
+    assert dense["routes"] == from_dict["routes"] == again["routes"] == expected["routes"]
+    assert dense["unassignedItemIds"] == expected["unassignedItemIds"]
+    assert invalid.value.status_code == 422
+    assert wrong_size.value.status_code == 400
+
+
+def test_bind_listener_once_per_path(tmp_path):
+    path = str(tmp_path / "solve.sock")
+    listener = bind_listener(path)
+    try:
+        assert listener is not None
+        assert bind_listener(path) is None # Held by a live server (here: this process's other listener)
+    finally:
+        listener.close()
+
+
+def test_importing_main_binds_no_socket(tmp_path):
+    """Offline tools import main; only a serving app may take the socket."""
+    path = str(tmp_path / "solve.sock")
+    env = {**os.environ, "SOLVE_SOCKET_PATH": path, "SOLVER_WARMUP": "0"}
+    subprocess.run([sys.executable, "-c", "import main"], env=env, check=True,
+                   cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), capture_output=True)
+    assert not os.path.exists(path) and not os.path.exists(path + ".lock")
+
+
+def test_app_lifespan_serves_socket(tmp_path, monkeypatch):
+    """The app binds SOLVE_SOCKET_PATH on startup and removes it on shutdown."""
+    path = str(tmp_path / "solve.sock")
+    monkeypatch.setenv("SOLVE_SOCKET_PATH", path)
+    payload = _payload()
+    with TestClient(app):
+        with LocalRpcClient(path, timeout=30) as client:
+            assert client.solve(payload, dense_travel_matrix(payload))["routes"]
+    assert not os.path.exists(path)
+    listener = bind_listener(path) # The lock was released with the socket
+    assert listener is not None
+    listener.close()
@@ -906,3 +906,93 @@ def test_optimize_schedule_final_travel_leg(client):
 # - Correct handling of solver results (verifying route structure, timings)
 # - Edge cases (e.g., constraints making scheduling impossible, invalid travel matrix)
 # - Error handling (e.g., invalid payload structure - FastAPI handles some, but test specific cases)
+
+
+def test_optimize_schedule_per_leg_times(client):
+    """Each stop carries Unix times, the travel into it and any wait before service; they add up."""
+    item = {"locationIndex": 0, "durationSeconds": 1800, "priority": 1, "eligibleTechnicianIds": [1]}
+    payload = {
+        "locations": [SAMPLE_LOCATION_ITEM, SAMPLE_LOCATION_START_DEPOT, SAMPLE_LOCATION_END_DEPOT],
+        "technicians": [{"id": 1, "startLocationIndex": 1, "endLocationIndex": 2,
+                         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T17:00:00Z"}],
+        "items": [{**item, "id": "free"}, {**item, "id": "fixed"}],
+        "fixedConstraints": [{"itemId": "fixed", "fixedTimeISO": "2024-04-11T11:00:00Z"}],
+        "travelTimeMatrix": SAMPLE_TRAVEL_MATRIX,
+    }
+
+    response = client.post("/optimize-schedule", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "success"
+    route = data["routes"][0]
+    stops = route["stops"]
+    assert sorted(stop["itemId"] for stop in stops) == ["fixed", "free"]
+
+    for stop in stops:
+        assert stop["startTimeUnix"] == iso_to_seconds(stop["startTimeISO"])
+        assert stop["arrivalTimeUnix"] == iso_to_seconds(stop["arrivalTimeISO"])
+        assert stop["arrivalTimeUnix"] + stop["idleTimeSeconds"] == stop["startTimeUnix"]
+        assert stop["endTimeUnix"] == stop["startTimeUnix"] + 1800
+    assert stops[0]["travelTimeSeconds"] == 600 # Start depot -> item
+    assert stops[1]["travelTimeSeconds"] == 0   # Same address
+    assert stops[1]["arrivalTimeUnix"] == stops[0]["endTimeUnix"]
+    fixed_stop = next(stop for stop in stops if stop["itemId"] == "fixed")
+    assert fixed_stop["startTimeUnix"] == iso_to_seconds("2024-04-11T11:00:00Z")
+    assert route["totalIdleTimeSeconds"] == sum(stop["idleTimeSeconds"] for stop in stops)
+    assert route["totalTravelTimeSeconds"] == 600 + 700 # Includes the leg to the end depot
+
+
+def test_optimize_schedule_unix_times(client):
+    """Unix-second inputs give the same schedule as ISO inputs; 'unix' responses carry no ISO strings."""
+    item = {"locationIndex": 0, "durationSeconds": 1800, "priority": 1, "eligibleTechnicianIds": [1]}
+    technician = {"id": 1, "startLocationIndex": 1, "endLocationIndex": 2}
+    payload = {
+        "locations": [SAMPLE_LOCATION_ITEM, SAMPLE_LOCATION_START_DEPOT, SAMPLE_LOCATION_END_DEPOT],
+        "technicians": [{**technician, "earliestStartTimeISO": "2024-04-11T08:00:00Z",
+                         "latestEndTimeISO": "2024-04-11T17:00:00Z"}],
+        "items": [{**item, "id": "free"}, {**item, "id": "fixed"}],
+        "fixedConstraints": [{"itemId": "fixed", "fixedTimeISO": "2024-04-11T11:00:00Z"}],
+        "travelTimeMatrix": SAMPLE_TRAVEL_MATRIX,
+    }
+    unix_payload = {
+        **payload,
+        "technicians": [{**technician, "earliestStartTimeUnix": iso_to_seconds("2024-04-11T08:00:00Z"),
+                         "latestEndTimeUnix": iso_to_seconds("2024-04-11T17:00:00Z")}],
+        "fixedConstraints": [{"itemId": "fixed", "fixedTimeUnix": iso_to_seconds("2024-04-11T11:00:00Z")}],
+        "responseTimeFormat": "unix",
+    }
+
+    iso_stops = client.post("/optimize-schedule", json=payload).json()["routes"][0]["stops"]
+    unix_stops = client.post("/optimize-schedule", json=unix_payload).json()["routes"][0]["stops"]
+    assert [s["itemId"] for s in unix_stops] == [s["itemId"] for s in iso_stops]
+    for iso_stop, unix_stop in zip(iso_stops, unix_stops):
+        assert unix_stop["startTimeUnix"] == iso_stop["startTimeUnix"]
+        assert unix_stop["arrivalTimeUnix"] == iso_stop["arrivalTimeUnix"]
+        assert unix_stop["startTimeISO"] is None and unix_stop["endTimeISO"] is None
+
+
+def test_optimize_schedule_alternatives(client):
+    """Alternatives are distinct assignments, ranked, no better than the main routes, and fully timed."""
+    from payload_generator import generate_profile_payload
+    payload = {**generate_profile_payload("small", seed=5), "alternatives": 3,
+               "solverOptions": {"solutionLimit": 200, "timeLimitSeconds": 10}}
+    response = client.post("/optimize-schedule", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    alternatives = data["alternatives"]
+    assert 1 <= len(alternatives) <= 3
+    assert [a["rank"] for a in alternatives] == list(range(1, len(alternatives) + 1))
+    objectives = [a["objectiveValue"] for a in alternatives]
+    assert objectives == sorted(objectives) and objectives[0] >= data["solverStats"]["objectiveValue"]
+
+    def assignment(routes):
+        return {(r["technicianId"], frozenset(s["itemId"] for s in r["stops"])) for r in routes}
+    assignments = [assignment(data["routes"])] + [assignment(a["routes"]) for a in alternatives]
+    assert len(set(map(frozenset, assignments))) == len(assignments)
+    for alternative in alternatives:
+        for route in alternative["routes"]:
+            assert all(s["startTimeISO"] and s["endTimeUnix"] >= s["startTimeUnix"] for s in route["stops"])
+        visited = {s["itemId"] for r in alternative["routes"] for s in r["stops"]}
+        assert set(alternative["unassignedItemIds"]) == {i["id"] for i in payload["items"]} - visited
+
+    assert client.post("/optimize-schedule", json=MINIMAL_VALID_PAYLOAD).json().get("alternatives") is None
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from memory_guard import (
+    MB,
+    OVERFLOW_DECOMPOSE,
+    SOLVE_BASE_BYTES,
+    MemoryBudget,
+    MemoryBudgetError,
+    PeakRssMeter,
+    budget_from_env,
+    estimate_solve_bytes,
+)
+from payload_generator import generate_profile_payload
+
+
+def test_plan_rejects_or_splits_oversized_requests():
+    counts = (2000, 1800, 100) # locations, items, technicians
+    fits = MemoryBudget(10 * estimate_solve_bytes(*counts))
+    assert fits.plan(0, *counts) == 1
+    with pytest.raises(MemoryBudgetError):
+        MemoryBudget(estimate_solve_bytes(*counts) - 1).plan(0, *counts)
+    # Splitting only shrinks the node-pair share, by the square of the number of parts
+    parts = MemoryBudget(estimate_solve_bytes(*counts) - 1, OVERFLOW_DECOMPOSE).plan(0, *counts)
+    assert parts == 2
+    assert MemoryBudget(estimate_solve_bytes(*counts) * 3 // 4, OVERFLOW_DECOMPOSE).plan(0, *counts) > 2
+    with pytest.raises(MemoryBudgetError, match="in parts either"): # The payload alone is over budget
+        MemoryBudget(100 * MB, OVERFLOW_DECOMPOSE).plan(200 * MB, *counts)
+
+
+def test_budget_from_env():
+    assert budget_from_env({}) is None
+    budget = budget_from_env({"SOLVE_MEMORY_BUDGET_MB": "512", "SOLVE_MEMORY_OVERFLOW": "decompose"})
+    assert (budget.budget_bytes, budget.overflow) == (512 * MB, OVERFLOW_DECOMPOSE)
+    with pytest.raises(ValueError):
+        budget_from_env({"SOLVE_MEMORY_BUDGET_MB": "512", "SOLVE_MEMORY_OVERFLOW": "quick"})
+
+
+def test_peak_rss_meter_sees_allocations():
+    with PeakRssMeter() as meter:
+        block = np.ones(64 * MB, dtype=np.uint8)
+        del block
+    assert meter.peak_bytes > 64 * MB
+
+
+def test_endpoint_enforces_the_budget(monkeypatch):
+    client = TestClient(main.app)
+    payload = {**generate_profile_payload("tiny", seed=1), "solverOptions": {"timeLimitSeconds": 0.2}}
+    # Below what parsing the body alone needs: turned away before the body is read
+    monkeypatch.setattr(main, "MEMORY_BUDGET", MemoryBudget(1024))
+    response = client.post("/optimize-schedule", json=payload)
+    assert response.status_code == 413 and "to parse" in response.json()["detail"]
+    # Enough to parse, not enough to solve
+    monkeypatch.setattr(main, "MEMORY_BUDGET", MemoryBudget(SOLVE_BASE_BYTES // 2))
+    response = client.post("/optimize-schedule", json=payload)
+    assert response.status_code == 413 and "memory budget" in response.json()["detail"]
+    monkeypatch.setattr(main, "MEMORY_BUDGET", None)
+    stats = client.post("/optimize-schedule", json=payload).json()["solverStats"]
+    assert stats["estimatedMemoryMb"] > 0 and stats["peakRssMb"] > 0 and stats["decompositionParts"] is None
+
+
+def test_body_check_only_applies_to_solve_routes(monkeypatch):
+    """The Content-Length check is plain ASGI middleware that lets other requests straight through."""
+    from starlette.middleware.base import BaseHTTPMiddleware
+    assert not any(middleware.cls is BaseHTTPMiddleware for middleware in main.app.user_middleware)
+    monkeypatch.setattr(main, "MEMORY_BUDGET", MemoryBudget(1024))
+    with TestClient(main.app) as client:
+        assert client.post("/jobs", content=b"{}" * 1024).status_code == 413
+        assert client.post("/load", content=b"{}" * 1024).status_code == 405 # Not a solve route: not checked
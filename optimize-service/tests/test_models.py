@@ -221,3 +221,19 @@ def test_technician_route_missing_optional():
     assert len(obj.stops) == 1
     assert obj.totalTravelTimeSeconds is None
     assert obj.totalDurationSeconds is None
+
+def test_unix_time_fields_replace_iso():
+    """Technician and fixed-constraint times may be given as Unix seconds instead of ISO strings."""
+    technician = OptimizationTechnician(id=1, startLocationIndex=1, endLocationIndex=1,
+                                        earliestStartTimeUnix=1712736000, latestEndTimeUnix=1712768400)
+    assert technician.earliestStartTimeISO is None
+    constraint = OptimizationFixedConstraint(itemId="item_1", fixedTimeUnix=1712743200)
+    assert constraint.fixedTimeISO is None
+
+def test_time_fields_require_iso_or_unix():
+    """A technician or fixed constraint with neither time representation is rejected."""
+    no_start = {k: v for k, v in SAMPLE_TECHNICIAN_1.items() if k != "earliestStartTimeISO"}
+    with pytest.raises(ValidationError):
+        OptimizationTechnician(**no_start)
+    with pytest.raises(ValidationError):
+        OptimizationFixedConstraint(itemId="item_1")
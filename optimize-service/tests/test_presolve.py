@@ -0,0 +1,338 @@
+import copy
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from core import compile_instance
+from main import app
+from models import OptimizationRequestPayload
+from presolve import (
+    TRAVEL_TIME_SENTINEL,
+    REASON_FIXED_TIME_UNREACHABLE,
+    REASON_INVALID_LOCATION,
+    REASON_NO_ELIGIBLE_TECHNICIAN,
+    REASON_OUTSIDE_TIME_WINDOW,
+    REASON_UNREACHABLE,
+    build_travel_matrix,
+    format_reason_counts,
+    pin_fixed_items,
+    presolve,
+    shortest_travel_from,
+    successor_mask,
+)
+from tests.test_main import MINIMAL_VALID_PAYLOAD
+
+# Relative to 08:00, the shared shift start below
+SHIFT = (0, 9 * 3600)
+
+
+def _payload(items, technicians=None, matrix=None, num_locations=4):
+    """Locations 0-1 are items, 2 is the start depot, 3 the end depot; all legs 600s."""
+    base = copy.deepcopy(MINIMAL_VALID_PAYLOAD)
+    base["locations"] = [
+        {"id": f"loc_{i}", "index": i, "coords": {"lat": 40.0 + i / 100, "lng": -74.0}}
+        for i in range(num_locations)
+    ]
+    base["technicians"] = technicians or [
+        {"id": 1, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T17:00:00Z"},
+    ]
+    base["items"] = items
+    base["travelTimeMatrix"] = matrix or {
+        i: {j: 0 if i == j else 600 for j in range(num_locations)} for i in range(num_locations)
+    }
+    return OptimizationRequestPayload(**base)
+
+
+def _instance(payload, matrix, windows, fixed_times):
+    """Compiles a payload, then sets its matrix, relative shifts and relative fixed times directly."""
+    instance = compile_instance(payload)
+    instance.travel_matrix = matrix
+    instance.tech_window_start = np.array([w[0] for w in windows], dtype=np.int64)
+    instance.tech_window_end = np.array([w[1] for w in windows], dtype=np.int64)
+    instance.item_fixed_time = np.array([fixed_times.get(i, -1) for i in instance.item_ids], dtype=np.int64)
+    return instance
+
+
+def _item(item_id, location_index=0, duration=1800, eligible=(1,)):
+    return {"id": item_id, "locationIndex": location_index, "durationSeconds": duration,
+            "priority": 1, "eligibleTechnicianIds": list(eligible)}
+
+
+def test_build_travel_matrix_fills_missing_and_undeclared_with_sentinel():
+    payload = _payload([_item("a")], matrix={0: {1: 5}, 1: {0: 7, 9: 1}, 3: {0: 3}})
+    payload.locations = payload.locations[:3] # Index 3 now has a matrix row but no location
+    matrix = build_travel_matrix(payload, 4)
+    assert matrix[0, 1] == 5 and matrix[1, 0] == 7
+    assert matrix[1, 1] == 0                    # A location is 0 from itself
+    assert matrix[0, 2] == TRAVEL_TIME_SENTINEL # Missing entry
+    assert matrix[3, 0] == TRAVEL_TIME_SENTINEL # Undeclared location
+    assert matrix[3, 3] == TRAVEL_TIME_SENTINEL
+    assert matrix.shape == (4, 4)
+
+
+def test_presolve_keeps_feasible_items_with_time_bounds():
+    payload = _payload([_item("a")])
+    result = presolve(_instance(payload, build_travel_matrix(payload, 4), [SHIFT], {}))
+    assert result.viable_items == [0]
+    assert result.reasons == {}
+    assert result.vehicles_for(0) == [0]
+    assert result.earliest_start[0, 0] == 600
+    assert result.latest_start[0, 0] == SHIFT[1] - 1800 - 600
+
+
+def test_presolve_reason_codes():
+    technicians = [
+        {"id": 1, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T17:00:00Z"},
+    ]
+    items = [
+        _item("ok"),
+        _item("bad_loc", location_index=7),
+        _item("depot", location_index=2),
+        _item("nobody", eligible=(99,)),
+        _item("unreachable", location_index=1),
+        _item("too_long", duration=9 * 3600),
+        _item("fixed_early"),
+    ]
+    payload = _payload(items, technicians)
+    matrix = build_travel_matrix(payload, 4)
+    matrix[[0, 2, 3], 1] = TRAVEL_TIME_SENTINEL # Nothing leads to location 1
+    result = presolve(_instance(payload, matrix, [SHIFT], {"fixed_early": 300}))
+    assert result.viable_items == [0, 2] # An item at a depot address is servable
+    assert result.reasons == {
+        "bad_loc": REASON_INVALID_LOCATION,
+        "nobody": REASON_NO_ELIGIBLE_TECHNICIAN,
+        "unreachable": REASON_UNREACHABLE,
+        "too_long": REASON_OUTSIDE_TIME_WINDOW,
+        "fixed_early": REASON_FIXED_TIME_UNREACHABLE,
+    }
+    assert format_reason_counts(result.reasons).startswith("FIXED_TIME_UNREACHABLE=1, INVALID_LOCATION=1")
+
+
+def test_shortest_travel_respects_detours_and_item_windows():
+    """A slow direct leg is not a lower bound when a detour is faster, and windows use the detour."""
+    payload = _payload([_item("a", 0), _item("b", 1)])
+    matrix = build_travel_matrix(payload, 4)
+    matrix[2, 0] = 5000 # Direct start -> a is slow ...
+    matrix[2, 1] = 100  # ... but start -> b -> a is 700s
+    assert shortest_travel_from(matrix, np.array([2]))[0].tolist() == [700, 100, 0, 600]
+    result = presolve(_instance(payload, matrix, [SHIFT], {"b": 3600}))
+    assert result.earliest_start[0, 0] == 700
+    assert result.window_start.tolist() == [700, 3600]
+    assert result.window_end.tolist() == [SHIFT[1] - 1800 - 600, 3600]
+
+
+def test_presolve_restricts_vehicles_to_those_that_fit():
+    technicians = [
+        {"id": 1, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T17:00:00Z"},
+        {"id": 2, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T08:30:00Z"},
+    ]
+    payload = _payload([_item("a", eligible=(1, 2))], technicians)
+    result = presolve(_instance(payload, build_travel_matrix(payload, 4), [SHIFT, (0, 1800)], {}))
+    assert np.array_equal(result.feasible[0], [True, False])
+    assert result.vehicles_for(0) == [0]
+
+
+def test_endpoint_enforces_eligibility_and_reports_reasons():
+    """Each item may only go to its eligible tech; pruned items come back with a reason."""
+    technicians = [
+        {"id": 1, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T17:00:00Z"},
+        {"id": 2, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T17:00:00Z"},
+    ]
+    items = [_item("for_1", 0, eligible=(1,)), _item("for_2", 1, eligible=(2,)), _item("nobody", 1, eligible=(5,))]
+    payload = _payload(items, technicians)
+    with TestClient(app) as client:
+        response = client.post("/optimize-schedule", json=payload.model_dump())
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "partial"
+    served = {stop["itemId"]: route["technicianId"] for route in data["routes"] for stop in route["stops"]}
+    assert served == {"for_1": 1, "for_2": 2}
+    assert data["unassignedItemIds"] == ["nobody"]
+    assert data["unassignedItemReasons"] == {"nobody": REASON_NO_ELIGIBLE_TECHNICIAN}
+
+
+def test_equivalent_technicians_are_grouped_and_symmetry_is_broken():
+    technicians = [
+        {"id": t, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T17:00:00Z"}
+        for t in (1, 2, 3)
+    ]
+    items = [_item("a", 0, eligible=(1, 2, 3)), _item("b", 1, eligible=(1, 2, 3))]
+    payload = _payload(items, technicians)
+    matrix = build_travel_matrix(payload, 4)
+
+    result = presolve(_instance(payload, matrix, [SHIFT, SHIFT, (0, 3600)], {}))
+    assert result.vehicle_groups == [[0, 1]] # Tech 3 has a shorter shift
+    assert result.vehicles_for(0) == [0, 1, 2]
+
+    result = presolve(_instance(payload, matrix, [SHIFT] * 3, {}), symmetry_breaking=True)
+    assert result.vehicle_groups == [[0, 1, 2]]
+    assert result.vehicles_for(0) == [0]
+    assert result.vehicles_for(1) == [0, 1]
+    assert result.feasible.all()
+
+
+def test_endpoint_shares_one_vehicle_class_across_a_crew():
+    from payload_generator import generate_payload
+    payload = generate_payload(12, 4, seed=3, crew=True, eligibility_ratio=1.0, fixed_constraint_ratio=0.0)
+    with TestClient(app) as client:
+        for symmetry_breaking in (False, True):
+            payload["solverOptions"] = {"solutionLimit": 50, "randomSeed": 0, "symmetryBreaking": symmetry_breaking}
+            data = client.post("/optimize-schedule", json=payload).json()
+            assert data["status"] == "success"
+            assert {route["technicianId"] for route in data["routes"]} <= {1, 2, 3, 4}
+            if not symmetry_breaking:
+                assert data["solverStats"]["vehicleClasses"] == 1
+
+
+def test_endpoint_serves_co_located_items_and_items_at_a_depot():
+    """Each item is its own node: two jobs at one address, plus one at the tech's start, all get served."""
+    items = [_item("flat_1", 0, duration=900), _item("flat_2", 0, duration=900), _item("at_start", 2, duration=600)]
+    payload = _payload(items)
+    with TestClient(app) as client:
+        data = client.post("/optimize-schedule", json=payload.model_dump()).json()
+    assert data["status"] == "success"
+    stops = data["routes"][0]["stops"]
+    assert sorted(stop["itemId"] for stop in stops) == ["at_start", "flat_1", "flat_2"]
+    # The two flats are visited back to back, with no travel between them
+    flats = [i for i, stop in enumerate(stops) if stop["itemId"].startswith("flat")]
+    assert flats[1] == flats[0] + 1
+    assert stops[flats[1]]["arrivalTimeISO"] == stops[flats[0]]["endTimeISO"]
+    assert data["routes"][0]["totalTravelTimeSeconds"] == 1200 # Start -> flats -> end; nothing for the depot job
+
+
+def _node_arrays(num_nodes, items):
+    """Zero service, wide-open windows; nodes listed in `items` are item nodes."""
+    is_item = np.zeros(num_nodes, dtype=bool)
+    is_item[items] = True
+    return np.zeros(num_nodes, dtype=np.int64), np.zeros(num_nodes, dtype=np.int64), np.full(num_nodes, 10**6), is_item
+
+
+def test_successor_mask_drops_sentinel_and_late_arcs():
+    travel = np.array([[0, 100, 100], [100, 0, TRAVEL_TIME_SENTINEL], [100, 100, 0]])
+    service, start, end, is_item = _node_arrays(3, [1, 2])
+    end[1] = 50 # Nothing can reach node 1 by t=50
+    mask = successor_mask(travel, service, start, end, is_item)
+    assert not mask[1, 2]              # Sentinel leg
+    assert not mask[0, 1] and not mask[2, 1] # Would miss node 1's window
+    assert mask.diagonal().all()       # Self-arcs mark unperformed items
+
+
+def test_successor_mask_keeps_k_ways_in_and_out_of_each_item():
+    rng = np.random.default_rng(0)
+    travel = rng.integers(60, 3600, size=(30, 30))
+    np.fill_diagonal(travel, 0)
+    service, start, end, is_item = _node_arrays(30, list(range(2, 30))) # Nodes 0-1 are depots
+    k = 4
+    mask = successor_mask(travel, service, start, end, is_item, k)
+    items = np.arange(2, 30)
+    between_items = mask[np.ix_(items, items)] & ~np.eye(len(items), dtype=bool)
+    assert (between_items.sum(axis=1) >= k).all()
+    assert (between_items.sum(axis=0) >= k).all()
+    assert between_items.sum() < len(items) * (len(items) - 1) # Actually thinned
+    assert mask[:2].all() and mask[:, :2].all() # Depot arcs are never thinned
+
+
+def test_solve_removes_sentinel_arcs_from_next_var_domains(monkeypatch):
+    import main
+    from ortools.constraint_solver import pywrapcp
+    captured = {}
+
+    class RecordingRoutingModel(pywrapcp.RoutingModel):
+        def __init__(self, manager):
+            super().__init__(manager)
+            captured["routing"], captured["manager"] = self, manager
+
+    monkeypatch.setattr(pywrapcp, "RoutingModel", RecordingRoutingModel)
+    matrix = {i: {j: 0 if i == j else 600 for j in range(4)} for i in range(4)}
+    matrix[0][1] = TRAVEL_TIME_SENTINEL # a -> b is unknown
+    matrix[2][3] = TRAVEL_TIME_SENTINEL # start -> end is unknown
+    payload = _payload([_item("a", 0, duration=600), _item("b", 1, duration=600)], matrix=matrix)
+    response = main.solve_schedule(payload)
+    assert [stop.itemId for stop in response.routes[0].stops] == ["b", "a"]
+
+    routing, manager = captured["routing"], captured["manager"]
+    index_of = {manager.IndexToNode(i): i for i in range(routing.Size())} # Item nodes: 2 depots first, then a, b
+    a, b = index_of[2], index_of[3]
+    assert not routing.NextVar(a).Contains(b)
+    assert routing.NextVar(b).Contains(a)
+    assert routing.NextVar(a).Contains(a) # Self-arc (unperformed) kept
+    assert routing.NextVar(routing.Start(0)).Contains(routing.End(0)) # Empty route kept despite the sentinel
+
+
+def test_endpoint_with_candidate_successors_serves_feasible_payload():
+    from payload_generator import generate_payload
+    payload = generate_payload(30, 3, seed=1, eligibility_ratio=1.0, fixed_constraint_ratio=0.0)
+    for item in payload["items"]:
+        item["durationSeconds"] = 600 # Light enough that every item fits
+    payload["solverOptions"] = {"solutionLimit": 100, "randomSeed": 0, "candidateSuccessors": 10}
+    with TestClient(app) as client:
+        data = client.post("/optimize-schedule", json=payload).json()
+    assert data["status"] == "success"
+    assert sum(len(route["stops"]) for route in data["routes"]) == 30
+
+
+def test_pin_fixed_items_spreads_clashing_appointments_over_technicians():
+    technicians = [
+        {"id": t, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": "2024-04-11T08:00:00Z", "latestEndTimeISO": "2024-04-11T17:00:00Z"}
+        for t in (1, 2)
+    ]
+    items = [_item(name, loc, duration=3600, eligible=(1, 2)) for name, loc in
+             [("nine", 0), ("nine_too", 1), ("ten", 0), ("nine_three", 1)]]
+    payload = _payload(items, technicians)
+    matrix = build_travel_matrix(payload, 4)
+    fixed = {"nine": 3600, "nine_too": 3600, "ten": 7200, "nine_three": 3600}
+    instance = _instance(payload, matrix, [SHIFT, SHIFT], fixed)
+    pinned = pin_fixed_items(instance, presolve(instance))
+    assert {pinned[0], pinned[1]} == {0, 1} # Same time: one each
+    assert 3 not in pinned                  # A third 09:00 appointment fits nobody
+    # "nine" ends at 10:00 at the same address, so its technician takes "ten" as well; the
+    # other one would need another 600s of travel.
+    assert pinned[2] == pinned[0]
+
+
+def test_endpoint_serves_fixed_items_with_waiting_and_fills_the_gap():
+    items = [_item("early", 0, duration=1800), _item("late", 1, duration=1800), _item("free", 0, duration=600)]
+    payload = _payload(items).model_dump()
+    payload["fixedConstraints"] = [
+        {"itemId": "early", "fixedTimeISO": "2024-04-11T09:00:00Z"},
+        {"itemId": "late", "fixedTimeISO": "2024-04-11T13:00:00Z"},
+    ]
+    with TestClient(app) as client:
+        data = client.post("/optimize-schedule", json=payload).json()
+    assert data["status"] == "success"
+    stops = {stop["itemId"]: stop for stop in data["routes"][0]["stops"]}
+    assert set(stops) == {"early", "late", "free"}
+    assert stops["early"]["startTimeISO"] == "2024-04-11T09:00:00Z"
+    assert stops["late"]["startTimeISO"] == "2024-04-11T13:00:00Z"
+    # The technician gets there before the appointment and waits
+    assert stops["early"]["arrivalTimeISO"] < stops["early"]["startTimeISO"]
+
+
+def test_endpoint_moves_a_greedy_pin_out_of_the_way_of_another_fixed_item():
+    """The skeleton's tightest fit for "either" is technician 1, who alone may serve "only_one"."""
+    technicians = [
+        {"id": t, "startLocationIndex": 2, "endLocationIndex": 3,
+         "earliestStartTimeISO": start, "latestEndTimeISO": "2024-04-11T17:00:00Z"}
+        for t, start in ((1, "2024-04-11T08:30:00Z"), (2, "2024-04-11T08:00:00Z"))
+    ]
+    items = [_item("either", 0, duration=3600, eligible=(1, 2)), _item("only_one", 1, duration=1800, eligible=(1,))]
+    payload = _payload(items, technicians).model_dump()
+    payload["fixedConstraints"] = [
+        {"itemId": "either", "fixedTimeISO": "2024-04-11T09:00:00Z"},
+        {"itemId": "only_one", "fixedTimeISO": "2024-04-11T09:30:00Z"},
+    ]
+    instance = compile_instance(OptimizationRequestPayload(**payload))
+    assert pin_fixed_items(instance, presolve(instance)) == {0: 0} # "only_one" clashes with the pin
+    with TestClient(app) as client:
+        data = client.post("/optimize-schedule", json=payload).json()
+    assert data["unassignedItemIds"] == []
+    served_by = {stop["itemId"]: route["technicianId"] for route in data["routes"] for stop in route["stops"]}
+    assert served_by == {"either": 2, "only_one": 1}
@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import Future
+
+from fastapi.testclient import TestClient
+
+import main
+import scenarios
+from admission import AdmissionController
+from core import SolveResult, compile_instance, iso_to_seconds
+from main import app
+from models import OptimizationRequestPayload, ScenarioDelta
+from presolve import REASON_NO_ELIGIBLE_TECHNICIAN
+from scenarios import apply_delta, penalty_scale, scenario_objective, solve_variant
+
+# Locations: 0 = depot, 1..3 = items a..c
+PAYLOAD = {
+    "locations": [{"id": i, "index": i, "coords": {"lat": 0.0, "lng": 0.0}} for i in range(4)],
+    "technicians": [
+        {"id": 1, "startLocationIndex": 0, "endLocationIndex": 0,
+         "earliestStartTimeISO": "2024-04-15T08:00:00Z", "latestEndTimeISO": "2024-04-15T12:00:00Z"},
+        {"id": 2, "startLocationIndex": 0, "endLocationIndex": 0,
+         "earliestStartTimeISO": "2024-04-15T08:00:00Z", "latestEndTimeISO": "2024-04-15T12:00:00Z"},
+    ],
+    "items": [
+        {"id": "a", "locationIndex": 1, "durationSeconds": 3600, "priority": 1, "eligibleTechnicianIds": [1, 2]},
+        {"id": "b", "locationIndex": 2, "durationSeconds": 3600, "priority": 1, "eligibleTechnicianIds": [1, 2]},
+        {"id": "c", "locationIndex": 3, "durationSeconds": 3600, "priority": 2, "eligibleTechnicianIds": [2]},
+    ],
+    "fixedConstraints": [{"itemId": "b", "fixedTimeISO": "2024-04-15T10:00:00Z"}],
+    "travelTimeMatrix": {i: {j: 0 if i == j else 600 for j in range(4)} for i in range(4)},
+    "solverOptions": {"solutionLimit": 20, "timeLimitSeconds": 1},
+}
+
+
+def test_apply_delta():
+    """Deltas remove/add rows and columns, and an earlier shift moves the epoch back."""
+    base = compile_instance(OptimizationRequestPayload(**PAYLOAD))
+    delta = ScenarioDelta(
+        id="x",
+        removeTechnicianIds=[2],
+        removeItemIds=["a"],
+        addItems=[{"id": "d", "locationIndex": 1, "durationSeconds": 60, "priority": 1, "eligibleTechnicianIds": [1, 2]}],
+        technicianWindows=[{"technicianId": 1, "earliestStartTimeISO": "2024-04-15T07:00:00Z"}],
+    )
+    variant = apply_delta(base, delta)
+    assert variant.tech_ids == [1]
+    assert variant.item_ids == ["b", "c", "d"]
+    assert variant.eligible.tolist() == [[True], [False], [True]]
+    assert variant.planning_epoch == iso_to_seconds("2024-04-15T07:00:00Z")
+    assert variant.tech_window_start.tolist() == [0]
+    assert variant.tech_window_end.tolist() == [5 * 3600]
+    assert variant.item_fixed_time.tolist() == [3 * 3600, -1, -1]
+    assert variant.travel_matrix is base.travel_matrix # Shared, not copied
+    assert base.item_ids == ["a", "b", "c"] and base.tech_ids == [1, 2]
+
+
+def test_scenario_objective_uses_the_base_penalty_scale():
+    """Removing the base's only priority-2 item must not make its other drops cheaper."""
+    base = compile_instance(OptimizationRequestPayload(**PAYLOAD))
+    variant = apply_delta(base, ScenarioDelta(id="no-c", removeItemIds=["c"]))
+    assert int(variant.item_priority.max()) == 1 and penalty_scale(base) == 2
+    result = SolveResult('partial', None, unassigned_item_ids=["a"],
+                         unassigned_reasons={"a": REASON_NO_ELIGIBLE_TECHNICIAN}, objective_value=1000)
+    assert scenario_objective(variant, result, 100, penalty_scale(base)) == 1000 + 100 * 2
+
+
+def test_optimize_scenarios_comparison(monkeypatch):
+    """The base and each variant are solved; deltas are reported against the base."""
+    monkeypatch.setattr(main, "SOLVE_ADMISSION", AdmissionController(2, 4, 30))
+    request = {**PAYLOAD, "includeRoutes": True, "scenarios": [
+        {"id": "tech-2-sick", "removeTechnicianIds": [2]},
+        {"id": "no-c", "removeItemIds": ["c"]},
+        {"id": "bad", "addItems": [{"id": "a", "locationIndex": 1, "durationSeconds": 60, "priority": 1,
+                                    "eligibleTechnicianIds": [1]}]},
+    ]}
+    with TestClient(app) as client:
+        response = client.post("/optimize-scenarios", json=request)
+    assert response.status_code == 200, response.text
+    base, sick, no_c, bad = response.json()["scenarios"]
+    assert [s["id"] for s in (base, sick, no_c, bad)] == ["base", "tech-2-sick", "no-c", "bad"]
+    assert (base["status"], base["unassignedCount"], base["techniciansUsed"]) == ("success", 0, 2)
+    # Technician 1 alone still fits a before the fixed-time b, but c needs technician 2
+    assert sick["unassignedCount"] == 1 and sick["unassignedDelta"] == 1
+    assert sick["response"]["unassignedItemIds"] == ["c"]
+    assert sick["objectiveDelta"] > 0
+    assert no_c["unassignedCount"] == 0 and no_c["objectiveDelta"] < 0
+    assert bad["status"] == "error" and "already exists" in bad["message"]
+
+
+def test_optimize_scenarios_capacity():
+    """A request with more scenarios than the admission controller could ever hold is rejected."""
+    capacity = main.SOLVE_ADMISSION.max_concurrent + main.SOLVE_ADMISSION.max_queue
+    request = {**PAYLOAD, "scenarios": [{"id": str(i)} for i in range(capacity)]}
+    with TestClient(app) as client:
+        assert client.post("/optimize-scenarios", json=request).status_code == 400
+
+
+class _FlakyPool:
+    """Runs scenarios in-process, slowly; the scenario with id "boom" fails like a crashed worker."""
+
+    def submit(self, fn, base, handle, delta, options):
+        future = Future()
+        if delta is not None and delta.id == "boom":
+            future.set_exception(RuntimeError("worker crashed"))
+        else:
+            time.sleep(0.2) # Still attaching the matrix after the sibling has failed
+            future.set_result(solve_variant(base, handle, delta, options))
+        return future
+
+
+def test_optimize_scenarios_isolates_failures(monkeypatch):
+    """One scenario's unexpected failure is its own error row; the others still solve."""
+    monkeypatch.setattr(main, "SOLVE_ADMISSION", AdmissionController(4, 4, 30))
+    monkeypatch.setattr(scenarios, "scenario_pool", lambda workers: _FlakyPool())
+    request = {**PAYLOAD, "scenarios": [{"id": "boom"}, {"id": "no-c", "removeItemIds": ["c"]}]}
+    with TestClient(app) as client:
+        response = client.post("/optimize-scenarios", json=request)
+    assert response.status_code == 200, response.text
+    base, boom, no_c = response.json()["scenarios"]
+    assert (boom["status"], boom["message"]) == ("error", "worker crashed")
+    assert base["status"] == "success" and no_c["status"] == "success"
@@ -0,0 +1,29 @@
+import os
+import runpy
+
+import main
+from admission import controller_from_env
+
+
+def test_warm_up_solver_runs_a_tiny_solve():
+    assert main.warm_up_solver() < 30
+    assert main.SOLVER_WARM_UP_SECONDS is not None
+
+
+def test_gunicorn_config_reads_env(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    monkeypatch.setenv("PORT", "9000")
+    monkeypatch.setenv("GUNICORN_TIMEOUT", "300")
+    config = runpy.run_path(os.path.join(os.path.dirname(__file__), "..", "gunicorn.conf.py"))
+    assert config["workers"] == 3
+    assert config["bind"] == "0.0.0.0:9000"
+    assert config["timeout"] == 300
+    assert config["preload_app"] is True
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
+
+
+def test_workers_split_the_cores(monkeypatch):
+    monkeypatch.setattr("admission.available_cores", lambda: 8)
+    assert controller_from_env({"WEB_CONCURRENCY": "4"}).max_concurrent == 2
+    assert controller_from_env({"WEB_CONCURRENCY": "16"}).max_concurrent == 1
+    assert controller_from_env({}).max_concurrent == 8
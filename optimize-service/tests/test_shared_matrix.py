@@ -0,0 +1,74 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from payload_generator import generate_profile_payload
+from payload_io import dense_travel_matrix
+from shared_matrix import SharedMatrixStore, call_with_matrix
+
+
+def _row_sum(args):
+    handle, row = args
+    return call_with_matrix(handle, lambda matrix: int(matrix[row].sum()))
+
+
+def _is_mapped(name):
+    with open("/proc/self/maps") as maps:
+        return name in maps.read()
+
+
+def test_workers_read_the_published_matrix():
+    """Workers see the parent's matrix through a handle far smaller than the matrix itself."""
+    matrix = np.arange(300 * 300, dtype=np.int32).reshape(300, 300)
+    with SharedMatrixStore() as store:
+        handle = store.publish(matrix)
+        assert len(pickle.dumps(handle)) < 200 < matrix.nbytes
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            sums = list(pool.map(_row_sum, [(handle, row) for row in (0, 150, 299)]))
+        assert sums == [int(matrix[row].sum()) for row in (0, 150, 299)]
+        assert not call_with_matrix(handle, lambda view: view.flags.writeable)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/maps"), reason="needs /proc")
+def test_workers_unmap_segments_after_each_task():
+    """Once the store closes, no worker still maps the segment, so its memory is actually freed."""
+    matrix = np.ones((200, 200), dtype=np.int64)
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        pool.submit(int).result() # Fork the worker first, so it doesn't inherit the parent's mapping
+        with SharedMatrixStore() as store:
+            handle = store.publish(matrix)
+            assert pool.submit(_row_sum, (handle, 0)).result() == 200
+            assert not pool.submit(_is_mapped, handle.name).result() # Unmapped as soon as the task ended
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=handle.name)
+        assert not pool.submit(_is_mapped, handle.name).result()
+
+
+def test_segments_are_freed_with_the_last_reference():
+    store = SharedMatrixStore()
+    handle = store.publish(np.zeros((4, 4), dtype=np.int32), refs=2)
+    store.acquire(handle)
+    store.release(handle)
+    store.release(handle)
+    assert store.live_segments() == 1
+    store.release(handle)
+    assert store.live_segments() == 0
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=handle.name)
+
+    leftover = store.publish(np.ones(3))
+    store.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=leftover.name)
+
+
+def test_dense_travel_matrix_matches_payload():
+    payload = generate_profile_payload("tiny", seed=1)
+    matrix = dense_travel_matrix(payload)
+    for from_idx, row in payload["travelTimeMatrix"].items():
+        for to_idx, seconds in row.items():
+            assert matrix[int(from_idx), int(to_idx)] == seconds
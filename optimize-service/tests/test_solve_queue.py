@@ -0,0 +1,104 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+from payload_generator import generate_profile_payload
+from solve_queue import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, Broker, SQLiteBroker, broker_from_env
+from solve_worker import run_worker
+
+
+def test_sqlite_broker_lifecycle(tmp_path):
+    """Jobs are claimed oldest first, once each; only the holding worker can finish them."""
+    broker = SQLiteBroker(str(tmp_path / "queue.db"))
+    first, second = broker.enqueue(b"{1}"), broker.enqueue(b"{2}")
+    job = broker.claim("w1")
+    assert (job.id, job.payload, job.attempts, job.status) == (first, b"{1}", 1, JOB_RUNNING)
+    assert broker.claim("w2").id == second
+    assert broker.claim("w3") is None
+    assert broker.heartbeat(first, "w1") and not broker.heartbeat(first, "w2")
+    assert not broker.complete(first, "w2", b"{}")
+    assert broker.complete(first, "w1", b'{"ok": 1}')
+    assert broker.fail(second, "w2", "Invalid", 400)
+    done, failed = broker.get(first), broker.get(second)
+    assert (done.status, done.result, done.payload) == (JOB_DONE, b'{"ok": 1}', None)
+    assert (failed.status, failed.error, failed.status_code) == (JOB_FAILED, "Invalid", 400)
+    assert broker.get("unknown") is None
+    assert broker.counts() == {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 1, JOB_FAILED: 1}
+
+
+def test_sqlite_broker_requeues_jobs_of_dead_workers(tmp_path):
+    """An expired lease puts the job back for another process; after max_attempts it fails."""
+    path = str(tmp_path / "queue.db")
+    api, node_a, node_b = (SQLiteBroker(path, lease_seconds=0.05, max_attempts=2) for _ in range(3))
+    job_id = api.enqueue(b"{}")
+    assert node_a.claim("a").id == job_id
+    time.sleep(0.1) # Worker a dies without heartbeating
+    job = node_b.claim("b")
+    assert (job.id, job.attempts, job.payload) == (job_id, 2, b"{}")
+    assert not node_a.heartbeat(job_id, "a") and not node_a.complete(job_id, "a", b"{}")
+    time.sleep(0.1) # And so does worker b
+    assert api.requeue_expired() == 1
+    abandoned = api.get(job_id)
+    assert (abandoned.status, abandoned.status_code) == (JOB_FAILED, 500)
+    assert "abandoned by 2 workers" in abandoned.error
+    assert node_a.claim("a") is None
+
+
+def test_broker_from_env(tmp_path):
+    assert broker_from_env({}) is None
+    broker = broker_from_env({"SOLVE_QUEUE_URL": f"sqlite:///{tmp_path}/q.db", "SOLVE_QUEUE_LEASE_SECONDS": "5"})
+    assert isinstance(broker, SQLiteBroker) and broker.lease_seconds == 5
+    with pytest.raises(ValueError, match="Unknown solve queue URL"):
+        broker_from_env({"SOLVE_QUEUE_URL": "redis://localhost"})
+
+
+def test_broker_implementations_must_cover_every_operation():
+    class NoHeartbeat(Broker):
+        enqueue = claim = complete = fail = get = requeue_expired = counts = lambda self, *args: None
+    with pytest.raises(TypeError, match="heartbeat"):
+        NoHeartbeat()
+    with pytest.raises(TypeError):
+        Broker()
+
+
+def test_jobs_endpoints_with_worker(tmp_path, monkeypatch):
+    """POST /jobs queues the body; a worker solves it; GET /jobs/{id} returns the same response /optimize-schedule would."""
+    broker = SQLiteBroker(str(tmp_path / "queue.db"))
+    monkeypatch.setattr(main, "SOLVE_QUEUE", broker)
+    payload = generate_profile_payload("tiny", seed=1)
+    payload["solverOptions"] = {"solutionLimit": 20}
+    with TestClient(app) as client:
+        accepted = client.post("/jobs", json=payload)
+        assert accepted.status_code == 202, accepted.text
+        job_id = accepted.json()["jobId"]
+        assert client.get(f"/jobs/{job_id}").json()["status"] == "queued"
+        assert client.get("/load").json()["solveQueue"][JOB_QUEUED] == 1
+        assert client.post("/jobs", json={"items": 1}).status_code == 422 # Validated before queueing
+
+        assert run_worker(broker, worker_id="w1", max_jobs=1) == 1
+        status = client.get(f"/jobs/{job_id}").json()
+        direct = client.post("/optimize-schedule", json=payload).json()
+        assert client.get("/jobs/unknown").status_code == 404
+    assert (status["status"], status["attempts"]) == ("done", 1)
+    assert status["solveSeconds"] >= 0 and status["waitSeconds"] >= 0
+    assert status["result"]["routes"] == direct["routes"]
+
+
+def test_worker_records_failures(tmp_path):
+    """A payload that can't be solved fails the job with the status code the endpoint would have answered."""
+    broker = SQLiteBroker(str(tmp_path / "queue.db"))
+    invalid = broker.enqueue(json.dumps({"items": 1}).encode())
+    assert run_worker(broker, worker_id="w1", max_jobs=1) == 1
+    job = broker.get(invalid)
+    assert (job.status, job.status_code) == (JOB_FAILED, 422)
+
+
+def test_jobs_without_queue(monkeypatch):
+    monkeypatch.setattr(main, "SOLVE_QUEUE", None)
+    with TestClient(app) as client:
+        assert client.post("/jobs", json={}).status_code == 503
+        assert "solveQueue" not in client.get("/load").json()
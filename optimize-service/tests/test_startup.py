@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+import main
+from startup_benchmark import DEFAULT_BUDGET_SECONDS, import_profile, time_to_first_solve
+
+
+def test_time_to_first_solve_within_budget():
+    """Fresh interpreter: `import main` leaves the solver and feature modules unloaded and the first solve is in budget."""
+    measurement = time_to_first_solve()
+    assert not any(measurement["loadedAtImport"].values()), measurement["loadedAtImport"]
+    assert measurement["timeToFirstSolveSeconds"] < DEFAULT_BUDGET_SECONDS
+
+
+def test_import_profile_lists_mains_direct_imports():
+    modules = [row["module"] for row in import_profile(top=50)]
+    assert "main (total)" in modules and "fastapi" in modules
+    assert "pytz" not in modules
+
+
+def test_ready_reports_cold_then_warm(monkeypatch):
+    client = TestClient(main.app)
+    monkeypatch.setattr(main, "SOLVER_WARM_UP_SECONDS", None)
+    response = client.get("/ready")
+    assert response.status_code == 503 and response.json()["status"] == "cold"
+    main.warm_up_solver()
+    response = client.get("/ready")
+    assert response.status_code == 200 and response.json()["status"] == "warm"
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+import main
+from models import OptimizationRequestPayload, OptimizationSolverOptions
+from payload_generator import generate_profile_payload
+from solver_profile import (
+    DEFAULT_SOLVER_OPTIONS,
+    SolverProfile,
+    load_solver_profile,
+    resolve_solver_options,
+    save_solver_profile,
+)
+from tuner import build_grid, bucket_for, bucket_bounds, select_best, tune, weighted_unassigned
+
+
+def test_resolve_solver_options_layers():
+    """Request fields win over the profile bucket, which wins over the built-in defaults."""
+    profile = SolverProfile([
+        {"maxItems": 10, "options": {"localSearchMetaheuristic": "TABU_SEARCH", "timeLimitSeconds": 0.5}},
+        {"maxItems": None, "options": {"timeLimitSeconds": 3.0}},
+    ])
+    small = resolve_solver_options(OptimizationSolverOptions(timeLimitSeconds=2.0), 5, profile)
+    assert small.localSearchMetaheuristic == "TABU_SEARCH"
+    assert small.timeLimitSeconds == 2.0
+    assert small.firstSolutionStrategy == DEFAULT_SOLVER_OPTIONS.firstSolutionStrategy
+    assert small.basePenalty == DEFAULT_SOLVER_OPTIONS.basePenalty
+
+    large = resolve_solver_options(None, 500, profile)
+    assert large.timeLimitSeconds == 3.0
+    assert large.localSearchMetaheuristic == DEFAULT_SOLVER_OPTIONS.localSearchMetaheuristic
+
+    assert resolve_solver_options(None, 5, None) == DEFAULT_SOLVER_OPTIONS
+
+
+def test_profile_round_trip(tmp_path):
+    """A saved profile loads back with the same buckets and metadata."""
+    path = tmp_path / "profile.json"
+    profile = SolverProfile([{"maxItems": None, "options": {"basePenalty": 5000}},
+                             {"maxItems": 10, "options": {"timeLimitSeconds": 0.5}}],
+                            {"generatedAt": "2024-04-15T00:00:00Z"})
+    save_solver_profile(profile, str(path))
+    loaded = load_solver_profile(str(path))
+    assert loaded.options_for(3).timeLimitSeconds == 0.5
+    assert loaded.options_for(300).basePenalty == 5000
+    assert json.loads(path.read_text())["generatedAt"] == "2024-04-15T00:00:00Z"
+    assert load_solver_profile(None) is None
+
+
+def test_bucket_helpers_and_weighting():
+    bounds = bucket_bounds([40, 10])
+    assert bounds == [10, 40, None]
+    assert bucket_for(10, bounds) == 10
+    assert bucket_for(11, bounds) == 40
+    assert bucket_for(400, bounds) is None
+    payload = {"items": [{"id": "a", "priority": 1}, {"id": "b", "priority": 3}]}
+    assert weighted_unassigned(payload, ["a", "b"]) == 3 + 1
+    assert len(build_grid(["A", "B"], ["X"], [0.5, 1.0], [1])) == 4
+
+
+def test_select_best_prefers_quality_then_speed():
+    """Fewer weighted unassigned beats travel; within travel tolerance the fastest wins."""
+    results = [
+        {"config": 0, "payload": "p", "weightedUnassigned": 1, "unassigned": 1, "travelSeconds": 100, "wallSeconds": 0.1},
+        {"config": 1, "payload": "p", "weightedUnassigned": 0, "unassigned": 0, "travelSeconds": 1000, "wallSeconds": 2.0},
+        {"config": 2, "payload": "p", "weightedUnassigned": 0, "unassigned": 0, "travelSeconds": 1005, "wallSeconds": 0.5},
+        {"config": 3, "payload": "p", "error": "boom"},
+    ]
+    winner, stats = select_best(results, travel_tolerance=0.01)
+    assert winner == 2
+    assert stats["meanWallSeconds"] == 0.5
+    winner, _ = select_best(results, travel_tolerance=0.0)
+    assert winner == 1
+
+
+def test_tune_writes_bucketed_profile():
+    """An end-to-end tuning run over a tiny generated corpus yields a usable profile."""
+    corpus = [("tiny_0", generate_profile_payload("tiny", seed=0))]
+    grid = build_grid(["PATH_CHEAPEST_ARC"], ["GUIDED_LOCAL_SEARCH", "GREEDY_DESCENT"], [0.1], [100000])
+    profile = tune(corpus, grid, buckets=[10], jobs=1)
+    assert len(profile.buckets) == 1
+    assert profile.buckets[0][0] == 10
+    assert profile.options_for(3).timeLimitSeconds == 0.1
+    assert profile.metadata["corpus"] == {"payloads": 1, "configurations": 2}
+
+
+def test_service_applies_profile_when_request_has_no_options(monkeypatch):
+    """solve_schedule consults main.SOLVER_PROFILE; explicit request options still win."""
+    import core
+    captured = {}
+    real_build = core.build_search_parameters
+
+    def spy(options):
+        captured["options"] = options
+        return real_build(options)
+
+    monkeypatch.setattr(core, "build_search_parameters", spy)
+    monkeypatch.setattr(main, "SOLVER_PROFILE", SolverProfile(
+        [{"maxItems": None, "options": {"timeLimitSeconds": 0.2, "localSearchMetaheuristic": "GREEDY_DESCENT"}}]))
+    payload = generate_profile_payload("tiny", seed=3)
+
+    main.solve_schedule(OptimizationRequestPayload(**payload))
+    assert captured["options"].timeLimitSeconds == 0.2
+    assert captured["options"].localSearchMetaheuristic == "GREEDY_DESCENT"
+
+    payload["solverOptions"] = {"timeLimitSeconds": 0.3}
+    main.solve_schedule(OptimizationRequestPayload(**payload))
+    assert captured["options"].timeLimitSeconds == 0.3
+    assert captured["options"].localSearchMetaheuristic == "GREEDY_DESCENT"
+
+
+def test_invalid_solver_option_rejected():
+    """Unknown strategy names are rejected with a 400 before solving."""
+    from fastapi import HTTPException
+    payload = generate_profile_payload("tiny", seed=3)
+    payload["solverOptions"] = {"firstSolutionStrategy": "NOT_A_STRATEGY"}
+    with pytest.raises(HTTPException) as exc:
+        main.solve_schedule(OptimizationRequestPayload(**payload))
+    assert exc.value.status_code == 400
@@ -0,0 +1,232 @@
+"""
+Offline solver-parameter auto-tuner.
+
+Runs a grid of solver configurations (first-solution strategy, metaheuristic, time
+limit, base penalty) in parallel over a corpus of recorded or generated payloads,
+picks the best configuration for each problem-size bucket and writes a solver profile
+the service loads at startup via `SOLVER_PROFILE_PATH`.
+
+"Best" means: fewest priority-weighted unassigned items, then total travel time within
+`--travel-tolerance` of the best seen, then the lowest mean wall time. The last step is
+what keeps the tuner from always picking the longest time limit.
+
+Examples:
+    python tuner.py --generate small=4,medium=4,large=2 --output solver_profile.json
+    python tuner.py --corpus captures/ --buckets 10,40 --time-limits 0.5,1,2 --jobs 8
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from payload_generator import generate_profile_payload, parse_mix
+from payload_io import dense_travel_matrix, iter_payloads
+from shared_matrix import MatrixHandle, SharedMatrixStore
+from solver_profile import SolverProfile, save_solver_profile
+
+DEFAULT_STRATEGIES = ["PATH_CHEAPEST_ARC", "PARALLEL_CHEAPEST_INSERTION", "SAVINGS"]
+DEFAULT_METAHEURISTICS = ["GUIDED_LOCAL_SEARCH", "SIMULATED_ANNEALING", "TABU_SEARCH"]
+DEFAULT_TIME_LIMITS = [0.5, 1.0, 2.0]
+DEFAULT_PENALTIES = [10000, 100000, 1000000]
+DEFAULT_BUCKETS = [10, 40] # Upper item-count bounds; a final open-ended bucket is always added
+
+
+def build_grid(
+    strategies: Sequence[str],
+    metaheuristics: Sequence[str],
+    time_limits: Sequence[float],
+    penalties: Sequence[int],
+) -> List[Dict[str, Any]]:
+    """Cartesian product of the option values, as OptimizationSolverOptions dicts."""
+    return [
+        {
+            "firstSolutionStrategy": strategy,
+            "localSearchMetaheuristic": metaheuristic,
+            "timeLimitSeconds": time_limit,
+            "basePenalty": penalty,
+        }
+        for strategy, metaheuristic, time_limit, penalty
+        in itertools.product(strategies, metaheuristics, time_limits, penalties)
+    ]
+
+
+def bucket_bounds(buckets: Sequence[int]) -> List[Optional[int]]:
+    return sorted(set(buckets)) + [None]
+
+
+def bucket_for(num_items: int, bounds: Sequence[Optional[int]]) -> Optional[int]:
+    for bound in bounds:
+        if bound is None or num_items <= bound:
+            return bound
+    return None
+
+
+def weighted_unassigned(payload: Dict[str, Any], unassigned_ids: Sequence[str]) -> int:
+    """Unassigned items weighted the same way the service weights drop penalties."""
+    priorities = {item["id"]: item.get("priority") for item in payload["items"]}
+    max_priority = max((p for p in priorities.values() if p is not None), default=1)
+    return sum(max_priority - (priorities.get(i) or max_priority) + 1 for i in unassigned_ids)
+
+
+def _quiet_worker() -> None:
+    # The service logs every model-building step; keep tuner output readable unless asked.
+    if not os.environ.get("TUNER_VERBOSE"):
+        sys.stdout = open(os.devnull, "w")
+
+
+def evaluate_config(task: Tuple[int, Dict[str, Any], str, Dict[str, Any], MatrixHandle]) -> Dict[str, Any]:
+    """
+    Solves one payload with one configuration. Runs inside a worker process; the payload
+    arrives without its travel matrix, which is read from shared memory (shared_matrix.py).
+    """
+    config_index, options, payload_name, payload, matrix_handle = task
+    import main as service # Imported lazily so the parent process doesn't need OR-Tools loaded
+    from models import OptimizationRequestPayload
+    from shared_matrix import call_with_matrix
+
+    request = OptimizationRequestPayload(**{**payload, "solverOptions": options})
+    started = time.perf_counter()
+    try:
+        response = call_with_matrix(matrix_handle, lambda matrix: service.solve_schedule(request, matrix))
+    except Exception as e:
+        return {"config": config_index, "payload": payload_name, "error": repr(e)}
+    elapsed = time.perf_counter() - started
+    unassigned = response.unassignedItemIds or []
+    return {
+        "config": config_index,
+        "payload": payload_name,
+        "items": len(payload["items"]),
+        "unassigned": len(unassigned),
+        "weightedUnassigned": weighted_unassigned(payload, unassigned),
+        "travelSeconds": sum(r.totalTravelTimeSeconds or 0 for r in response.routes),
+        "wallSeconds": elapsed,
+    }
+
+
+def select_best(results: List[Dict[str, Any]], travel_tolerance: float) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """
+    Picks the winning config index for one bucket from per-(config, payload) results.
+    Configs that errored on any payload are not eligible.
+    """
+    totals: Dict[int, Dict[str, float]] = {}
+    failed = {r["config"] for r in results if "error" in r}
+    for r in results:
+        if r["config"] in failed:
+            continue
+        t = totals.setdefault(r["config"], {"weightedUnassigned": 0, "unassigned": 0, "travelSeconds": 0,
+                                            "wallSeconds": 0.0, "payloads": 0})
+        t["weightedUnassigned"] += r["weightedUnassigned"]
+        t["unassigned"] += r["unassigned"]
+        t["travelSeconds"] += r["travelSeconds"]
+        t["wallSeconds"] += r["wallSeconds"]
+        t["payloads"] += 1
+    if not totals:
+        return None
+
+    best_unassigned = min(t["weightedUnassigned"] for t in totals.values())
+    contenders = {c: t for c, t in totals.items() if t["weightedUnassigned"] == best_unassigned}
+    best_travel = min(t["travelSeconds"] for t in contenders.values())
+    good_enough = {c: t for c, t in contenders.items() if t["travelSeconds"] <= best_travel * (1 + travel_tolerance)}
+    winner = min(good_enough, key=lambda c: (good_enough[c]["wallSeconds"], good_enough[c]["travelSeconds"], c))
+    stats = dict(good_enough[winner])
+    stats["meanWallSeconds"] = stats.pop("wallSeconds") / stats["payloads"]
+    return winner, stats
+
+
+def tune(
+    corpus: List[Tuple[str, Dict[str, Any]]],
+    grid: List[Dict[str, Any]],
+    buckets: Sequence[int] = DEFAULT_BUCKETS,
+    jobs: Optional[int] = None,
+    travel_tolerance: float = 0.01,
+) -> SolverProfile:
+    """Evaluates every config on every payload and returns the per-bucket winners as a profile."""
+    bounds = bucket_bounds(buckets)
+    print(f"Tuning {len(grid)} configurations over {len(corpus)} payloads ({len(grid) * len(corpus)} solves)...")
+
+    results = []
+    with SharedMatrixStore() as store, ProcessPoolExecutor(max_workers=jobs, initializer=_quiet_worker) as pool:
+        # Each matrix is decoded once and shared by every config's task; freed after the last one
+        futures = {}
+        for name, payload in corpus:
+            handle = store.publish(dense_travel_matrix(payload), refs=len(grid))
+            stripped = {**payload, "travelTimeMatrix": {}}
+            for ci, options in enumerate(grid):
+                futures[pool.submit(evaluate_config, (ci, options, name, stripped, handle))] = handle
+        for future in as_completed(futures):
+            results.append(future.result())
+            store.release(futures[future])
+
+    sizes = {name: len(payload["items"]) for name, payload in corpus}
+    profile_buckets = []
+    bucket_stats = []
+    for bound in bounds:
+        in_bucket = [r for r in results if bucket_for(sizes[r["payload"]], bounds) == bound]
+        if not in_bucket:
+            continue
+        best = select_best(in_bucket, travel_tolerance)
+        if best is None:
+            print(f"Bucket maxItems={bound}: every configuration failed; leaving it to the defaults.")
+            continue
+        winner, stats = best
+        profile_buckets.append({"maxItems": bound, "options": grid[winner]})
+        bucket_stats.append({"maxItems": bound, **stats})
+        print(f"Bucket maxItems={bound}: {grid[winner]} "
+              f"(unassigned={stats['unassigned']}, travel={stats['travelSeconds']}s, "
+              f"mean wall={stats['meanWallSeconds']:.2f}s over {stats['payloads']} payloads)")
+
+    metadata = {
+        "generatedAt": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+        "corpus": {"payloads": len(corpus), "configurations": len(grid)},
+        "bucketStats": bucket_stats,
+    }
+    return SolverProfile(profile_buckets, metadata)
+
+
+def _csv(value: str, cast=str) -> List[Any]:
+    return [cast(v.strip()) for v in value.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tune solver options per problem-size bucket.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--corpus", help="Payload file or directory of .json/.json.gz payloads")
+    source.add_argument("--generate", help="Generate a corpus from profiles, e.g. small=4,medium=4,large=2")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for generated payloads")
+    parser.add_argument("--strategies", type=_csv, default=DEFAULT_STRATEGIES)
+    parser.add_argument("--metaheuristics", type=_csv, default=DEFAULT_METAHEURISTICS)
+    parser.add_argument("--time-limits", type=lambda v: _csv(v, float), default=DEFAULT_TIME_LIMITS)
+    parser.add_argument("--penalties", type=lambda v: _csv(v, int), default=DEFAULT_PENALTIES)
+    parser.add_argument("--buckets", type=lambda v: _csv(v, int), default=DEFAULT_BUCKETS,
+                        help="Upper item-count bound of each bucket; larger problems share a final bucket")
+    parser.add_argument("--travel-tolerance", type=float, default=0.01,
+                        help="Relative travel-time slack within which the fastest config wins")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="Parallel solver processes")
+    parser.add_argument("--output", default="solver_profile.json")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        corpus = [(os.path.relpath(path, args.corpus) if os.path.isdir(args.corpus) else path, payload)
+                  for path, payload in iter_payloads(args.corpus)]
+    else:
+        corpus = [
+            (f"{profile}_{i}", generate_profile_payload(profile, seed=args.seed * 1000 + i))
+            for profile, count in parse_mix(args.generate).items() for i in range(count)
+        ]
+    if not corpus:
+        print("No payloads found in the corpus.")
+        return 1
+
+    grid = build_grid(args.strategies, args.metaheuristics, args.time_limits, args.penalties)
+    profile = tune(corpus, grid, args.buckets, args.jobs, args.travel_tolerance)
+    save_solver_profile(profile, args.output)
+    print(f"Wrote solver profile with {len(profile.buckets)} bucket(s) to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
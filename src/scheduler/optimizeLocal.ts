@@ -0,0 +1,128 @@
+import * as net from 'net';
+import {
+    OptimizationRequestPayload,
+    OptimizationResponsePayload
+} from '../types/optimization.types';
+
+// Frame layout shared with optimize-service/local_rpc.py:
+// "OSR1" | header length (uint32 BE) | matrix length in bytes (uint32 BE) | header JSON | int32 LE matrix
+const MAGIC = Buffer.from('OSR1', 'ascii');
+const PREFIX_BYTES = 12;
+
+interface PendingSolve {
+    resolve: (response: OptimizationResponsePayload) => void;
+    reject: (error: Error) => void;
+}
+
+/**
+ * Error answered by the service; statusCode is the HTTP status /optimize-schedule would have answered.
+ */
+export class LocalOptimizationError extends Error {
+    constructor(message: string, public statusCode: number, public detail: unknown) {
+        super(message);
+    }
+}
+
+/**
+ * Client for the optimization service's local binary RPC socket (SOLVE_SOCKET_PATH), for when
+ * the orchestrator runs on the same host. Keeps one connection open across solves; requests
+ * on it are answered in order, so concurrent solve() calls are pipelined.
+ */
+export class LocalOptimizationClient {
+    private socket: net.Socket | null = null;
+    private buffer: Buffer = Buffer.alloc(0);
+    private pending: PendingSolve[] = [];
+
+    constructor(private socketPath: string) {}
+
+    /**
+     * Solves a payload. Its travelTimeMatrix is sent as a dense int32 matrix
+     * (locations x locations, -1 for unknown legs) instead of nested JSON.
+     *
+     * @param {OptimizationRequestPayload} payload - The prepared payload for the solver.
+     * @returns {Promise<OptimizationResponsePayload>} The same response /optimize-schedule returns.
+     * @throws {LocalOptimizationError} If the service rejects the request.
+     */
+    solve(payload: OptimizationRequestPayload): Promise<OptimizationResponsePayload> {
+        const header = Buffer.from(JSON.stringify({ ...payload, travelTimeMatrix: {} }), 'utf8');
+        const matrix = denseTravelMatrix(payload);
+        const prefix = Buffer.alloc(PREFIX_BYTES);
+        MAGIC.copy(prefix, 0);
+        prefix.writeUInt32BE(header.length, 4);
+        prefix.writeUInt32BE(matrix.length, 8);
+
+        return new Promise((resolve, reject) => {
+            const socket = this.connect();
+            this.pending.push({ resolve, reject });
+            socket.write(Buffer.concat([prefix, header, matrix]));
+        });
+    }
+
+    close(): void {
+        this.socket?.end();
+        this.socket = null;
+    }
+
+    private connect(): net.Socket {
+        if (this.socket) {
+            return this.socket;
+        }
+        const socket = net.createConnection(this.socketPath);
+        socket.on('data', (chunk: Buffer) => this.onData(chunk));
+        socket.on('error', (error: Error) => this.failAll(error));
+        socket.on('close', () => this.failAll(new Error('Local optimization socket closed.')));
+        this.socket = socket;
+        this.buffer = Buffer.alloc(0);
+        return socket;
+    }
+
+    private onData(chunk: Buffer): void {
+        this.buffer = Buffer.concat([this.buffer, chunk]);
+        while (this.buffer.length >= PREFIX_BYTES) {
+            const headerLength = this.buffer.readUInt32BE(4);
+            const frameLength = PREFIX_BYTES + headerLength + this.buffer.readUInt32BE(8);
+            if (this.buffer.length < frameLength) {
+                return;
+            }
+            const header = JSON.parse(this.buffer.toString('utf8', PREFIX_BYTES, PREFIX_BYTES + headerLength));
+            this.buffer = this.buffer.subarray(frameLength);
+            const request = this.pending.shift();
+            if (!request) {
+                continue;
+            }
+            if ('error' in header) {
+                const detail = typeof header.error === 'string' ? header.error : JSON.stringify(header.error);
+                request.reject(new LocalOptimizationError(`Optimization service failed: ${header.statusCode} - ${detail}`, header.statusCode, header.error));
+            } else {
+                request.resolve(header as OptimizationResponsePayload);
+            }
+        }
+    }
+
+    private failAll(error: Error): void {
+        this.socket = null; // The next solve() reconnects
+        const pending = this.pending;
+        this.pending = [];
+        pending.forEach(request => request.reject(error));
+    }
+}
+
+/**
+ * The payload's travelTimeMatrix as little-endian int32 bytes, locations x locations, row by row.
+ */
+export function denseTravelMatrix(payload: OptimizationRequestPayload): Buffer {
+    const n = payload.locations.length;
+    const matrix = new Int32Array(n * n).fill(-1);
+    for (const [from, row] of Object.entries(payload.travelTimeMatrix)) {
+        for (const [to, seconds] of Object.entries(row)) {
+            const i = Number(from);
+            const j = Number(to);
+            if (i >= 0 && i < n && j >= 0 && j < n) {
+                matrix[i * n + j] = seconds;
+            }
+        }
+    }
+    const bytes = Buffer.alloc(n * n * 4);
+    matrix.forEach((seconds, k) => bytes.writeInt32LE(seconds, k * 4));
+    return bytes;
+}
@@ -84,7 +84,9 @@ export async function prepareOptimizationPayload(
     });
     console.log(`Processed ${itemCoordsSet.size} unique item locations.`);
 
-    // --- Stage 3: Technician Start Locations (Check for clashes) ---
+    // --- Stage 3: Technician Start Locations ---
+    // A start that coincides with an item (or another start) reuses that location's index;
+    // the optimizer gives every item its own routing node, so shared locations are fine.
     console.log("Processing technician start locations...");
     // Create a map for easy lookup if technicianAvailability is provided
     const availabilityMap = new Map<number, TechnicianAvailability>();
@@ -95,20 +97,7 @@ export async function prepareOptimizationPayload(
     technicians.forEach(tech => {
         const techAvail = availabilityMap.get(tech.id);
         // Use home location from availability if provided, otherwise use current location/depot
-        let startCoords = techAvail?.startLocation || tech.current_location || DEFAULT_DEPOT_LOCATION;
-        const originalKey = `${startCoords.lat},${startCoords.lng}`;
-
-        // Check if the exact coordinates are already used by an item
-        if (itemCoordsSet.has(originalKey)) {
-            // Perturb coordinates slightly to create a distinct location
-            const perturbation = 0.00001; // Small offset
-            const perturbedCoords = { lat: startCoords.lat + perturbation, lng: startCoords.lng };
-            console.warn(`Technician ${tech.id} start location clashes with an item location at (${startCoords.lat}, ${startCoords.lng}). Perturbing to (${perturbedCoords.lat}, ${perturbedCoords.lng}).`);
-            startCoords = perturbedCoords; // Use perturbed coords for this tech's start
-            // Note: We don't add the perturbed key back to itemCoordsSet
-        }
-        
-        // Add the (potentially perturbed) start location
+        const startCoords = techAvail?.startLocation || tech.current_location || DEFAULT_DEPOT_LOCATION;
         addOrGetLocation(`tech_start_${tech.id}`, startCoords);
     });
 
@@ -145,15 +134,10 @@ export async function prepareOptimizationPayload(
     const optimizationTechnicians: OptimizationTechnician[] = technicians.map(tech => {
         const techAvail = availabilityMap.get(tech.id); // Get availability details if present
 
-        // Determine start coordinates (potentially perturbed)
-        let startCoords = techAvail?.startLocation || tech.current_location || DEFAULT_DEPOT_LOCATION;
-        const originalKey = `${startCoords.lat},${startCoords.lng}`;
-        if (itemCoordsSet.has(originalKey)) {
-             const perturbation = 0.00001;
-             startCoords = { lat: startCoords.lat + perturbation, lng: startCoords.lng };
-        }
-        
-        // Find the location object added in Stage 3 using the potentially perturbed coords
+        // Determine start coordinates
+        const startCoords = techAvail?.startLocation || tech.current_location || DEFAULT_DEPOT_LOCATION;
+
+        // Find the location object added in Stage 3 (possibly shared with an item or depot)
         const startLocation = addOrGetLocation(`tech_start_${tech.id}`, startCoords); // This will retrieve the existing entry
         
         // Define start and end times: Use availability details if provided, otherwise calculate for today
@@ -21,6 +21,8 @@ export interface OptimizationTechnician {
   endLocationIndex: number; // Index of their ending location (e.g., depot or home base)
   earliestStartTimeISO: string; // ISO 8601 string for earliest availability
   latestEndTimeISO: string; // ISO 8601 string for end of work day
+  earliestStartTimeUnix?: number; // Same times as Unix seconds; the service prefers them when set
+  latestEndTimeUnix?: number;
 }
 
 /**
@@ -40,6 +42,7 @@ export interface OptimizationItem {
 export interface OptimizationFixedConstraint {
     itemId: string; // ID of the OptimizationItem this applies to
     fixedTimeISO: string; // ISO 8601 string for the mandatory start time
+    fixedTimeUnix?: number; // Same time as Unix seconds; the service prefers it when set
 }
 
 /**
@@ -61,6 +64,7 @@ export interface OptimizationRequestPayload {
   items: OptimizationItem[];
   fixedConstraints: OptimizationFixedConstraint[];
   travelTimeMatrix: TravelTimeMatrix;
+  alternatives?: number; // Also return up to this many distinct near-optimal schedules (0-20)
 }
 
 // ----- Types defining the response FROM the Python optimization microservice -----
@@ -73,6 +77,11 @@ export interface RouteStop {
     arrivalTimeISO: string; // Calculated arrival time
     startTimeISO: string; // Calculated service start time (after arrival + wait time if any)
     endTimeISO: string; // Calculated service end time
+    arrivalTimeUnix?: number; // Same times as Unix seconds
+    startTimeUnix?: number;
+    endTimeUnix?: number;
+    travelTimeSeconds?: number; // Travel on the leg into this stop
+    idleTimeSeconds?: number; // Waiting between arrival and service start
 }
 
 /**
@@ -83,6 +92,19 @@ export interface TechnicianRoute {
     stops: RouteStop[];
     totalTravelTimeSeconds?: number; // Optional: Total travel time for the route
     totalDurationSeconds?: number; // Optional: Total duration including service and travel
+    totalIdleTimeSeconds?: number; // Optional: Total waiting before stops
+}
+
+/**
+ * Another schedule the search found: a different assignment of items to technicians.
+ */
+export interface AlternativeSchedule {
+    rank: number; // 1 = the best alternative; the main routes are at least as good
+    objectiveValue: number;
+    routes: TechnicianRoute[];
+    unassignedItemIds: string[];
+    techniciansUsed: number;
+    totalTravelTimeSeconds: number;
 }
 
 /**
@@ -93,4 +115,99 @@ export interface OptimizationResponsePayload {
     message?: string; // Optional message, especially on error
     routes: TechnicianRoute[];
     unassignedItemIds?: string[]; // List of item IDs that could not be scheduled
-} 
\ No newline at end of file
+    alternatives?: AlternativeSchedule[]; // Only when the request asked for alternatives
+} 
+
+/**
+ * A candidate plan for /evaluate-routes: technician routes as stop sequences.
+ * Only technicianId and each stop's itemId are read; times are computed.
+ */
+export interface CandidatePlan {
+    id?: string; // Echoed back in the plan's evaluation
+    routes: TechnicianRoute[];
+}
+
+/**
+ * Request payload for /evaluate-routes: the usual problem plus the plans to check.
+ */
+export interface RouteEvaluationRequestPayload extends OptimizationRequestPayload {
+    plans: CandidatePlan[];
+}
+
+export interface RouteViolation {
+    code: string; // e.g. 'FIXED_TIME_MISSED', 'SHIFT_END_EXCEEDED', 'INELIGIBLE_TECHNICIAN'
+    technicianId?: number;
+    itemId?: string;
+    amountSeconds?: number; // How late / how far over, for time violations
+}
+
+export interface PlanEvaluation {
+    id?: string;
+    feasible: boolean; // True if the plan has no violations
+    routes: TechnicianRoute[]; // Computed stop times and totals
+    unassignedItemIds: string[]; // Items no route visits
+    violations: RouteViolation[];
+    totalTravelTimeSeconds: number;
+    totalIdleTimeSeconds: number;
+}
+
+export interface RouteEvaluationResponsePayload {
+    plans: PlanEvaluation[];
+    evaluationTimeSeconds: number;
+}
+
+/**
+ * A what-if variant for /optimize-scenarios, applied to the request's base payload.
+ */
+export interface ScenarioDelta {
+    id: string;
+    removeTechnicianIds?: number[];
+    addItems?: OptimizationItem[]; // locationIndex refers to the base payload's locations
+    removeItemIds?: string[];
+    technicianWindows?: {
+        technicianId: number;
+        earliestStartTimeISO?: string; // Unset times keep the base shift's
+        latestEndTimeISO?: string;
+        earliestStartTimeUnix?: number;
+        latestEndTimeUnix?: number;
+    }[];
+}
+
+export interface ScenarioRequestPayload extends OptimizationRequestPayload {
+    scenarios: ScenarioDelta[];
+    includeBase?: boolean; // Default true: also solve the unchanged payload as scenario "base"
+    includeRoutes?: boolean; // Default false: include each scenario's full response
+}
+
+export interface ScenarioSummary {
+    id: string;
+    status: 'success' | 'error' | 'partial';
+    message?: string;
+    objectiveValue?: number; // Travel + drop penalties, including items pre-solve ruled out
+    unassignedCount?: number;
+    totalTravelTimeSeconds?: number;
+    techniciansUsed?: number;
+    objectiveDelta?: number; // Against the base scenario
+    unassignedDelta?: number;
+    solveTimeSeconds?: number;
+    response?: OptimizationResponsePayload;
+}
+
+export interface ScenarioResponsePayload {
+    scenarios: ScenarioSummary[];
+    wallTimeSeconds: number;
+}
+
+/**
+ * State of a solve queued with POST /jobs (GET /jobs/{jobId}).
+ */
+export interface SolveJobStatus {
+    jobId: string;
+    status: 'queued' | 'running' | 'done' | 'failed';
+    attempts: number; // More than 1 when a worker died while holding the job
+    waitSeconds?: number;
+    solveSeconds?: number;
+    result?: OptimizationResponsePayload; // Once done
+    error?: string; // Once failed
+    errorStatusCode?: number; // The status /optimize-schedule would have answered
+}